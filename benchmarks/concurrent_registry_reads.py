@@ -0,0 +1,162 @@
+""" Benchmark reading the registries from several threads while they change.
+
+Compares the registries' concurrent mode (where readers never take a lock)
+with a coarse lock around every read and every change.
+
+Run it with::
+
+    python benchmarks/concurrent_registry_reads.py
+
+"""
+
+
+# Standard library imports.
+import threading
+import time
+
+# Enthought library imports.
+from envisage.api import ExtensionPoint, ExtensionProvider
+from envisage.api import ProviderExtensionRegistry, ServiceRegistry
+from traits.api import Int, List
+
+
+class Foo(object):
+    """ The protocol that services are registered against. """
+
+
+class Provider(ExtensionProvider):
+    """ A provider that contributes a few extensions to 'x'. """
+
+    n = Int
+
+    def get_extensions(self, extension_point_id):
+        """ Return the provider's extensions to an extension point. """
+
+        return [self.n] * 3
+
+
+class CoarseLock(object):
+    """ Calls a registry's methods with a single lock held. """
+
+    def __init__(self, registry):
+        """ Constructor. """
+
+        self._registry = registry
+        self._lock = threading.Lock()
+
+        return
+
+    def __getattr__(self, name):
+        """ Wrap the registry's methods. """
+
+        method = getattr(self._registry, name)
+        def locked(*args, **kw):
+            with self._lock:
+                return method(*args, **kw)
+
+        return locked
+
+
+def create_service_registry(concurrent):
+    """ Create a service registry with a few hundred services in it. """
+
+    service_registry = ServiceRegistry(concurrent=concurrent)
+    for i in range(300):
+        service_registry.register_service(Foo, Foo(), {'i' : i})
+
+    return service_registry
+
+
+def create_extension_registry(concurrent):
+    """ Create an extension registry with a few hundred providers in it. """
+
+    registry = ProviderExtensionRegistry(concurrent=concurrent)
+    registry.add_extension_point(ExtensionPoint(List, id='x'))
+    for i in range(300):
+        registry.add_provider(Provider(n=i))
+
+    return registry
+
+
+def measure(read, write, readers, seconds):
+    """ Return the number of reads per second made by 'readers' threads.
+
+    One more thread calls 'write' over and over while the readers run.
+
+    """
+
+    done = threading.Event()
+    counts = []
+
+    def reader():
+        count = 0
+        while not done.is_set():
+            read()
+            count += 1
+
+        counts.append(count)
+
+    def writer():
+        while not done.is_set():
+            write()
+
+    threads = [threading.Thread(target=reader) for i in range(readers)]
+    threads.append(threading.Thread(target=writer))
+    for thread in threads:
+        thread.start()
+
+    time.sleep(seconds)
+    done.set()
+    for thread in threads:
+        thread.join()
+
+    return sum(counts) / seconds
+
+
+def main(readers=4, seconds=2.0):
+    """ Compare read throughput in concurrent mode against a coarse lock. """
+
+    print('%20s %15s %15s' % ('', 'lock-free', 'coarse lock'))
+
+    results = []
+    for concurrent in [True, False]:
+        service_registry = create_service_registry(concurrent)
+        if not concurrent:
+            service_registry = CoarseLock(service_registry)
+
+        def read():
+            service_registry.get_service(Foo)
+
+        def write():
+            service_id = service_registry.register_service(Foo, Foo())
+            service_registry.unregister_service(service_id)
+
+        results.append(measure(read, write, readers, seconds))
+
+    print('%20s %15.0f %15.0f' % (('services (reads/s)',) + tuple(results)))
+
+    results = []
+    for concurrent in [True, False]:
+        registry = create_extension_registry(concurrent)
+        if not concurrent:
+            registry = CoarseLock(registry)
+
+        def read():
+            registry.get_extensions_view('x')
+
+        def write():
+            provider = Provider(n=-1)
+            registry.add_provider(provider)
+            registry.remove_provider(provider)
+
+        results.append(measure(read, write, readers, seconds))
+
+    print('%20s %15.0f %15.0f' % (('extensions (reads/s)',) + tuple(results)))
+
+    return
+
+
+if __name__ == '__main__':
+    main()
+
+#### EOF ######################################################################
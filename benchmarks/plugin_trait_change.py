@@ -0,0 +1,62 @@
+""" Benchmark changing a trait that does *not* contribute to an extension point.
+
+Plugins only listen to the traits that contribute to extension points, so
+changing any other trait (e.g. a progress counter) should cost no more than it
+does on a plain 'HasTraits' object.
+
+Run it with::
+
+    python benchmarks/plugin_trait_change.py
+
+"""
+
+
+# Standard library imports.
+import timeit
+
+# Enthought library imports.
+from envisage.api import Plugin
+from traits.api import HasTraits, Int, List
+
+
+class Counter(HasTraits):
+    """ A plain 'HasTraits' object with a busy trait (the baseline). """
+
+    progress = Int
+
+
+class CounterPlugin(Plugin):
+    """ A plugin with a busy trait and a contribution. """
+
+    progress = Int
+
+    messages = List(contributes_to='acme.messages')
+
+
+def update(obj, number):
+    """ Update the object's 'progress' trait 'number' times. """
+
+    for i in range(number):
+        obj.progress = i
+
+    return
+
+
+def main(number=1000000):
+    """ Time 'number' updates of a non-contributing trait. """
+
+    print('%15s %15s' % ('object', 'usec/update'))
+    for obj in [Counter(), CounterPlugin()]:
+        seconds = min(
+            timeit.repeat(lambda: update(obj, number), number=1, repeat=3)
+        )
+
+        print('%15s %15.3f' % (type(obj).__name__, seconds / number * 1e6))
+
+    return
+
+
+if __name__ == '__main__':
+    main()
+
+#### EOF ######################################################################
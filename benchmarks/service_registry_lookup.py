@@ -0,0 +1,79 @@
+""" Benchmark service lookup as the service registry grows.
+
+Services are looked up by protocol, so the cost of a lookup should depend on
+the number of services registered against *that* protocol, not on the total
+number of services in the registry.
+
+Run it with::
+
+    python benchmarks/service_registry_lookup.py
+
+"""
+
+
+# Standard library imports.
+import timeit
+
+# Enthought library imports.
+from envisage.api import ServiceRegistry
+from traits.api import HasTraits, Interface, provides
+
+
+class IFoo(Interface):
+    """ The protocol that we look up. """
+
+
+@provides(IFoo)
+class Foo(HasTraits):
+    """ The service that we look up. """
+
+
+class IBar(Interface):
+    """ The protocol used to fill the registry up. """
+
+
+@provides(IBar)
+class Bar(HasTraits):
+    """ The services used to fill the registry up. """
+
+
+def create_registry(size):
+    """ Create a registry containing 'size' services.
+
+    Exactly one of the services is registered against 'IFoo'.
+
+    """
+
+    service_registry = ServiceRegistry()
+    service_registry.register_service(IFoo, Foo())
+
+    bar = Bar()
+    for i in range(size - 1):
+        service_registry.register_service(IBar, bar)
+
+    return service_registry
+
+
+def main(sizes=(10, 100, 1000, 10000, 100000), number=10000):
+    """ Time 'get_service' for registries of each of the given sizes. """
+
+    print('%10s %15s' % ('services', 'usec/lookup'))
+    for size in sizes:
+        service_registry = create_registry(size)
+
+        seconds = min(
+            timeit.repeat(
+                lambda: service_registry.get_service(IFoo),
+                number=number, repeat=3
+            )
+        )
+
+        print('%10d %15.3f' % (size, seconds / number * 1e6))
+
+    return
+
+
+if __name__ == '__main__':
+    main()
+
+#### EOF ######################################################################
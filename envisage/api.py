@@ -1,5 +1,7 @@
 """ Envisage package Copyright 2003-2007 Enthought, Inc. """
 
+import sys
+
 from .i_application import IApplication
 from .i_extension_point import IExtensionPoint
 from .i_extension_point_user import IExtensionPointUser
@@ -14,6 +16,9 @@ from .i_service_registry import IServiceRegistry
 from .application import Application
 from .category import Category
 from .class_load_hook import ClassLoadHook
+from .dispatcher import AsyncioDispatcher, Dispatcher, GUIDispatcher
+from .dispatcher import MarshallingDispatcher, QueuedDispatcher
+from .dispatcher import ThreadDispatcher
 from .egg_plugin_manager import EggPluginManager
 from .extension_registry import ExtensionRegistry
 from .extension_point import ExtensionPoint, contributes_to
@@ -25,13 +30,26 @@ from .plugin import Plugin
 from .plugin_activator import PluginActivator
 from .plugin_extension_registry import PluginExtensionRegistry
 from .plugin_manager import PluginManager
+from .profiler import Profiler
 from .provider_extension_registry import ProviderExtensionRegistry
 from .service import Service
 from .service_offer import ServiceOffer
+from .service_query import InvalidQueryError
+from .service_eviction import EvictionPolicy
 from .service_registry import NoSuchServiceError, ServiceRegistry
+from .service_scope import PerThreadScope, PooledScope, ServiceScope
+from .service_scope import ServiceScopeStats, TransientScope, pooled
 from .twisted_application import TwistedApplication
 from .unknown_extension import UnknownExtension
 from .unknown_extension_point import UnknownExtensionPoint
+from .usage_profile import ThreadScheduler, UsageProfile
+
+# The asyncio support uses 'async def' (and 'asyncio.get_running_loop').
+if sys.version_info >= (3, 7):
+    from .async_application import AsyncApplication
+    from .async_plugin_activator import AsyncPluginActivator
+    from .async_plugin_manager import AsyncPluginManager
+    from .async_service_registry import AsyncServiceRegistry
 
 
 #### EOF ######################################################################
@@ -8,7 +8,7 @@ import logging, os
 from traits.etsconfig.api import ETSConfig
 from apptools.preferences.api import IPreferences, ScopedPreferences
 from apptools.preferences.api import set_default_preferences
-from traits.api import Delegate, Event, HasTraits, Instance, Str
+from traits.api import Any, Bool, Delegate, Event, HasTraits, Instance, Str
 from traits.api import VetoableEvent, provides
 
 # Local imports.
@@ -19,7 +19,10 @@ from .i_plugin_manager import IPluginManager
 from .i_service_registry import IServiceRegistry
 
 from .application_event import ApplicationEvent
+from .dispatcher import Dispatcher
 from .import_manager import ImportManager
+from .profiler import profile
+from .usage_profile import ThreadScheduler, UsageProfile
 
 
 # Logging.
@@ -92,11 +95,33 @@ class Application(HasTraits):
     # The service registry.
     service_registry = Instance(IServiceRegistry)
 
+    # The dispatcher used by the default extension and service registries to
+    # call their listeners (see 'envisage.dispatcher'). If this is not set
+    # then listeners are called synchronously, on the thread that changed the
+    # registry. It must be set before the registries are first used.
+    dispatcher = Instance(Dispatcher)
+
+    # If True then the services and extension points used in each session
+    # are recorded in the application's 'home' directory, and pre-warmed in
+    # the background the next time that the application starts (this just
+    # creates a default 'usage_profile').
+    record_usage = Bool(False)
+
+    # The usage profile used by the default extension and service registries
+    # to record the services and extension points that are used, so that
+    # they can be pre-warmed when the application next starts (see
+    # 'envisage.usage_profile'). It must be set before the registries are
+    # first used.
+    usage_profile = Instance(UsageProfile)
+
     #### Private interface ####################################################
 
     # The import manager.
     _import_manager = Instance(IImportManager, factory=ImportManager)
 
+    # The scheduler that the usage profile is being pre-warmed with (if any).
+    _prewarm_scheduler = Any
+
     ###########################################################################
     # 'object' interface.
     ###########################################################################
@@ -197,6 +222,13 @@ class Application(HasTraits):
 
         return
 
+    def batch(self):
+        """ A context manager that batches changes to the extension registry.
+
+        """
+
+        return self.extension_registry.batch()
+
     def get_extensions(self, extension_point_id):
         """ Return a list containing all contributions to an extension point.
 
@@ -204,6 +236,20 @@ class Application(HasTraits):
 
         return self.extension_registry.get_extensions(extension_point_id)
 
+    def get_extensions_mapping(self, extension_point_id):
+        """ Return the contributions to a keyed extension point by key. """
+
+        return self.extension_registry.get_extensions_mapping(
+            extension_point_id
+        )
+
+    def get_extensions_view(self, extension_point_id):
+        """ Return an immutable view of the extensions to an extension point.
+
+        """
+
+        return self.extension_registry.get_extensions_view(extension_point_id)
+
     def get_extension_point(self, extension_point_id):
         """ Return the extension point with the specified Id. """
 
@@ -216,6 +262,13 @@ class Application(HasTraits):
 
         return self.extension_registry.get_extension_points()
 
+    def get_keyed_extension(self, extension_point_id, key, default=None):
+        """ Return the contribution to a keyed extension point with a key. """
+
+        return self.extension_registry.get_keyed_extension(
+            extension_point_id, key, default
+        )
+
     def remove_extension_point_listener(self,listener,extension_point_id=None):
         """ Remove a listener for extensions being added/removed. """
 
@@ -264,6 +317,21 @@ class Application(HasTraits):
 
         return
 
+    def add_plugins(self, plugins):
+        """ Add several plugins to the manager in a single batch.
+
+        Extension point listeners are called (at most) once per extension
+        point after all of the plugins have been added, rather than once per
+        plugin.
+
+        """
+
+        with self.extension_registry.batch():
+            for plugin in plugins:
+                self.add_plugin(plugin)
+
+        return
+
     def get_plugin(self, plugin_id):
         """ Return the plugin with the specified Id. """
 
@@ -276,6 +344,21 @@ class Application(HasTraits):
 
         return
 
+    def remove_plugins(self, plugins):
+        """ Remove several plugins from the manager in a single batch.
+
+        Extension point listeners are called (at most) once per extension
+        point after all of the plugins have been removed, rather than once per
+        plugin.
+
+        """
+
+        with self.extension_registry.batch():
+            for plugin in plugins:
+                self.remove_plugin(plugin)
+
+        return
+
     def start(self):
         """ Start the plugin manager.
 
@@ -293,13 +376,17 @@ class Application(HasTraits):
         if not event.veto:
             # Start the plugin manager (this starts all of the manager's
             # plugins).
-            self.plugin_manager.start()
+            with profile('start', 'application', application=self.id):
+                self.plugin_manager.start()
 
             # Lifecycle event.
             self.started = self._create_application_event()
 
             logger.debug('---------- application started ----------')
 
+            # Pre-warm whatever was used the last time the application ran.
+            self._start_prewarming()
+
         else:
             logger.debug('---------- application start vetoed ----------')
 
@@ -325,12 +412,20 @@ class Application(HasTraits):
         # Lifecycle event.
         self.stopping = event = self._create_application_event()
         if not event.veto:
+            # Don't pre-warm anything while the plugins are being stopped!
+            self._stop_prewarming()
+
             # Stop the plugin manager (this stops all of the manager's
             # plugins).
-            self.plugin_manager.stop()
+            with profile('stop', 'application', application=self.id):
+                self.plugin_manager.stop()
 
             # Save all preferences.
-            self.preferences.save()
+            with profile('save_preferences', 'application'):
+                self.preferences.save()
+
+            # Save the usage profile for the next time the application runs.
+            self._save_usage_profile()
 
             # Lifecycle event.
             self.stopped = self._create_application_event()
@@ -351,6 +446,13 @@ class Application(HasTraits):
     # 'IServiceRegistry' interface.
     ###########################################################################
 
+    def checkout(self, protocol, query='', minimize='', maximize=''):
+        """ Check out a service that matches the specified query. """
+
+        return self.service_registry.checkout(
+            protocol, query, minimize, maximize
+        )
+
     def get_required_service(self, protocol, query='', minimize='',maximize=''):
         """ Return the service that matches the specified query.
 
@@ -378,6 +480,11 @@ class Application(HasTraits):
 
         return self.service_registry.get_service_from_id(service_id)
 
+    def get_service_generation(self, protocol):
+        """ Return the generation of the services for a protocol. """
+
+        return self.service_registry.get_service_generation(protocol)
+
     def get_service_properties(self, service_id):
         """ Return the dictionary of properties associated with a service. """
 
@@ -392,15 +499,31 @@ class Application(HasTraits):
 
         return services
 
-    def register_service(self, protocol, obj, properties=None):
+    def iter_services(self, protocol, query=''):
+        """ Return an iterator over the services that match a query. """
+
+        return self.service_registry.iter_services(protocol, query)
+
+    def get_service_stats(self, service_id):
+        """ Return the statistics for a service registered as a factory. """
+
+        return self.service_registry.get_service_stats(service_id)
+
+    def register_service(self, protocol, obj, properties=None,
+                         scope='singleton'):
         """ Register a service. """
 
         service_id = self.service_registry.register_service(
-            protocol, obj, properties
+            protocol, obj, properties, scope
         )
 
         return service_id
 
+    def register_services(self, service_offers):
+        """ Register a number of services in a single transaction. """
+
+        return self.service_registry.register_services(service_offers)
+
     def set_service_properties(self, service_id, properties):
         """ Set the dictionary of properties associated with a service. """
 
@@ -415,6 +538,13 @@ class Application(HasTraits):
 
         return
 
+    def unregister_services(self, service_ids):
+        """ Unregister a number of services in a single transaction. """
+
+        self.service_registry.unregister_services(service_ids)
+
+        return
+
     ###########################################################################
     # 'Application' interface.
     ###########################################################################
@@ -429,7 +559,14 @@ class Application(HasTraits):
         # to override it!
         from .plugin_extension_registry import PluginExtensionRegistry
 
-        return PluginExtensionRegistry(plugin_manager=self)
+        extension_registry = PluginExtensionRegistry(plugin_manager=self)
+        if self.dispatcher is not None:
+            extension_registry.dispatcher = self.dispatcher
+
+        if self.usage_profile is not None:
+            extension_registry.usage_profile = self.usage_profile
+
+        return extension_registry
 
     def _plugin_manager_default(self):
         """ Trait initializer. """
@@ -449,7 +586,22 @@ class Application(HasTraits):
         # to override it!
         from .service_registry import ServiceRegistry
 
-        return ServiceRegistry()
+        service_registry = ServiceRegistry()
+        if self.dispatcher is not None:
+            service_registry.dispatcher = self.dispatcher
+
+        if self.usage_profile is not None:
+            service_registry.usage_profile = self.usage_profile
+
+        return service_registry
+
+    def _usage_profile_default(self):
+        """ Trait initializer. """
+
+        if not self.record_usage:
+            return None
+
+        return UsageProfile(os.path.join(self.home, 'usage_profile.json'))
 
     ###########################################################################
     # Private interface.
@@ -491,6 +643,30 @@ class Application(HasTraits):
 
         return ApplicationEvent(application=self)
 
+    def _get_prewarm_scheduler(self):
+        """ Return the scheduler used to pre-warm the usage profile.
+
+        This is a callable that takes a callable and arranges for it to be
+        called later, ideally on the thread that started the application
+        (e.g. when the event loop is idle). A plain application doesn't have
+        an event loop, so it pre-warms on a worker thread instead, with its
+        registries in concurrent mode until pre-warming has finished.
+
+        """
+
+        registries = []
+
+        def started():
+            registries.extend(self._make_registries_concurrent())
+
+        def finished():
+            for registry in registries:
+                registry.concurrent = False
+
+            del registries[:]
+
+        return ThreadScheduler(started=started, finished=finished)
+
     def _initialize_application_home(self):
         """ Initialize the application home directory. """
 
@@ -504,4 +680,59 @@ class Application(HasTraits):
 
         return
 
+    def _make_registries_concurrent(self):
+        """ Put the registries into concurrent mode.
+
+        Return the registries that were changed (registries that don't have a
+        concurrent mode, or that are already in it, are left alone).
+
+        """
+
+        changed = []
+        for registry in [self.extension_registry, self.service_registry]:
+            if registry.trait('concurrent') is None or registry.concurrent:
+                continue
+
+            registry.concurrent = True
+            changed.append(registry)
+
+        return changed
+
+    def _save_usage_profile(self):
+        """ Save the usage profile (if there is one). """
+
+        if self.usage_profile is not None:
+            with profile('save_usage_profile', 'application'):
+                try:
+                    self.usage_profile.save()
+
+                except (IOError, OSError):
+                    logger.exception('error saving the usage profile')
+
+        return
+
+    def _start_prewarming(self):
+        """ Pre-warm what the usage profile recorded last time (if any). """
+
+        if self.usage_profile is not None:
+            self._prewarm_scheduler = self._get_prewarm_scheduler()
+            self.usage_profile.prewarm(self, self._prewarm_scheduler)
+
+        return
+
+    def _stop_prewarming(self):
+        """ Stop pre-warming (if we were). """
+
+        if self.usage_profile is not None:
+            self.usage_profile.cancel()
+
+        # Wait for anything that is being pre-warmed on another thread.
+        join = getattr(self._prewarm_scheduler, 'join', None)
+        if join is not None:
+            join()
+
+        self._prewarm_scheduler = None
+
+        return
+
 #### EOF ######################################################################
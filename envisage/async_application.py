@@ -0,0 +1,362 @@
+""" A non-GUI application with an asyncio event loop.
+
+e.g.::
+
+    class NetworkPlugin(Plugin):
+
+        async def start(self):
+            self.client = await connect(...)
+
+        async def stop(self):
+            await self.client.close()
+
+    application = AsyncApplication(plugins=[CorePlugin(), NetworkPlugin()])
+
+    # Start the plugins and run the event loop until 'stop' is called.
+    application.run()
+
+or, from a coroutine that is already running on the loop::
+
+    await application.start_async()
+    ...
+    await application.stop_async()
+
+Plugins that do not depend on each other are started concurrently, and
+services can be offered via asynchronous factories (see
+'AsyncServiceRegistry').
+
+"""
+
+
+# Standard library imports.
+import asyncio
+import logging
+
+# Enthought library imports.
+from traits.api import Any, Bool
+
+# Local imports.
+from .application import Application
+from .profiler import profile
+
+
+# Logging.
+logger = logging.getLogger(__name__)
+
+
+class AsyncApplication(Application):
+    """ A non-GUI application with an asyncio event loop. """
+
+    #### 'AsyncApplication' interface #########################################
+
+    # The event loop that the application runs on (by default the loop that is
+    # running when the application is created, or a new loop if there isn't
+    # one).
+    loop = Any
+
+    def _loop_default(self):
+        """ Trait initializer. """
+
+        try:
+            loop = asyncio.get_running_loop()
+
+        except RuntimeError:
+            loop = asyncio.new_event_loop()
+
+        return loop
+
+    #### Private interface ####################################################
+
+    # True between the plugins being started and being stopped.
+    _running = Bool(False)
+
+    # True while 'start' is running the event loop (and so 'stop' should
+    # stop it).
+    _running_loop = Bool(False)
+
+    # The task that stops the plugins if 'stop' is called while the event
+    # loop is running.
+    _stop_task = Any
+
+    ###########################################################################
+    # 'IApplication' interface.
+    ###########################################################################
+
+    def start(self):
+        """ Start the application.
+
+        If the event loop is not already running then the plugins are started
+        and the loop is run until the application is stopped.
+
+        If the event loop *is* already running (i.e. this is called from a
+        callback on the loop) then we can't wait for the plugins to start, so
+        this just fires the 'starting' event (to find out whether the start is
+        vetoed) and then starts the plugins in a task on the loop. Use
+        'start_async' to wait for them.
+
+        """
+
+        if self.loop.is_running():
+            started = self._fire_vetoable('starting')
+            if started:
+                self._create_task(self._start_plugins())
+
+            return started
+
+        self._stop_task = None
+        started = self.loop.run_until_complete(self.start_async())
+
+        # Don't start the event loop if the start was vetoed (or if the
+        # application was stopped while it was starting).
+        if started:
+            if self._stop_task is not None:
+                self.loop.run_until_complete(self._stop_task)
+
+            else:
+                logger.debug('---------- event loop starting ----------')
+                self._running_loop = True
+                try:
+                    self.loop.run_forever()
+
+                finally:
+                    self._running_loop = False
+
+        return started
+
+    def stop(self):
+        """ Stop the application.
+
+        If the event loop is running then the plugins are stopped in a task on
+        the loop, and (if the loop was run by 'start') the loop is stopped once
+        they have stopped.
+
+        """
+
+        if not self.loop.is_running():
+            return self.loop.run_until_complete(self.stop_async())
+
+        stopped = self._fire_vetoable('stopping')
+        if stopped:
+            self._stop_task = task = self._create_task(self._stop_plugins())
+
+            # Don't stop the event loop until the plugins have stopped.
+            if self._running_loop:
+                logger.debug('---------- event loop stopping ----------')
+                task.add_done_callback(lambda task: self.loop.stop())
+
+        return stopped
+
+    ###########################################################################
+    # 'Application' interface.
+    ###########################################################################
+
+    def run(self):
+        """ Run the application.
+
+        The event loop runs until the application is stopped (e.g. by a
+        plugin calling 'stop').
+
+        """
+
+        # If the loop was stopped some other way then the plugins are still
+        # running.
+        if self.start() and self._running:
+            self.stop()
+
+        return
+
+    #### Trait initializers ###################################################
+
+    def _plugin_manager_default(self):
+        """ Trait initializer. """
+
+        # Do the import here to emphasize the fact that this is just the
+        # default implementation and that the application developer is free
+        # to override it!
+        from .async_plugin_manager import AsyncPluginManager
+
+        return AsyncPluginManager(application=self)
+
+    def _service_registry_default(self):
+        """ Trait initializer. """
+
+        # Do the import here to emphasize the fact that this is just the
+        # default implementation and that the application developer is free
+        # to override it!
+        from .async_service_registry import AsyncServiceRegistry
+
+        service_registry = AsyncServiceRegistry(loop=self.loop)
+        if self.dispatcher is not None:
+            service_registry.dispatcher = self.dispatcher
+
+        if self.usage_profile is not None:
+            service_registry.usage_profile = self.usage_profile
+
+        return service_registry
+
+    ###########################################################################
+    # 'AsyncApplication' interface.
+    ###########################################################################
+
+    async def start_async(self):
+        """ Start the application (and wait for the plugins to start).
+
+        Returns True unless the start was vetoed.
+
+        """
+
+        started = self._fire_vetoable('starting')
+        if started:
+            await self._start_plugins()
+
+        return started
+
+    async def stop_async(self):
+        """ Stop the application (and wait for the plugins to stop).
+
+        Returns True unless the stop was vetoed.
+
+        """
+
+        stopped = self._fire_vetoable('stopping')
+        if stopped:
+            await self._stop_plugins()
+
+        return stopped
+
+    async def get_required_service_async(self, protocol, query='',
+                                         minimize='', maximize=''):
+        """ Return the service that matches the specified query.
+
+        Raise a 'NoSuchServiceError' exception if no such service exists.
+
+        """
+
+        service = await self.service_registry.get_required_service_async(
+            protocol, query, minimize, maximize
+        )
+
+        return service
+
+    async def get_service_async(self, protocol, query='', minimize='',
+                                maximize=''):
+        """ Return at most one service that matches the specified query. """
+
+        service = await self.service_registry.get_service_async(
+            protocol, query, minimize, maximize
+        )
+
+        return service
+
+    async def get_services_async(self, protocol, query='', minimize='',
+                                 maximize=''):
+        """ Return all services that match the specified query. """
+
+        services = await self.service_registry.get_services_async(
+            protocol, query, minimize, maximize
+        )
+
+        return services
+
+    ###########################################################################
+    # Private interface.
+    ###########################################################################
+
+    def _create_task(self, coroutine):
+        """ Run a coroutine in a task on the event loop. """
+
+        task = self.loop.create_task(coroutine)
+        task.add_done_callback(self._log_task_error)
+
+        return task
+
+    def _fire_vetoable(self, trait_name):
+        """ Fire the 'starting' or 'stopping' event.
+
+        Returns True unless the event was vetoed.
+
+        """
+
+        logger.debug('---------- application %s ----------', trait_name)
+
+        event = self._create_application_event()
+        setattr(self, trait_name, event)
+        if event.veto:
+            logger.debug('---------- application %s vetoed ----------', (
+                'start' if trait_name == 'starting' else 'stop'
+            ))
+
+        return not event.veto
+
+    def _get_prewarm_scheduler(self):
+        """ Return the scheduler used to pre-warm the usage profile. """
+
+        # Pre-warm in callbacks on the event loop.
+        return self.loop.call_soon
+
+    def _log_task_error(self, task):
+        """ Log any exception raised by a task. """
+
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(
+                'error in application task', exc_info=task.exception()
+            )
+
+        return
+
+    async def _start_plugins(self):
+        """ Start the plugins (once the start has not been vetoed). """
+
+        # Start the plugin manager (this starts all of the manager's plugins).
+        with profile('start', 'application', application=self.id):
+            start_async = getattr(self.plugin_manager, 'start_async', None)
+            if start_async is not None:
+                await start_async()
+
+            else:
+                self.plugin_manager.start()
+
+        self._running = True
+
+        # Lifecycle event.
+        self.started = self._create_application_event()
+
+        logger.debug('---------- application started ----------')
+
+        # Pre-warm whatever was used the last time the application ran.
+        self._start_prewarming()
+
+        return
+
+    async def _stop_plugins(self):
+        """ Stop the plugins (once the stop has not been vetoed). """
+
+        # Don't pre-warm anything while the plugins are being stopped!
+        self._stop_prewarming()
+
+        # Stop the plugin manager (this stops all of the manager's plugins).
+        with profile('stop', 'application', application=self.id):
+            stop_async = getattr(self.plugin_manager, 'stop_async', None)
+            if stop_async is not None:
+                await stop_async()
+
+            else:
+                self.plugin_manager.stop()
+
+        self._running = False
+
+        # Save all preferences.
+        with profile('save_preferences', 'application'):
+            self.preferences.save()
+
+        # Save the usage profile for the next time the application runs.
+        self._save_usage_profile()
+
+        # Lifecycle event.
+        self.stopped = self._create_application_event()
+
+        logger.debug('---------- application stopped ----------')
+
+        return
+
+#### EOF ######################################################################
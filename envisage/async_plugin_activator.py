@@ -0,0 +1,193 @@
+""" A plugin activator for plugins that start and stop asynchronously. """
+
+
+# Standard library imports.
+import asyncio
+import inspect
+import logging
+
+# Local imports.
+from .plugin_activator import PluginActivator
+from .profiler import profile
+
+
+# Logging.
+logger = logging.getLogger(__name__)
+
+
+class AsyncPluginActivator(PluginActivator):
+    """ A plugin activator for plugins that start and stop asynchronously.
+
+    A plugin's 'start' and 'stop' methods can be either ordinary methods or
+    coroutine functions (i.e. 'async def start(self): ...'). The activator
+    awaits them in 'start_plugin_async' and 'stop_plugin_async', which is
+    how the 'AsyncPluginManager' starts and stops plugins.
+
+    """
+
+    ###########################################################################
+    # 'IPluginActivator' interface.
+    ###########################################################################
+
+    def start_plugin(self, plugin):
+        """ Start the specified plugin.
+
+        This is used when a plugin is started synchronously (e.g. when it is
+        activated lazily). If the plugin's 'start' method is a coroutine
+        function then it is run on the application's event loop: if the loop
+        is already running then the coroutine is scheduled on it, otherwise
+        the loop is run until the coroutine is done.
+
+        """
+
+        self._connect_plugin(plugin)
+
+        # Plugin specific start.
+        with profile('start', 'plugin', plugin=plugin.id):
+            self._run(plugin.start(), plugin)
+
+        return
+
+    def stop_plugin(self, plugin):
+        """ Stop the specified plugin.
+
+        This is used when a plugin is stopped synchronously (see
+        'start_plugin').
+
+        """
+
+        # Plugin specific stop.
+        with profile('stop', 'plugin', plugin=plugin.id):
+            self._run(plugin.stop(), plugin)
+
+        self._disconnect_plugin(plugin)
+
+        return
+
+    ###########################################################################
+    # 'AsyncPluginActivator' interface.
+    ###########################################################################
+
+    async def start_plugin_async(self, plugin):
+        """ Start the specified plugin. """
+
+        self._connect_plugin(plugin)
+
+        # Plugin specific start.
+        with profile('start', 'plugin', plugin=plugin.id):
+            await self._maybe_await(plugin.start())
+
+        return
+
+    async def stop_plugin_async(self, plugin):
+        """ Stop the specified plugin. """
+
+        # Plugin specific stop.
+        with profile('stop', 'plugin', plugin=plugin.id):
+            await self._maybe_await(plugin.stop())
+
+        self._disconnect_plugin(plugin)
+
+        return
+
+    ###########################################################################
+    # Private interface.
+    ###########################################################################
+
+    def _connect_plugin(self, plugin):
+        """ Connect a plugin to the application before it is started. """
+
+        # Connect all of the plugin's extension point traits so that the plugin
+        # will be notified if and when contributions are added or removed.
+        with profile(
+            'connect_extension_point_traits', 'plugin', plugin=plugin.id
+        ):
+            plugin.connect_extension_point_traits()
+
+        # Register all services.
+        with profile('register_services', 'plugin', plugin=plugin.id):
+            plugin.register_services()
+
+        return
+
+    def _disconnect_plugin(self, plugin):
+        """ Disconnect a plugin from the application after it has stopped. """
+
+        # Unregister all service.
+        with profile('unregister_services', 'plugin', plugin=plugin.id):
+            plugin.unregister_services()
+
+        # Disconnect all of the plugin's extension point traits.
+        with profile(
+            'disconnect_extension_point_traits', 'plugin', plugin=plugin.id
+        ):
+            plugin.disconnect_extension_point_traits()
+
+        return
+
+    def _log_task_error(self, task):
+        """ Log any exception raised by a scheduled start or stop. """
+
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(
+                'error in scheduled plugin start/stop',
+                exc_info=task.exception()
+            )
+
+        return
+
+    async def _maybe_await(self, result):
+        """ Await the result of a method if it is awaitable. """
+
+        if inspect.isawaitable(result):
+            result = await result
+
+        return result
+
+    def _run(self, result, plugin):
+        """ Wait for the result of a plugin's method if it is awaitable.
+
+        The awaitable is run on the application's event loop (so that
+        anything the plugin binds to the loop stays usable). If the loop is
+        already running then we can't block it while we wait, so the best
+        that we can do is to schedule the awaitable on it.
+
+        """
+
+        if not inspect.isawaitable(result):
+            return
+
+        try:
+            running_loop = asyncio.get_running_loop()
+
+        except RuntimeError:
+            running_loop = None
+
+        loop = getattr(plugin.application, 'loop', None) or running_loop
+
+        if loop is not None and loop is running_loop:
+            task = asyncio.ensure_future(result, loop=loop)
+            task.add_done_callback(self._log_task_error)
+
+        # The loop is running on another thread.
+        elif loop is not None and loop.is_running():
+            future = asyncio.run_coroutine_threadsafe(
+                self._maybe_await(result), loop
+            )
+            future.add_done_callback(self._log_task_error)
+
+        elif loop is not None:
+            loop.run_until_complete(result)
+
+        # If there is no loop at all then all we can do is to use a new one.
+        else:
+            loop = asyncio.new_event_loop()
+            try:
+                loop.run_until_complete(result)
+
+            finally:
+                loop.close()
+
+        return
+
+#### EOF ######################################################################
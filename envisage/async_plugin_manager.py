@@ -0,0 +1,202 @@
+""" A plugin manager that starts and stops plugins on an asyncio event loop.
+"""
+
+
+# Standard library imports.
+import asyncio
+import logging
+import time
+
+# Enthought library imports.
+from traits.api import Instance
+
+# Local imports.
+from .async_plugin_activator import AsyncPluginActivator
+from .plugin_activator import PluginActivator
+from .plugin_dependencies import get_plugin_dependencies
+from .plugin_dependencies import get_plugins_in_start_order
+from .plugin_manager import PluginManager
+from .profiler import profile
+
+
+# Logging.
+logger = logging.getLogger(__name__)
+
+
+class AsyncPluginManager(PluginManager):
+    """ A plugin manager that starts and stops plugins on an asyncio loop.
+
+    Plugins can have asynchronous 'start' and 'stop' methods (i.e. coroutine
+    functions). 'start_async' starts all plugins that do not depend on each
+    other concurrently on the event loop, so e.g. plugins that connect to
+    network services or index files can all get on with it at the same time
+    without needing any threads. A plugin is only started once all of the
+    plugins that it depends on have started (see the 'requires' and 'after'
+    traits on 'Plugin'). 'stop_async' does the same in reverse.
+
+    """
+
+    #### 'AsyncPluginManager' protocol ########################################
+
+    # The activator used for plugins that use the default activator (it does
+    # exactly the same thing, except that it awaits asynchronous 'start' and
+    # 'stop' methods). Plugins with their own activator keep it.
+    activator = Instance(AsyncPluginActivator, ())
+
+    #### 'AsyncPluginManager' protocol ########################################
+
+    async def start_async(self):
+        """ Start the plugin manager. """
+
+        start_order = get_plugins_in_start_order(self._plugins)
+
+        # Lazily activated plugins are not started now, but when they are
+        # first used.
+        lazy = self._get_lazy_plugins(start_order)
+        eager = [plugin for plugin in start_order if plugin not in lazy]
+
+        await self._start_plugins_concurrently(eager)
+
+        if len(lazy) > 0:
+            self._defer_plugins(
+                [plugin for plugin in start_order if plugin in lazy]
+            )
+
+        return
+
+    async def stop_async(self):
+        """ Stop the plugin manager. """
+
+        stop_order = self._get_stop_order()
+
+        self._reset_lazy_activation()
+
+        await self._stop_plugins_concurrently(stop_order)
+
+        return
+
+    #### Private protocol #####################################################
+
+    def _get_activator(self, plugin):
+        """ Return the activator used to start and stop a plugin. """
+
+        # The default activator can't await asynchronous methods, so we use
+        # ours instead (but a plugin's own activator is always respected).
+        if type(plugin.activator) is PluginActivator:
+            return self.activator
+
+        return plugin.activator
+
+    async def _run_in_dependency_order(self, plugins, dependencies, run):
+        """ Run a coroutine for each plugin, respecting their dependencies.
+
+        The coroutine for each plugin is only run once the coroutines for all
+        of the plugins in its dependencies have finished. If any coroutine
+        raises an exception then the coroutines that depend on it are not
+        run, and (once the others have finished) the exception is re-raised.
+
+        """
+
+        tasks = {}
+        async def run_after_dependencies(plugin):
+            for dependency in dependencies[plugin]:
+                await tasks[dependency]
+
+            await run(plugin)
+
+        # The plugins that each plugin depends on are always earlier in the
+        # list, so their tasks already exist.
+        for plugin in plugins:
+            tasks[plugin] = asyncio.ensure_future(
+                run_after_dependencies(plugin)
+            )
+
+        results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+        # A plugin that fails means that the plugins that depend on it fail
+        # with the same exception, so we re-raise the first one.
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+        return
+
+    async def _start_plugin_async(self, plugin):
+        """ Start a plugin and return how long it took (in seconds). """
+
+        logger.debug('plugin %s starting', plugin.id)
+
+        activator = self._get_activator(plugin)
+
+        start_time = time.time()
+        with profile('start_plugin', 'plugin_manager', plugin=plugin.id):
+            if isinstance(activator, AsyncPluginActivator):
+                await activator.start_plugin_async(plugin)
+
+            else:
+                activator.start_plugin(plugin)
+        duration = time.time() - start_time
+
+        logger.debug('plugin %s started in %.3fs', plugin.id, duration)
+
+        return duration
+
+    async def _start_plugins_concurrently(self, plugins):
+        """ Start plugins concurrently, respecting their dependencies. """
+
+        async def start(plugin):
+            try:
+                duration = await self._start_plugin_async(plugin)
+
+            except Exception:
+                logger.exception('plugin %s failed to start', plugin.id)
+                raise
+
+            self.start_durations[plugin.id] = duration
+
+        await self._run_in_dependency_order(
+            plugins, get_plugin_dependencies(plugins), start
+        )
+
+        return
+
+    async def _stop_plugin_async(self, plugin):
+        """ Stop a plugin. """
+
+        logger.debug('plugin %s stopping', plugin.id)
+
+        activator = self._get_activator(plugin)
+
+        with profile('stop_plugin', 'plugin_manager', plugin=plugin.id):
+            if isinstance(activator, AsyncPluginActivator):
+                await activator.stop_plugin_async(plugin)
+
+            else:
+                activator.stop_plugin(plugin)
+
+        logger.debug('plugin %s stopped', plugin.id)
+
+        return
+
+    async def _stop_plugins_concurrently(self, plugins):
+        """ Stop plugins concurrently, respecting their dependencies.
+
+        A plugin is only stopped once all of the plugins that depend on it
+        have stopped.
+
+        """
+
+        # Stopping reverses the dependencies, i.e. a plugin waits for all of
+        # the plugins that depend on it.
+        dependents = dict((plugin, []) for plugin in plugins)
+        for plugin, dependencies in get_plugin_dependencies(plugins).items():
+            for dependency in dependencies:
+                dependents[dependency].append(plugin)
+
+        await self._run_in_dependency_order(
+            plugins, dependents, self._stop_plugin_async
+        )
+
+        return
+
+#### EOF ######################################################################
@@ -0,0 +1,137 @@
+""" A service registry that supports asynchronous service factories. """
+
+
+# Standard library imports.
+import asyncio
+import inspect
+
+# Enthought library imports.
+from traits.api import Any
+
+# Local imports.
+from .service_registry import ServiceRegistry
+
+
+class AsyncServiceRegistry(ServiceRegistry):
+    """ A service registry that supports asynchronous service factories.
+
+    A service factory can be a coroutine function (e.g. the factory of a
+    'ServiceOffer' can be 'async def create_client(**properties): ...'). The
+    factory is called on the first request for the service as usual, but the
+    coroutine that it returns is wrapped in a task that is cached in place of
+    the service until it is done, so everybody who asks for the service
+    shares the same task.
+
+    The '*_async' methods await such tasks and so always return the actual
+    services. While a service is still being created, the synchronous methods
+    return its task, and it can only be matched by queries and ranked by
+    'minimize' and 'maximize' using its properties.
+
+    If an asynchronous factory raises an exception then every request that is
+    waiting for the service gets the exception, and the factory is called
+    again the next time that the service is requested.
+
+    """
+
+    #### 'AsyncServiceRegistry' interface #####################################
+
+    # The event loop that asynchronous service factories are run on (if this
+    # is not set then the running loop is used).
+    loop = Any
+
+    ###########################################################################
+    # 'AsyncServiceRegistry' interface.
+    ###########################################################################
+
+    async def get_required_service_async(self, protocol, query='',
+                                         minimize='', maximize=''):
+        """ Return the service that matches the specified query.
+
+        Raise a 'NoSuchServiceError' exception if no such service exists.
+
+        """
+
+        service = self.get_required_service(
+            protocol, query, minimize, maximize
+        )
+
+        return await self._await_service(service)
+
+    async def get_service_async(self, protocol, query='', minimize='',
+                                maximize=''):
+        """ Return at most one service that matches the specified query. """
+
+        service = self.get_service(protocol, query, minimize, maximize)
+
+        return await self._await_service(service)
+
+    async def get_services_async(self, protocol, query='', minimize='',
+                                 maximize=''):
+        """ Return all services that match the specified query. """
+
+        services = self.get_services(protocol, query, minimize, maximize)
+
+        return [await self._await_service(service) for service in services]
+
+    ###########################################################################
+    # Private interface.
+    ###########################################################################
+
+    async def _await_service(self, service):
+        """ Return the actual service if it is still being created. """
+
+        if isinstance(service, asyncio.Future):
+            service = await service
+
+        return service
+
+    def _call_factory(self, factory, properties, service_id):
+        """ Call a service factory to create a service. """
+
+        service = super(AsyncServiceRegistry, self)._call_factory(
+            factory, properties, service_id
+        )
+
+        # An asynchronous factory's coroutine is wrapped in a task (which,
+        # unlike the coroutine, can be awaited any number of times).
+        if inspect.isawaitable(service):
+            service = asyncio.ensure_future(service, loop=self.loop)
+            service.add_done_callback(
+                lambda task: self._on_factory_task_done(factory, task)
+            )
+
+        return service
+
+    def _is_service_factory(self, protocol, obj):
+        """ Is the object a factory for services supporting the protocol? """
+
+        # A task created by an asynchronous factory is the (future) service.
+        if isinstance(obj, asyncio.Future):
+            return False
+
+        return super(AsyncServiceRegistry, self)._is_service_factory(
+            protocol, obj
+        )
+
+    def _on_factory_task_done(self, factory, task):
+        """ Called when an asynchronous factory has finished. """
+
+        # If the factory succeeded then the service replaces the task in the
+        # cache. If it failed then the factory does, so that it is called
+        # again the next time that the service is requested.
+        if not task.cancelled() and task.exception() is None:
+            replacement = task.result()
+
+        else:
+            replacement = factory
+
+        with self._lock:
+            for service_id, (name, obj, properties) in self._services.items():
+                if obj is task:
+                    self._services[service_id] = name, replacement, properties
+                    self._increment_generation(name)
+                    break
+
+        return
+
+#### EOF ######################################################################
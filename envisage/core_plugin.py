@@ -3,6 +3,7 @@
 
 # Enthought library imports.
 from envisage.api import ExtensionPoint, Plugin, ServiceOffer
+from envisage.profiler import profile
 from traits.api import List, Instance, on_trait_change, Str
 
 
@@ -270,19 +271,23 @@ class CorePlugin(Plugin):
         # The resource manager is used to find the preferences files.
         resource_manager = ResourceManager()
         for resource_name in preferences:
-            f = resource_manager.file(resource_name)
-            try:
-                default.load(f)
+            with profile('load_preferences', 'core', resource=resource_name):
+                f = resource_manager.file(resource_name)
+                try:
+                    default.load(f)
 
-            finally:
-                f.close()
+                finally:
+                    f.close()
 
         return
 
     def _register_service_offers(self, service_offers):
         """ Register a list of service offers. """
 
-        return list(map(self._register_service_offer, service_offers))
+        with profile('register_service_offers', 'core'):
+            service_ids = self.application.register_services(service_offers)
+
+        return service_ids
 
     def _register_service_offer(self, service_offer):
         """ Register a service offer. """
@@ -290,7 +295,8 @@ class CorePlugin(Plugin):
         service_id = self.application.register_service(
             protocol   = service_offer.protocol,
             obj        = service_offer.factory,
-            properties = service_offer.properties
+            properties = service_offer.properties,
+            scope      = service_offer.scope
         )
 
         return service_id
@@ -0,0 +1,285 @@
+""" Dispatchers decide when (and on which thread) registry events are fired.
+
+By default the extension and service registries call their listeners
+synchronously, on whichever thread changes the registry. That means that a
+background thread that e.g. adds a plugin runs any UI listeners on the wrong
+thread, and that a slow listener holds up whoever changed the registry.
+
+A registry can be given a different dispatcher to change that:
+
+'Dispatcher'
+    Calls listeners synchronously (the default).
+
+'QueuedDispatcher'
+    Queues the calls until 'flush' is called (e.g. at the end of a loading
+    phase). If 'coalesce' is True (the default) then the changes made to an
+    extension point between flushes are reported as a single event.
+
+'MarshallingDispatcher'
+    Queues the calls and asks a target event loop to flush them, e.g.::
+
+        # A pyface GUI event loop.
+        dispatcher = GUIDispatcher()
+
+        # An asyncio event loop.
+        dispatcher = AsyncioDispatcher(loop)
+
+        # A thread of its own.
+        dispatcher = ThreadDispatcher()
+
+        # Anything else that can call a function later on the right thread.
+        dispatcher = MarshallingDispatcher(invoke_later=...)
+
+e.g. To have all registry events delivered on the GUI thread::
+
+    application = MyApplication(dispatcher=GUIDispatcher(), ...)
+
+"""
+
+
+# Standard library imports.
+import logging
+import threading
+
+try:
+    import queue
+
+except ImportError:
+    import Queue as queue
+
+
+# Logging.
+logger = logging.getLogger(__name__)
+
+
+class Dispatcher(object):
+    """ A dispatcher that makes calls synchronously (the default). """
+
+    # True if calls are made as soon as they are dispatched (registries use
+    # this to skip any bookkeeping that only queued calls need).
+    synchronous = True
+
+    # True if calls with the same key are coalesced (i.e. a call is dropped
+    # if a call with the same key is already waiting to be made).
+    coalesce = False
+
+    def dispatch(self, function, args=(), key=None):
+        """ Call a function with some arguments (now or later!).
+
+        If a 'key' is specified, and the dispatcher coalesces calls, then the
+        call is dropped if a call with the same key is already waiting to be
+        made. This means that the function must work out what to do when it
+        is actually called (e.g. by looking at what has changed since the
+        last time it was called), rather than relying on its arguments.
+
+        """
+
+        function(*args)
+
+        return
+
+
+class QueuedDispatcher(Dispatcher):
+    """ A dispatcher that queues calls until it is flushed. """
+
+    synchronous = False
+
+    def __init__(self, coalesce=True):
+        """ Constructor. """
+
+        # True if calls with the same key are coalesced.
+        self.coalesce = coalesce
+
+        # The calls waiting to be made.
+        #
+        # [(key, function, args), ...]
+        self._queue = []
+
+        # The keys of the calls waiting to be made.
+        self._keys = set()
+
+        # A lock that makes dispatching calls safe from any thread.
+        self._lock = threading.Lock()
+
+        return
+
+    @property
+    def pending(self):
+        """ The number of calls waiting to be made. """
+
+        return len(self._queue)
+
+    def dispatch(self, function, args=(), key=None):
+        """ Call a function with some arguments (now or later!). """
+
+        with self._lock:
+            if key is not None and self.coalesce:
+                if key in self._keys:
+                    return
+
+                self._keys.add(key)
+
+            self._queue.append((key, function, args))
+            schedule = len(self._queue) == 1
+
+        # Let subclasses arrange for the queue to be flushed.
+        if schedule:
+            self._schedule_flush()
+
+        return
+
+    def flush(self):
+        """ Make all of the calls that are waiting to be made.
+
+        Calls that are dispatched while the queue is being flushed are made
+        too. An exception raised by a call is logged, and does not stop the
+        rest of the calls from being made.
+
+        """
+
+        while True:
+            with self._lock:
+                calls, self._queue = self._queue, []
+                self._keys.clear()
+
+            if len(calls) == 0:
+                break
+
+            for key, function, args in calls:
+                try:
+                    function(*args)
+
+                except Exception:
+                    logger.exception('error in dispatched call %s', function)
+
+        return
+
+    ###########################################################################
+    # Protected 'QueuedDispatcher' interface.
+    ###########################################################################
+
+    def _schedule_flush(self):
+        """ Arrange for the queue to be flushed.
+
+        This is called when a call is added to an empty queue. By default it
+        does nothing, i.e. the queue is only flushed when somebody calls
+        'flush'.
+
+        """
+
+        return
+
+
+class MarshallingDispatcher(QueuedDispatcher):
+    """ A dispatcher that makes calls on a target event loop. """
+
+    def __init__(self, invoke_later, coalesce=True):
+        """ Constructor.
+
+        'invoke_later' is a callable that takes a callable, and calls it
+        (with no arguments) on the target event loop, e.g.
+        'GUI.invoke_later' or 'loop.call_soon_threadsafe'. It must be safe to
+        call from any thread.
+
+        """
+
+        super(MarshallingDispatcher, self).__init__(coalesce=coalesce)
+
+        self.invoke_later = invoke_later
+
+        return
+
+    ###########################################################################
+    # Protected 'QueuedDispatcher' interface.
+    ###########################################################################
+
+    def _schedule_flush(self):
+        """ Arrange for the queue to be flushed. """
+
+        self.invoke_later(self.flush)
+
+        return
+
+
+class GUIDispatcher(MarshallingDispatcher):
+    """ A dispatcher that makes calls on the pyface GUI thread. """
+
+    def __init__(self, coalesce=True):
+        """ Constructor. """
+
+        # Do the import here so that pyface is only needed if this dispatcher
+        # is actually used.
+        from pyface.api import GUI
+
+        super(GUIDispatcher, self).__init__(GUI.invoke_later, coalesce)
+
+        return
+
+
+class AsyncioDispatcher(MarshallingDispatcher):
+    """ A dispatcher that makes calls on an asyncio event loop. """
+
+    def __init__(self, loop, coalesce=True):
+        """ Constructor. """
+
+        super(AsyncioDispatcher, self).__init__(
+            loop.call_soon_threadsafe, coalesce
+        )
+
+        # The event loop that calls are made on.
+        self.loop = loop
+
+        return
+
+
+class ThreadDispatcher(MarshallingDispatcher):
+    """ A dispatcher that makes calls on a thread of its own. """
+
+    def __init__(self, coalesce=True, name='envisage-dispatcher'):
+        """ Constructor. """
+
+        super(ThreadDispatcher, self).__init__(self._invoke_later, coalesce)
+
+        # The functions waiting to be called on the thread (None tells the
+        # thread to stop).
+        self._functions = queue.Queue()
+
+        # The thread that the calls are made on.
+        self.thread = threading.Thread(target=self._run, name=name)
+        self.thread.daemon = True
+        self.thread.start()
+
+        return
+
+    def stop(self, timeout=None):
+        """ Stop the thread (once any calls waiting to be made are made). """
+
+        self._functions.put(None)
+        self.thread.join(timeout)
+
+        return
+
+    ###########################################################################
+    # Private interface.
+    ###########################################################################
+
+    def _invoke_later(self, function):
+        """ Call a function on the thread. """
+
+        self._functions.put(function)
+
+        return
+
+    def _run(self):
+        """ The body of the thread. """
+
+        while True:
+            function = self._functions.get()
+            if function is None:
+                break
+
+            function()
+
+        return
+
+#### EOF ######################################################################
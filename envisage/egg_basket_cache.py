@@ -0,0 +1,477 @@
+""" An on-disk cache of the plugins found in eggs on a plugin path.
+
+Finding the plugins in a basket of eggs means scanning every directory on the
+plugin path, resolving the eggs' requirements against each other and sorting
+them into dependency order - on every launch. The cache remembers the result
+(the eggs in dependency order, and the entry points that each one offers),
+keyed by the modification times of the directories and the stats of the eggs
+themselves.
+
+If nothing has changed then the cached result is used as is (without opening
+any of the eggs). If eggs have been added, changed or removed then only those
+eggs are read, and the order is recomputed from the cached metadata of the
+rest in exactly the same way as a full scan does it. If the cache cannot
+vouch for the result (e.g. an egg's requirements are not satisfied by the
+other eggs in the basket) then the caller must fall back to a full scan.
+
+"""
+
+
+# Standard library imports.
+import json
+import logging
+import os
+import sys
+import zipimport
+from collections import OrderedDict
+from os.path import isdir, join
+
+# Enthought library imports.
+import pkg_resources
+from traits.util.toposort import topological_sort
+
+# Local imports.
+from .egg_utils import get_distributions_in_egg_order
+from .egg_utils import get_distributions_with_entry_point
+
+
+# Logging.
+logger = logging.getLogger(__name__)
+
+
+class EggBasketCache(object):
+    """ An on-disk cache of the plugins found in eggs on a plugin path. """
+
+    # The version of the format of the cache file (a file with any other
+    # version is ignored).
+    FORMAT_VERSION = 2
+
+    def __init__(self, filename):
+        """ Constructor. """
+
+        # The name of the file that the cache is stored in.
+        self.filename = filename
+
+        return
+
+    def find_distributions(self, plugin_path, entry_point_name):
+        """ Find the eggs on a plugin path using the cache.
+
+        Returns a tuple of the form '(distributions, entry_points)' where
+        'distributions' are all of the eggs on the plugin path in the order
+        that a full scan adds them to the working set, and 'entry_points' are
+        the contributions to the named entry point group in the order that a
+        full scan finds them.
+
+        None of the eggs are opened unless they are new or have changed (the
+        distributions read their metadata when it is first needed).
+
+        Returns None if the cache cannot be used, in which case the caller
+        must do a full scan (and should then call 'save').
+
+        """
+
+        manifest = self._load()
+        if manifest is None:
+            return None
+
+        if manifest['entry_point_name'] != entry_point_name:
+            return None
+
+        directories = manifest['directories']
+        listing = self._list_eggs(plugin_path, manifest)
+        if listing is None:
+            return None
+
+        eggs = manifest['eggs']
+
+        # Read (only) the eggs that are new or that have changed.
+        changed = manifest['directories'] != directories
+        for location, stat in listing.items():
+            egg = eggs.get(location)
+            if egg is None or egg['stat'] != stat:
+                egg = self._read_egg(location, stat, entry_point_name)
+                if egg is None:
+                    return None
+
+                eggs[location] = egg
+                changed = True
+
+        # Forget about eggs that have been removed.
+        for location in list(eggs):
+            if location not in listing:
+                del eggs[location]
+                changed = True
+
+        if changed:
+            logger.debug('egg basket cache <%s> updated', self.filename)
+            orders = self._get_egg_orders(eggs)
+            if orders is None:
+                return None
+
+            manifest['order'], manifest['entry_point_order'] = orders
+            self._save(manifest)
+
+        else:
+            logger.debug('egg basket cache <%s> is up to date', self.filename)
+
+        distributions = {}
+        for location in manifest['order']:
+            distributions[location] = self._create_distribution(location)
+
+        entry_points = []
+        for location in manifest['entry_point_order']:
+            entry_points.extend(
+                pkg_resources.EntryPoint.parse(
+                    text, dist=distributions[location]
+                )
+
+                for text in eggs[location]['entry_points']
+            )
+
+        return (
+            [distributions[location] for location in manifest['order']],
+            entry_points
+        )
+
+    def save(self, plugin_path, entry_point_name, working_set):
+        """ Save the result of a full scan of the plugin path.
+
+        'working_set' is the working set that the scan added the eggs on the
+        plugin path to (and nothing else).
+
+        Nothing is saved if the cache could not reproduce the result of the
+        scan (e.g. if it had to choose between several versions of an egg).
+
+        """
+
+        manifest = self._create_manifest(entry_point_name)
+
+        listing = self._list_eggs(plugin_path, manifest)
+        if listing is None:
+            return
+
+        # The order in which the scan added the eggs to the working set, and
+        # the order in which it finds their entry points (which only takes
+        # the eggs that actually have entry points into account).
+        distributions = list(working_set)
+        entry_point_distributions = get_distributions_in_egg_order(
+            working_set,
+            get_distributions_with_entry_point(working_set, entry_point_name)
+        )
+
+        locations = [distribution.location for distribution in distributions]
+        if set(locations) - set(listing):
+            return
+
+        environment = pkg_resources.Environment([])
+        eggs = manifest['eggs']
+        for location, stat in listing.items():
+            if location in locations:
+                continue
+
+            # Eggs that were not used because they are for another version of
+            # Python or another platform can be ignored, but if any others
+            # were not used then the scan chose between several versions of
+            # an egg, and it is simpler to let it do that every time.
+            distribution = self._get_distribution(location)
+            if distribution is None or environment.can_add(distribution):
+                return
+
+            eggs[location] = {'stat' : stat, 'ignored' : True}
+
+        for distribution in distributions:
+            eggs[distribution.location] = self._describe_distribution(
+                distribution, listing[distribution.location], entry_point_name
+            )
+
+        manifest['order'] = locations
+        manifest['entry_point_order'] = [
+            distribution.location
+            for distribution in entry_point_distributions
+        ]
+
+        # Make sure that the cache would rebuild the same result (otherwise
+        # it would give a different answer as soon as anything changes).
+        if self._get_egg_orders(eggs) != (
+            manifest['order'], manifest['entry_point_order']
+        ):
+            logger.debug('egg basket cache <%s> not saved', self.filename)
+            return
+
+        self._save(manifest)
+
+        return
+
+    ###########################################################################
+    # Private interface.
+    ###########################################################################
+
+    def _create_manifest(self, entry_point_name):
+        """ Create an empty manifest. """
+
+        manifest = {
+            'format_version'    : self.FORMAT_VERSION,
+            'python_version'    : '%d.%d' % sys.version_info[:2],
+            'entry_point_name'  : entry_point_name,
+            'directories'       : {},
+            'eggs'              : {},
+            'order'             : [],
+            'entry_point_order' : []
+        }
+
+        return manifest
+
+    def _create_distribution(self, location):
+        """ Create the distribution for an egg without opening it.
+
+        This is what 'pkg_resources' itself does when it finds an egg (the
+        project name, version etc. come from the name of the egg), except
+        that the egg's metadata is only read when it is first needed.
+
+        """
+
+        return pkg_resources.Distribution.from_filename(
+            location, metadata=LazyEggMetadata(location)
+        )
+
+    def _describe_distribution(self, distribution, stat, entry_point_name):
+        """ Return the cached description of an egg. """
+
+        egg = {
+            'stat'         : stat,
+            'project'      : distribution.key,
+            'version'      : distribution.version,
+            'requires'     : [str(r) for r in distribution.requires()],
+            'entry_points' : [
+                str(entry_point)
+
+                for entry_point
+                in distribution.get_entry_map(entry_point_name).values()
+            ]
+        }
+
+        return egg
+
+    def _get_distribution(self, location):
+        """ Return the distribution for the egg at a location (or None). """
+
+        for distribution in pkg_resources.find_distributions(location, True):
+            return distribution
+
+        return None
+
+    def _get_egg_orders(self, eggs):
+        """ Return the orders of the eggs as found by a full scan.
+
+        Returns a tuple of the form '(order, entry_point_order)' where
+        'order' is the order in which the scan adds the eggs to the working
+        set, and 'entry_point_order' is the dependency order of the eggs
+        that have entry points (see 'get_entry_points_in_egg_order').
+
+        Returns None if the eggs' requirements can't be satisfied by the
+        eggs themselves, or if there is more than one (usable) version of an
+        egg, as then a full scan is needed to resolve (or report) them.
+
+        """
+
+        by_project = {}
+        for location in eggs:
+            egg = eggs[location]
+            if egg.get('ignored'):
+                continue
+
+            if egg['project'] in by_project:
+                return None
+
+            by_project[egg['project']] = location
+
+        # The working set is in the order that 'WorkingSet.find_plugins'
+        # returns the eggs, i.e. sorted by distribution.
+        order = sorted(
+            by_project.values(),
+            key=lambda location: pkg_resources.Distribution.from_filename(
+                location
+            ).hashcmp
+        )
+
+        graph = {}
+        for location in order:
+            arcs = []
+            for text in eggs[location]['requires']:
+                requirement = pkg_resources.Requirement.parse(text)
+                required = by_project.get(requirement.key)
+                if required is None:
+                    return None
+
+                if eggs[required]['version'] not in requirement:
+                    return None
+
+                arcs.append(required)
+
+            graph[location] = arcs
+
+        # Only the eggs that have entry points are sorted (along with the
+        # eggs that they require directly), just as in a full scan.
+        entry_point_graph = OrderedDict(
+            (location, graph[location]) for location in order
+            if len(eggs[location]['entry_points']) > 0
+        )
+        entry_point_order = topological_sort(entry_point_graph)
+        entry_point_order.reverse()
+
+        return order, entry_point_order
+
+    def _list_eggs(self, plugin_path, manifest):
+        """ Return the stats of the eggs on the plugin path.
+
+        Returns a dictionary of the form '{ location : stat }', and records
+        the modification times of the directories in the manifest.
+
+        If the directories haven't changed since the manifest was written then
+        the eggs are the ones already in the manifest, so there is no need to
+        list the directories again.
+
+        Returns None if the plugin path contains anything that the cache
+        doesn't understand (i.e. distributions that are not eggs).
+
+        """
+
+        try:
+            directories = dict(
+                (directory, os.stat(directory).st_mtime)
+                for directory in plugin_path
+            )
+
+        except OSError:
+            return None
+
+        if directories == manifest['directories']:
+            locations = list(manifest['eggs'])
+
+        else:
+            locations = []
+            for directory in plugin_path:
+                for name in sorted(os.listdir(directory)):
+                    lower = name.lower()
+                    if lower.endswith(('.egg-info', '.dist-info', '.egg-link')):
+                        return None
+
+                    if lower.endswith('.egg'):
+                        locations.append(join(directory, name))
+
+            manifest['directories'] = directories
+
+        listing = {}
+        for location in locations:
+            stat = self._stat_egg(location)
+            if stat is None:
+                return None
+
+            listing[location] = stat
+
+        return listing
+
+    def _load(self):
+        """ Load the manifest from the cache file (or None). """
+
+        try:
+            with open(self.filename) as f:
+                manifest = json.load(f)
+
+        except (IOError, OSError, ValueError):
+            return None
+
+        expected = self._create_manifest(manifest.get('entry_point_name'))
+        for key in ['format_version', 'python_version']:
+            if manifest.get(key) != expected[key]:
+                return None
+
+        return manifest
+
+    def _read_egg(self, location, stat, entry_point_name):
+        """ Read the description of a new or changed egg (or None). """
+
+        distribution = self._get_distribution(location)
+        if distribution is None:
+            return None
+
+        if not pkg_resources.Environment([]).can_add(distribution):
+            return {'stat' : stat, 'ignored' : True}
+
+        return self._describe_distribution(
+            distribution, stat, entry_point_name
+        )
+
+    def _save(self, manifest):
+        """ Save the manifest to the cache file. """
+
+        # Write to a temporary file first so that a reader never sees a
+        # partially written cache.
+        temporary = '%s.%d.tmp' % (self.filename, os.getpid())
+        try:
+            with open(temporary, 'w') as f:
+                json.dump(manifest, f, indent=1, sort_keys=True)
+
+            if os.path.exists(self.filename):
+                os.remove(self.filename)
+            os.rename(temporary, self.filename)
+
+        except (IOError, OSError):
+            logger.exception('cannot save egg basket cache <%s>', self.filename)
+
+        return
+
+    def _stat_egg(self, location):
+        """ Return the stat of an egg (zipped or not) as a list (or None). """
+
+        # The metadata of an unzipped egg can change without changing the
+        # modification time of the egg directory itself.
+        path = location
+        if isdir(location):
+            path = join(location, 'EGG-INFO')
+
+        try:
+            stat = os.stat(path)
+
+        except OSError:
+            return None
+
+        return [stat.st_mtime, stat.st_size]
+
+class LazyEggMetadata(object):
+    """ The metadata of an egg that is only read when it is first needed. """
+
+    def __init__(self, location):
+        """ Constructor. """
+
+        # The location of the egg.
+        self.location = location
+
+        # The metadata provider (created when it is first needed).
+        self._metadata = None
+
+        return
+
+    def __getattr__(self, name):
+        """ Delegate to the egg's metadata provider. """
+
+        # Look in the instance dictionary so that a copy (which has not been
+        # initialized) doesn't recurse forever.
+        if self.__dict__.get('_metadata') is None:
+            if name.startswith('__') or 'location' not in self.__dict__:
+                raise AttributeError(name)
+
+            if isdir(self.location):
+                self._metadata = pkg_resources.PathMetadata(
+                    self.location, join(self.location, 'EGG-INFO')
+                )
+
+            else:
+                self._metadata = pkg_resources.EggMetadata(
+                    zipimport.zipimporter(self.location)
+                )
+
+        return getattr(self._metadata, name)
+
+#### EOF ######################################################################
@@ -4,10 +4,12 @@
 import logging, pkg_resources, sys
 import traceback
 
-from traits.api import Callable, Directory, List, on_trait_change
+from traits.api import Callable, Directory, List, Str, on_trait_change
 
+from .egg_basket_cache import EggBasketCache
 from .egg_utils import add_eggs_on_path, get_entry_points_in_egg_order
 from .plugin_manager import PluginManager
+from .profiler import profile
 
 
 logger = logging.getLogger(__name__)
@@ -53,6 +55,15 @@ class EggBasketPluginManager(PluginManager):
     # A list of directories that will be searched to find plugins.
     plugin_path = List(Directory)
 
+    # The name of a file used to cache the results of searching the plugin
+    # path between launches (if empty then the plugin path is searched from
+    # scratch every time).
+    #
+    # The cache is used as long as the directories on the plugin path and the
+    # eggs in them have not changed, and if eggs are added or removed then
+    # only those eggs are read (see 'EggBasketCache' for details).
+    discovery_cache = Str
+
     @on_trait_change('plugin_path[]')
     def _plugin_path_changed(self, obj, trait_name, removed, added):
         self._update_sys_dot_path(removed, added)
@@ -63,7 +74,8 @@ class EggBasketPluginManager(PluginManager):
     def __plugins_default(self):
         """ Trait initializer. """
 
-        plugins = self._harvest_plugins_in_eggs(self.application)
+        with profile('discover_plugins', 'plugin_manager'):
+            plugins = self._harvest_plugins_in_eggs(self.application)
 
         logger.debug('egg basket plugin manager found plugins <%s>', plugins)
 
@@ -74,7 +86,11 @@ class EggBasketPluginManager(PluginManager):
     def _create_plugin_from_entry_point(self, ep, application):
         """ Create a plugin from an entry point. """
 
-        klass  = ep.load()
+        with profile(
+            'load_entry_point', 'plugin_manager', entry_point=ep.name
+        ):
+            klass  = ep.load()
+
         plugin = klass(application=application)
 
         # Warn if the entry point is an old-style one where the LHS didn't have
@@ -96,23 +112,40 @@ class EggBasketPluginManager(PluginManager):
 
         return entry_points
 
+    def _get_plugin_entry_points_from_cache(self):
+        """ Return all plugin entry points using the discovery cache.
+
+        Returns None if the cache cannot be used.
+
+        """
+
+        cache = EggBasketCache(self.discovery_cache)
+        result = cache.find_distributions(
+            self.plugin_path, self.ENVISAGE_PLUGINS_ENTRY_POINT
+        )
+        if result is None:
+            return None
+
+        # Add the eggs to the global working set as otherwise the plugin
+        # classes can't be imported!
+        distributions, entry_points = result
+        for distribution in distributions:
+            pkg_resources.working_set.add(distribution)
+
+        return entry_points
+
     def _harvest_plugins_in_eggs(self, application):
         """ Harvest plugins found in eggs on the plugin path. """
 
-        # We first add the eggs to a local working set so that when we get
-        # the plugin entry points we don't pick up any from other eggs
-        # installed on sys.path.
-        plugin_working_set = pkg_resources.WorkingSet(self.plugin_path)
-        add_eggs_on_path(plugin_working_set, self.plugin_path,
-                         self._handle_broken_distributions)
+        entry_points = None
+        if len(self.discovery_cache) > 0:
+            entry_points = self._get_plugin_entry_points_from_cache()
 
-        # We also add the eggs to the global working set as otherwise the
-        # plugin classes can't be imported!
-        add_eggs_on_path(pkg_resources.working_set, self.plugin_path,
-                         self._handle_broken_distributions)
+        if entry_points is None:
+            entry_points = self._scan_for_plugin_entry_points()
 
         plugins = []
-        for entry_point in self._get_plugin_entry_points(plugin_working_set):
+        for entry_point in entry_points:
             if self._include_plugin(entry_point.name):
                 try:
                     plugin = self._create_plugin_from_entry_point(entry_point,
@@ -127,6 +160,39 @@ class EggBasketPluginManager(PluginManager):
 
         return plugins
 
+    def _scan_for_plugin_entry_points(self):
+        """ Return all plugin entry points by searching the plugin path. """
+
+        broken = []
+        def handle_broken_distributions(errors):
+            broken.append(errors)
+            self._handle_broken_distributions(errors)
+
+        # We first add the eggs to a local working set so that when we get
+        # the plugin entry points we don't pick up any from other eggs
+        # installed on sys.path.
+        plugin_working_set = pkg_resources.WorkingSet(self.plugin_path)
+        add_eggs_on_path(plugin_working_set, self.plugin_path,
+                         handle_broken_distributions)
+
+        # We also add the eggs to the global working set as otherwise the
+        # plugin classes can't be imported!
+        add_eggs_on_path(pkg_resources.working_set, self.plugin_path,
+                         self._handle_broken_distributions)
+
+        entry_points = self._get_plugin_entry_points(plugin_working_set)
+
+        # Only cache the results if all of the eggs could be used (otherwise
+        # the broken ones must be reported every time).
+        if len(self.discovery_cache) > 0 and len(broken) == 0:
+            cache = EggBasketCache(self.discovery_cache)
+            cache.save(
+                self.plugin_path, self.ENVISAGE_PLUGINS_ENTRY_POINT,
+                plugin_working_set
+            )
+
+        return entry_points
+
     def _handle_broken_distributions(self, errors):
         logger.error('Error loading distributions: %s', errors)
         if self.on_broken_distribution is None:
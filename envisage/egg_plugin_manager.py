@@ -10,6 +10,7 @@ from traits.api import Instance, List, Str
 # Local imports.
 from .egg_utils import get_entry_points_in_egg_order
 from .plugin_manager import PluginManager
+from .profiler import profile
 
 
 # Logging.
@@ -66,10 +67,14 @@ class EggPluginManager(PluginManager):
         """ Trait initializer. """
 
         plugins = []
-        for ep in get_entry_points_in_egg_order(self.working_set, self.PLUGINS):
-            if self._is_included(ep.name) and not self._is_excluded(ep.name):
-                plugin = self._create_plugin_from_ep(ep)
-                plugins.append(plugin)
+        with profile('discover_plugins', 'plugin_manager'):
+            entry_points = get_entry_points_in_egg_order(
+                self.working_set, self.PLUGINS
+            )
+            for ep in entry_points:
+                if self._include_plugin(ep.name):
+                    plugin = self._create_plugin_from_ep(ep)
+                    plugins.append(plugin)
 
         logger.debug('egg plugin manager found plugins <%s>', plugins)
 
@@ -82,7 +87,11 @@ class EggPluginManager(PluginManager):
     def _create_plugin_from_ep(self, ep):
         """ Create a plugin from an extension point. """
 
-        klass  = ep.load()
+        with profile(
+            'load_entry_point', 'plugin_manager', entry_point=ep.name
+        ):
+            klass  = ep.load()
+
         plugin = klass(application=self.application)
 
         # Warn if the entry point is an old-style one where the LHS didn't have
@@ -0,0 +1,201 @@
+""" An index of the extension metadata of 'HasTraits' classes.
+
+Finding the traits and methods that contribute to an extension point (or the
+traits that declare extension points) means scanning all of an object's
+traits (or methods) looking for the appropriate metadata. Extension registries
+do that for every provider and every extension point, so instead we scan each
+class once and keep the result.
+
+"""
+
+
+# Standard library imports.
+from types import FunctionType
+from weakref import WeakKeyDictionary
+
+
+class ExtensionIndex(object):
+    """ An index of the extension metadata of a 'HasTraits' class. """
+
+    __slots__ = (
+        'contributing_methods', 'contributing_traits',
+        'extension_point_traits', 'stamp'
+    )
+
+    def __init__(self, traits, cls=None):
+        """ Constructor.
+
+        'traits' is a dictionary of trait names and traits (as returned by
+        'HasTraits.traits'). If 'cls' is specified then the contributing
+        methods of the class are indexed too.
+
+        """
+
+        # The names of the methods that contribute to each extension point
+        # (i.e. methods decorated with 'contributes_to').
+        #
+        # { extension_point_id : [method_name, ...] }
+        self.contributing_methods = {}
+
+        # The names of the traits that contribute to each extension point.
+        #
+        # { extension_point_id : [trait_name, ...] }
+        self.contributing_traits = {}
+
+        # The names of the 'ExtensionPoint' traits.
+        self.extension_point_traits = []
+
+        # Anything that tells us if the index is out of date (set by whoever
+        # creates the index).
+        self.stamp = None
+
+        for trait_name, trait in traits.items():
+            if trait.__extension_point__:
+                self.extension_point_traits.append(trait_name)
+
+            extension_point_id = trait.contributes_to
+            if extension_point_id is not None:
+                self.contributing_traits.setdefault(
+                    extension_point_id, []
+                ).append(trait_name)
+
+        if cls is not None:
+            self._index_methods(cls)
+
+        return
+
+    ###########################################################################
+    # Private interface.
+    ###########################################################################
+
+    def _index_methods(self, cls):
+        """ Index the methods of a class that contribute to extension points.
+
+        """
+
+        # This mirrors 'HasTraits._each_trait_method', i.e. only the first
+        # definition of each name in the MRO counts.
+        seen = set()
+        for klass in cls.__mro__:
+            for name, method in klass.__dict__.items():
+                if type(method) is not FunctionType or name in seen:
+                    continue
+
+                seen.add(name)
+
+                extension_point_id = getattr(
+                    method, '__extension_point__', None
+                )
+                if extension_point_id is not None:
+                    self.contributing_methods.setdefault(
+                        extension_point_id, []
+                    ).append(name)
+
+        return
+
+
+# The index of each class.
+#
+# { cls : ExtensionIndex }
+_class_indexes = WeakKeyDictionary()
+
+# The index of each object that has instance traits, along with the class
+# index and the stamp of the instance traits that it was worked out from.
+#
+# { obj : (class_index, stamp, index) }
+_object_indexes = WeakKeyDictionary()
+
+# The number of times that the index of each class or object has been
+# invalidated (see 'invalidate_extension_index').
+#
+# { cls_or_obj : int }
+_generations = WeakKeyDictionary()
+
+
+def get_extension_index(obj):
+    """ Return the extension index of a 'HasTraits' object.
+
+    The index is shared by all instances of a class, and rebuilt if traits are
+    added to the class. If traits with different extension metadata have been
+    added to the object itself then it gets an index of its own.
+
+    """
+
+    cls = type(obj)
+    base_traits = cls.__base_traits__
+
+    # Traits can only be added to a class (not replaced), so the number of
+    # traits tells us if the class has changed. Anything that replaces a
+    # class trait must invalidate the index explicitly.
+    stamp = (_generations.get(cls, 0), len(base_traits))
+    index = _class_indexes.get(cls)
+    if index is None or index.stamp != stamp:
+        index = ExtensionIndex(base_traits, cls)
+        index.stamp = stamp
+        _class_indexes[cls] = index
+
+    instance_traits = obj._instance_traits()
+    if len(instance_traits) == 0:
+        return index
+
+    # Only look at the instance traits again if some have been added (e.g.
+    # by listening to a trait), or if the index of the object has been
+    # invalidated (e.g. because 'Plugin.add_trait' replaced a trait).
+    stamp = (_generations.get(obj, 0), len(instance_traits))
+    entry = _object_indexes.get(obj)
+    if entry is not None and entry[0] is index and entry[1] == stamp:
+        return entry[2]
+
+    object_index = index
+    if _has_instance_extension_metadata(instance_traits, base_traits):
+        object_index = ExtensionIndex(obj.traits(), cls)
+
+    _object_indexes[obj] = (index, stamp, object_index)
+
+    return object_index
+
+
+def invalidate_extension_index(cls_or_obj):
+    """ Invalidate the extension index of a class or object.
+
+    Call this after replacing a trait of a class or object, so that its index
+    is rebuilt the next time that it is asked for.
+
+    """
+
+    _generations[cls_or_obj] = _generations.get(cls_or_obj, 0) + 1
+
+    return
+
+
+def _has_instance_extension_metadata(instance_traits, base_traits):
+    """ Do any instance traits have extension metadata of their own? """
+
+    for trait_name, trait in instance_traits.items():
+        # Instance traits are usually just copies of class traits that have
+        # instance-specific listeners (and which share their metadata).
+        base_trait = base_traits.get(trait_name)
+        if base_trait is not None and trait.__dict__ is base_trait.__dict__:
+            continue
+
+        # The '_items' traits of list traits (and the like) are only added to
+        # the instance, and they inherit the metadata of the list trait.
+        if base_trait is None and trait_name.endswith('_items') \
+           and trait_name[:-len('_items')] in base_traits:
+            continue
+
+        contributes_to = trait.contributes_to
+        is_extension_point = bool(trait.__extension_point__)
+        if base_trait is None:
+            if contributes_to is None and not is_extension_point:
+                continue
+
+        elif (base_trait.contributes_to == contributes_to
+              and bool(base_trait.__extension_point__) == is_extension_point):
+            continue
+
+        return True
+
+    return False
+
+#### EOF ######################################################################
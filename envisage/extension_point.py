@@ -5,9 +5,10 @@
 import inspect, weakref
 
 # Enthought library imports.
-from traits.api import List, TraitType, Undefined, provides
+from traits.api import Dict, List, TraitType, Undefined, provides
 
 # Local imports.
+from .extension_index import get_extension_index
 from .i_extension_point import IExtensionPoint
 
 
@@ -54,8 +55,8 @@ def contributes_to(id):
 
 
 # Exception message template.
-INVALID_TRAIT_TYPE = 'extension points must be "List"s e.g. List, List(Int)' \
-' but a value of %s was specified.'
+INVALID_TRAIT_TYPE = 'extension points must be "List"s or "Dict"s e.g. ' \
+'List, List(Int), Dict but a value of %s was specified.'
 
 
 # Even though trait types do not themselves have traits, we can still
@@ -67,6 +68,36 @@ class ExtensionPoint(TraitType):
     Note that this is a trait *type* and hence does *NOT* have traits itself
     (i.e. it does *not* inherit from 'HasTraits').
 
+    An extension point can be *keyed*, in which case the extension registry
+    keeps a mapping from each contribution's key to the contribution, so that
+    contributions can be looked up by key without scanning them all (see
+    'IExtensionRegistry.get_keyed_extension'). If two contributions have the
+    same key then by default the last one wins (just like building a
+    dictionary), or the first one does if 'duplicates' is 'first'. Either
+    way, the registry logs a warning as soon as it sees the clash.
+
+    A 'Dict' extension point is keyed, and each contribution is a
+    '(key, value)' tuple, e.g::
+
+        class MyPlugin(Plugin):
+            namespace = ExtensionPoint(Dict, id='acme.namespace')
+
+            my_namespace = List(contributes_to='acme.namespace')
+
+            def _my_namespace_default(self):
+                return [('np', numpy)]
+
+    (or, equivalently, 'my_namespace = Dict(contributes_to=...)'). Reading the
+    trait gives the merged dictionary.
+
+    A 'List' extension point can be keyed by specifying 'key', which is either
+    the name of an attribute of each contribution, or a callable that takes a
+    contribution and returns its key, e.g::
+
+        tasks = ExtensionPoint(List(Instance(TaskFactory)), id=..., key='id')
+
+    Reading the trait still gives the list of contributions.
+
     """
 
     ###########################################################################
@@ -85,8 +116,9 @@ class ExtensionPoint(TraitType):
     def connect_extension_point_traits(obj):
         """ Connect all of the 'ExtensionPoint' traits on an object. """
 
-        for trait_name, trait in obj.traits(__extension_point__=True).items():
-            trait.trait_type.connect(obj, trait_name)
+        index = get_extension_index(obj)
+        for trait_name in index.extension_point_traits:
+            obj.trait(trait_name).trait_type.connect(obj, trait_name)
 
         return
 
@@ -94,8 +126,9 @@ class ExtensionPoint(TraitType):
     def disconnect_extension_point_traits(obj):
         """ Disconnect all of the 'ExtensionPoint' traits on an object. """
 
-        for trait_name, trait in obj.traits(__extension_point__=True).items():
-            trait.trait_type.disconnect(obj, trait_name)
+        index = get_extension_index(obj)
+        for trait_name in index.extension_point_traits:
+            obj.trait(trait_name).trait_type.disconnect(obj, trait_name)
 
         return
 
@@ -103,8 +136,18 @@ class ExtensionPoint(TraitType):
     # 'object' interface.
     ###########################################################################
 
-    def __init__(self, trait_type=List, id=None, **metadata):
-        """ Constructor. """
+    def __init__(self, trait_type=List, id=None, validate_extensions=True,
+                 key=None, duplicates='last', **metadata):
+        """ Constructor.
+
+        By default, the contributions to the extension point are validated
+        against the trait type every time the trait is read. If
+        'validate_extensions' is False then the contributions are assumed to
+        be valid, and reading the trait returns the extension registry's
+        immutable view of them (i.e. a tuple) without any copying or
+        validation.
+
+        """
 
         # We add '__extension_point__' to the metadata to make the extension
         # point traits easier to find with the 'traits' and 'trait_names'
@@ -119,19 +162,40 @@ class ExtensionPoint(TraitType):
         if inspect.isclass(trait_type):
             trait_type = trait_type()
 
-        # Currently, we only support list extension points (we may in the
-        # future want to allow other collections e.g. dictionaries etc).
-        if not isinstance(trait_type, List):
+        # We support list and dictionary extension points.
+        if not isinstance(trait_type, (List, Dict)):
             raise TypeError(INVALID_TRAIT_TYPE % trait_type)
 
         self.trait_type = trait_type
 
+        # How to get the key of each contribution (None for a 'Dict' extension
+        # point means that each contribution is a '(key, value)' tuple).
+        if key is not None and isinstance(trait_type, Dict):
+            raise ValueError('the contributions to a "Dict" extension point '
+                             'are "(key, value)" tuples, so "key" cannot be '
+                             'specified')
+
+        self.key = key
+
+        # Which contribution wins if more than one has the same key ('first'
+        # or 'last').
+        if duplicates not in ('first', 'last'):
+            raise ValueError('"duplicates" must be "first" or "last"')
+
+        self.duplicates = duplicates
+
+        # Is the extension point keyed?
+        self.keyed = key is not None or isinstance(trait_type, Dict)
+
         # The Id of the extension point.
         if id is None:
             raise ValueError('an extension point must have an Id')
 
         self.id = id
 
+        # Should the contributions be validated every time they are read?
+        self.validate_extensions = validate_extensions
+
         # A dictionary that is used solely to keep a reference to all extension
         # point listeners alive until their associated objects are garbage
         # collected.
@@ -154,6 +218,20 @@ class ExtensionPoint(TraitType):
 
         extension_registry = self._get_extension_registry(obj)
 
+        # The contributions to a dictionary extension point are merged (by
+        # the registry) into a single dictionary.
+        if isinstance(self.trait_type, Dict):
+            mapping = extension_registry.get_extensions_mapping(self.id)
+            if not self.validate_extensions:
+                return mapping
+
+            return self.trait_type.validate(obj, trait_name, mapping)
+
+        # If the contributions are known to be valid then there is no need to
+        # copy them or to check them.
+        if not self.validate_extensions:
+            return extension_registry.get_extensions_view(self.id)
+
         # Get the extensions to this extension point.
         extensions = extension_registry.get_extensions(self.id)
 
@@ -165,6 +243,11 @@ class ExtensionPoint(TraitType):
 
         extension_registry = self._get_extension_registry(obj)
 
+        # The extensions to a dictionary extension point are always stored
+        # as '(key, value)' tuples.
+        if isinstance(self.trait_type, Dict):
+            value = list(value.items())
+
         # Note that some extension registry implementations may not support the
         # setting of extension points (the default, plugin extension registry
         # for exxample ;^).
@@ -236,6 +319,29 @@ class ExtensionPoint(TraitType):
 
         return
 
+    def get_key(self, extension):
+        """ Return the key of a contribution to a keyed extension point. """
+
+        if self.key is None:
+            return extension[0]
+
+        if callable(self.key):
+            return self.key(extension)
+
+        return getattr(extension, self.key)
+
+    def get_value(self, extension):
+        """ Return the value of a contribution to a keyed extension point.
+
+        This is the value that the contribution's key maps to.
+
+        """
+
+        if self.key is None:
+            return extension[1]
+
+        return extension
+
     ###########################################################################
     # Private interface.
     ###########################################################################
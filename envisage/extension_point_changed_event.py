@@ -8,11 +8,17 @@ from traits.api import TraitListEvent
 class ExtensionPointChangedEvent(TraitListEvent):
     """ An event fired when an extension point's extensions have changed. """
 
-    def __init__ (self, extension_point_id=None, **kw):
+    __slots__ = ('extension_point_id',)
+
+    def __init__(
+        self, extension_point_id=None, index=0, removed=None, added=None
+    ):
         """ Constructor. """
 
         # The base class has the 'index', 'removed' and 'added' attributes.
-        super(ExtensionPointChangedEvent, self).__init__(**kw)
+        super(ExtensionPointChangedEvent, self).__init__(
+            index=index, removed=removed, added=added
+        )
 
         # We add the extension point Id.
         self.extension_point_id = extension_point_id
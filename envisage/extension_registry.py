@@ -2,15 +2,18 @@
 
 
 # Standard library imports.
+from contextlib import contextmanager
 import logging
 
 # Enthought library imports.
-from traits.api import Dict, HasTraits, provides
+from traits.api import Dict, HasTraits, Instance, Int, provides
 
 # Local imports.
+from .dispatcher import Dispatcher
 from .extension_point_changed_event import ExtensionPointChangedEvent
+from .profiler import profile
 from .i_extension_registry import IExtensionRegistry
-from . import safeweakref
+from .listener_table import ListenerTable
 from .unknown_extension_point import UnknownExtensionPoint
 
 
@@ -22,6 +25,13 @@ logger = logging.getLogger(__name__)
 class ExtensionRegistry(HasTraits):
     """ A base class for extension registry implementation. """
 
+    #### 'ExtensionRegistry' interface ########################################
+
+    # The dispatcher used to call the extension point listeners (see
+    # 'envisage.dispatcher'). By default listeners are called synchronously,
+    # on the thread that changed the registry.
+    dispatcher = Instance(Dispatcher, ())
+
     ###########################################################################
     # Protected 'ExtensionRegistry' interface.
     ###########################################################################
@@ -32,18 +42,45 @@ class ExtensionRegistry(HasTraits):
     # The extension points that have been added *explicitly*.
     _extension_points = Dict
 
+    # The contributions to each keyed extension point (that has been accessed
+    # or set) by key.
+    #
+    # { extension_point_id : { key : value } }
+    #
+    # The mappings are kept up to date as contributions are added and
+    # removed. A mapping is never changed once it has been published if the
+    # registry can be read from multiple threads (it is replaced instead).
+    _mappings = Dict
+
+    # The keys that are contributed more than once to each keyed extension
+    # point that has a mapping (the last contribution with the key wins).
+    #
+    # { extension_point_id : set(key) }
+    _duplicate_keys = Dict
+
     # Extension listeners.
     #
     # These are called when extensions are added to or removed from an
     # extension point.
     #
-    # e.g. Dict(extension_point, [weakref.ref(callable)])
+    # The listeners are weakly referenced, and removed from the table when
+    # they die.
     #
     # A listener is any Python callable with the following signature:-
     #
     # def listener(extension_registry, extension_point_changed_event):
     #     ...
-    _listeners = Dict
+    _listeners = Instance(ListenerTable, ())
+
+    # The depth of nested batches (see 'batch').
+    _batch_depth = Int
+
+    # The contributions to each extension point that has changed during the
+    # current batch (or, if the dispatcher coalesces changes, since the
+    # listeners were last called), as they were *before* the first change.
+    #
+    # { extension_point_id : list }
+    _batch_before = Dict
 
     ###########################################################################
     # 'IExtensionRegistry' interface.
@@ -52,8 +89,7 @@ class ExtensionRegistry(HasTraits):
     def add_extension_point_listener(self, listener, extension_point_id=None):
         """ Add a listener for extensions being added or removed. """
 
-        listeners = self._listeners.setdefault(extension_point_id, [])
-        listeners.append(safeweakref.ref(listener))
+        self._listeners.add(listener, extension_point_id)
 
         return
 
@@ -61,6 +97,7 @@ class ExtensionRegistry(HasTraits):
         """ Add an extension point. """
 
         self._extension_points[extension_point.id] = extension_point
+        self._discard_mapping(extension_point.id)
         logger.debug('extension point <%s> added', extension_point.id)
 
         return
@@ -75,16 +112,32 @@ class ExtensionRegistry(HasTraits):
 
         return self._extension_points.get(extension_point_id)
 
+    def get_extensions_mapping(self, extension_point_id):
+        """ Return the contributions to a keyed extension point by key. """
+
+        return dict(self._get_mapping(extension_point_id))
+
+    def get_extensions_view(self, extension_point_id):
+        """ Return an immutable view of the extensions to an extension point.
+
+        """
+
+        return tuple(self._get_extensions(extension_point_id))
+
     def get_extension_points(self):
         """ Return all extension points. """
 
         return list(self._extension_points.values())
 
+    def get_keyed_extension(self, extension_point_id, key, default=None):
+        """ Return the contribution to a keyed extension point with a key. """
+
+        return self._get_mapping(extension_point_id).get(key, default)
+
     def remove_extension_point_listener(self,listener,extension_point_id=None):
         """ Remove a listener for extensions being added or removed. """
 
-        listeners = self._listeners.setdefault(extension_point_id, [])
-        listeners.remove(safeweakref.ref(listener))
+        self._listeners.remove(listener, extension_point_id)
 
         return
 
@@ -92,9 +145,11 @@ class ExtensionRegistry(HasTraits):
         """ Remove an extension point. """
 
         self._check_extension_point(extension_point_id)
+        self._remember_extensions(extension_point_id)
 
         # Remove the extension point.
         del self._extension_points[extension_point_id]
+        self._discard_mapping(extension_point_id)
 
         # Remove any extensions to the extension point.
         if extension_point_id in self._extensions:
@@ -115,15 +170,53 @@ class ExtensionRegistry(HasTraits):
         """ Set the extensions contributed to an extension point. """
 
         self._check_extension_point(extension_point_id)
+        self._remember_extensions(extension_point_id)
 
         old = self._get_extensions(extension_point_id)
         self._extensions[extension_point_id] = extensions
 
+        extension_point = self._extension_points[extension_point_id]
+        if self._is_keyed(extension_point):
+            self._set_mapping(extension_point, extensions)
+
         refs = self._get_listener_refs(extension_point_id)
         self._call_listeners(refs, extension_point_id, extensions, old, None)
 
         return
 
+    ###########################################################################
+    # 'ExtensionRegistry' interface.
+    ###########################################################################
+
+    @contextmanager
+    def batch(self):
+        """ A context manager that batches changes to the registry.
+
+        Listeners are not called for changes made inside the 'with' block.
+        Instead, when the (outermost) block exits, each listener is called at
+        most once per extension point, with a single event that describes the
+        net change to its contributions, e.g::
+
+            with extension_registry.batch():
+                for provider in providers:
+                    extension_registry.add_provider(provider)
+
+        Batches can be nested, in which case the listeners are called when
+        the outermost batch exits.
+
+        """
+
+        self._batch_depth += 1
+        try:
+            yield self
+
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._flush_batch()
+
+        return
+
     ###########################################################################
     # Protected 'ExtensionRegistry' interface.
     ###########################################################################
@@ -131,17 +224,48 @@ class ExtensionRegistry(HasTraits):
     def _call_listeners(self, refs, extension_point_id, added, removed, index):
         """ Call listeners that are listening to an extension point. """
 
-        event = ExtensionPointChangedEvent(
-            extension_point_id = extension_point_id,
-            added              = added,
-            removed            = removed,
-            index              = index
-        )
+        dispatcher = self.dispatcher
+
+        # If we are in a batch (or the dispatcher coalesces changes) then we
+        # just need to know what the contributions looked like before the
+        # first change (see '_remember_extensions'). The listeners get called
+        # with the net change when the batch is finished, or when the
+        # dispatcher gets round to it.
+        if self._batch_depth > 0 or dispatcher.coalesce:
+            # Registries that don't remember the contributions before
+            # changing them fall back to undoing the change (which is only
+            # right if this is the whole change).
+            if extension_point_id not in self._batch_before:
+                # Outside of a batch, there is nothing to remember if nobody
+                # is listening.
+                if self._batch_depth == 0 and len(refs) == 0:
+                    return
+
+                self._batch_before[extension_point_id] = self._undo_change(
+                    extension_point_id, added, removed, index
+                )
+
+            if self._batch_depth == 0:
+                dispatcher.dispatch(
+                    self._notify_net_changes, key=(self, 'extensions')
+                )
+
+            return
+
+        # Don't bother creating an event if nobody is listening.
+        if len(refs) == 0:
+            return
+
+        if dispatcher.synchronous:
+            self._notify_listeners(
+                refs, extension_point_id, added, removed, index
+            )
 
-        for ref in refs:
-            listener = ref()
-            if listener is not None:
-                listener(self, event)
+        else:
+            dispatcher.dispatch(
+                self._notify_listeners,
+                (refs, extension_point_id, added, removed, index)
+            )
 
         return
 
@@ -157,24 +281,348 @@ class ExtensionRegistry(HasTraits):
 
         return
 
+    def _discard_mapping(self, extension_point_id):
+        """ Discard the mapping for the contributions to an extension point.
+
+        """
+
+        self._mappings.pop(extension_point_id, None)
+        self._duplicate_keys.pop(extension_point_id, None)
+
+        return
+
     def _get_extensions(self, extension_point_id):
         """ Return the extensions for the given extension point. """
 
         return self._extensions.setdefault(extension_point_id, [])
 
+    def _get_current_extensions(self, extension_point_id):
+        """ Return a copy of the current extensions to an extension point.
+
+        Unlike '_get_extensions' this never adds anything to the registry, so
+        it can safely be used for extension points that have been removed.
+
+        """
+
+        if extension_point_id not in self._extension_points:
+            return []
+
+        return list(self._get_extensions(extension_point_id))
+
+    def _get_mapping(self, extension_point_id):
+        """ Return the mapping for the contributions to a keyed extension
+        point.
+
+        The mapping is created the first time that it is needed.
+
+        """
+
+        mapping = self._mappings.get(extension_point_id)
+        if mapping is not None:
+            return mapping
+
+        # If we don't know about the extension point then it sure ain't got
+        # any extensions!
+        extension_point = self._extension_points.get(extension_point_id)
+        if extension_point is None:
+            return {}
+
+        if not self._is_keyed(extension_point):
+            raise ValueError(
+                'extension point <%s> is not keyed' % extension_point_id
+            )
+
+        # Getting the extensions may create the mapping as a side effect
+        # (e.g. the provider extension registry creates it when it collects
+        # the contributions for the first time).
+        extensions = self._get_extensions(extension_point_id)
+
+        mapping = self._mappings.get(extension_point_id)
+        if mapping is None:
+            mapping = self._set_mapping(extension_point, extensions)
+
+        return mapping
+
     def _get_listener_refs(self, extension_point_id):
         """ Get weak references to all listeners to an extension point.
 
-        Returns a list containing the weak references to those listeners that
+        Returns a tuple containing the weak references to those listeners that
         are listening to this extension point specifically first, followed by
         those that are listening to any extension point.
 
         """
 
-        refs = []
-        refs.extend(self._listeners.get(extension_point_id, []))
-        refs.extend(self._listeners.get(None, []))
+        return self._listeners.get_refs(extension_point_id)
+
+    def _is_keyed(self, extension_point):
+        """ Is an extension point keyed? """
+
+        return getattr(extension_point, 'keyed', False)
+
+    def _remember_extensions(self, extension_point_id):
+        """ Remember the contributions to an extension point before a change.
+
+        This must be called *before* the registry is changed. If we are in a
+        batch (or the dispatcher coalesces changes) then the contributions
+        are remembered the first time that the extension point changes, so
+        that the listeners can be told about the net change later.
+
+        """
+
+        if self._batch_depth == 0 and not self.dispatcher.coalesce:
+            return
+
+        if extension_point_id in self._batch_before:
+            return
+
+        # Outside of a batch, there is nothing to remember if nobody is
+        # listening.
+        if self._batch_depth == 0:
+            if len(self._get_listener_refs(extension_point_id)) == 0:
+                return
+
+        self._batch_before[extension_point_id] = self._get_current_extensions(
+            extension_point_id
+        )
+
+        return
+
+    def _set_mapping(self, extension_point, extensions):
+        """ Create the mapping for the contributions to a keyed extension
+        point.
+
+        If more than one contribution has the same key then the first or the
+        last one wins (depending on the extension point's 'duplicates'), and
+        a warning is logged the first time that the key is seen to be
+        duplicated (i.e. when the offending contribution is made).
+
+        """
+
+        first_wins = getattr(extension_point, 'duplicates', 'last') == 'first'
+
+        mapping = {}
+        duplicates = set()
+        for extension in extensions:
+            key = extension_point.get_key(extension)
+            if key in mapping:
+                duplicates.add(key)
+                if first_wins:
+                    continue
+
+            mapping[key] = extension_point.get_value(extension)
+
+        old_duplicates = self._duplicate_keys.get(extension_point.id, ())
+        for key in duplicates.difference(old_duplicates):
+            logger.warning(
+                'key %r is contributed more than once to extension point '
+                '<%s> (the %s contribution is used)', key,
+                extension_point.id, 'first' if first_wins else 'last'
+            )
+
+        self._mappings[extension_point.id] = mapping
+        self._duplicate_keys[extension_point.id] = duplicates
+
+        return mapping
+
+    def _update_mapping(self, extension_point_id, added, removed, extensions,
+                        copy=False):
+        """ Update the mapping for the contributions to a keyed extension
+        point.
+
+        'extensions' are all of the contributions to the extension point
+        after the change (in order). They are only used if the change
+        involves a duplicated key, in which case the mapping is simply created
+        again. If 'copy' is True then the mapping is replaced rather than
+        changed (because readers on other threads may be using it).
+
+        """
+
+        # Extension points that aren't keyed (or that haven't been accessed
+        # yet) don't have a mapping to update.
+        mapping = self._mappings.get(extension_point_id)
+        if mapping is None:
+            return
+
+        extension_point = self._extension_points[extension_point_id]
+        duplicates = self._duplicate_keys.get(extension_point_id, ())
+
+        removed_keys = set(map(extension_point.get_key, removed))
+        added_keys = list(map(extension_point.get_key, added))
+
+        # If any key is (or is about to be) contributed more than once then
+        # working out which contribution wins means looking at all of them.
+        clashes = len(set(added_keys)) < len(added_keys) or any(
+            key in duplicates for key in removed_keys
+        ) or any(
+            key in duplicates or (key in mapping and key not in removed_keys)
+            for key in added_keys
+        )
+        if clashes:
+            self._set_mapping(extension_point, extensions)
+            return
+
+        if copy:
+            mapping = dict(mapping)
+
+        for key in removed_keys:
+            mapping.pop(key, None)
+
+        for key, extension in zip(added_keys, added):
+            mapping[key] = extension_point.get_value(extension)
+
+        self._mappings[extension_point_id] = mapping
+
+        return
+
+    ###########################################################################
+    # Private interface.
+    ###########################################################################
+
+    def _flush_batch(self):
+        """ Call the listeners for the changes made in a batch. """
+
+        # If the dispatcher coalesces changes then the changes made in the
+        # batch are reported along with any others when it gets round to it.
+        if self.dispatcher.coalesce:
+            self.dispatcher.dispatch(
+                self._notify_net_changes, key=(self, 'extensions')
+            )
+
+            return
+
+        batch_before, self._batch_before = self._batch_before, {}
+
+        changes = self._get_net_changes(batch_before)
+        for extension_point_id, added, removed, index in changes:
+            refs = self._get_listener_refs(extension_point_id)
+            self._call_listeners(
+                refs, extension_point_id, added, removed, index
+            )
+
+        return
+
+    def _get_net_changes(self, before):
+        """ Return the net changes made to some extension points.
+
+        'before' is a dictionary containing the contributions to each
+        extension point before the changes were made.
+
+        Returns a list of (extension_point_id, added, removed, index) tuples.
+
+        """
+
+        changes = []
+        for extension_point_id, before in before.items():
+            after = self._get_current_extensions(extension_point_id)
+
+            # Only the part of the list that actually changed goes into the
+            # event, i.e. we skip any contributions that are the same at the
+            # start and at the end of the list.
+            start = 0
+            limit = min(len(before), len(after))
+            while start < limit and before[start] is after[start]:
+                start += 1
+
+            end_before = len(before)
+            end_after = len(after)
+            while end_before > start and end_after > start \
+                  and before[end_before - 1] is after[end_after - 1]:
+                end_before -= 1
+                end_after -= 1
+
+            removed = before[start:end_before]
+            added = after[start:end_after]
+
+            # Changes may cancel each other out!
+            if len(added) == 0 and len(removed) == 0:
+                continue
+
+            changes.append((extension_point_id, added, removed, start))
+
+        return changes
+
+    def _notify_listeners(self, refs, extension_point_id, added, removed,
+                          index):
+        """ Call the listeners to an extension point with a changed event.
+
+        """
+
+        event = ExtensionPointChangedEvent(
+            extension_point_id = extension_point_id,
+            added              = added,
+            removed            = removed,
+            index              = index
+        )
+
+        for ref in refs:
+            listener = ref()
+            if listener is not None:
+                with profile(
+                    'call_listener', 'extension_point',
+                    extension_point=extension_point_id
+                ):
+                    listener(self, event)
+
+        return
+
+    def _notify_net_changes(self):
+        """ Call the listeners with the net changes since they were last
+        called.
+
+        This is dispatched by dispatchers that coalesce changes.
+
+        """
+
+        # Changes made during a batch are reported when the batch finishes.
+        if self._batch_depth > 0:
+            return
+
+        batch_before, self._batch_before = self._batch_before, {}
+
+        changes = self._get_net_changes(batch_before)
+        for extension_point_id, added, removed, index in changes:
+            refs = self._get_listener_refs(extension_point_id)
+            if len(refs) > 0:
+                self._notify_listeners(
+                    refs, extension_point_id, added, removed, index
+                )
+
+        return
+
+    def _undo_change(self, extension_point_id, added, removed, index):
+        """ Return the contributions to an extension point before a change.
+
+        The change has already been made to the registry, so we take the
+        current contributions and undo it.
+
+        """
+
+        # An index of None means that *all* of the contributions were replaced.
+        if index is None:
+            return list(removed)
+
+        before = self._get_current_extensions(extension_point_id)
+
+        if isinstance(index, slice):
+            start, stop, step = index.start or 0, index.stop, index.step
+
+            # Extended slices either replace items in place, or delete them.
+            if step is not None and step != 1:
+                positions = range(start, start + step * len(removed), step)
+                if len(added) == len(removed):
+                    for position, item in zip(positions, removed):
+                        before[position] = item
+
+                else:
+                    for position, item in zip(positions, removed):
+                        before.insert(position, item)
+
+                return before
+
+            index = start
+
+        before[index:index + len(added)] = removed
 
-        return refs
+        return before
 
 #### EOF ######################################################################
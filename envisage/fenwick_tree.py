@@ -0,0 +1,124 @@
+""" A Fenwick tree (binary indexed tree) of prefix sums. """
+
+
+class FenwickTree(object):
+    """ A Fenwick tree (binary indexed tree) of prefix sums.
+
+    This is used to find the offset of a single provider's contributions
+    within *all* of the contributions to an extension point, without having
+    to add up the number of contributions made by every provider before it.
+
+    Getting a value takes O(1) time. Setting and appending a value, and
+    getting a prefix sum all take O(log n) time.
+
+    """
+
+    def __init__(self, values=()):
+        """ Constructor.
+
+        The tree is built from the initial values in O(n) time.
+
+        """
+
+        # The values themselves (so that getting a value is O(1)).
+        self._values = list(values)
+
+        # The tree itself is 1-based, so index 0 is never used.
+        tree = [0]
+        tree.extend(self._values)
+
+        size = len(tree) - 1
+        for i in range(1, size + 1):
+            parent = i + (i & -i)
+            if parent <= size:
+                tree[parent] += tree[i]
+
+        self._tree = tree
+
+        # The sum of all of the values.
+        self._total = self.prefix_sum(size)
+
+        return
+
+    def __getitem__(self, index):
+        """ Return the value at the specified (0-based) index. """
+
+        return self._values[index]
+
+    def __len__(self):
+        """ Return the number of values in the tree. """
+
+        return len(self._values)
+
+    def __setitem__(self, index, value):
+        """ Set the value at the specified (0-based) index. """
+
+        delta = value - self._values[index]
+        if delta != 0:
+            self.add(index, delta)
+
+        return
+
+    @property
+    def total(self):
+        """ The sum of all of the values in the tree. """
+
+        return self._total
+
+    def add(self, index, delta):
+        """ Add 'delta' to the value at the specified (0-based) index. """
+
+        self._values[index] += delta
+
+        tree = self._tree
+        size = len(tree) - 1
+
+        i = index + 1
+        while i <= size:
+            tree[i] += delta
+            i += i & -i
+
+        self._total += delta
+
+        return
+
+    def append(self, value):
+        """ Append a value to the end of the tree. """
+
+        tree = self._tree
+
+        # The new node covers the values in the range (i - lowbit(i), i], so
+        # it is the new value plus the nodes that cover the rest of the range.
+        i = len(tree)
+        node = value
+        j = i - 1
+        stop = i - (i & -i)
+        while j > stop:
+            node += tree[j]
+            j -= j & -j
+
+        tree.append(node)
+        self._values.append(value)
+
+        self._total += value
+
+        return
+
+    def prefix_sum(self, index):
+        """ Return the sum of the values *before* the specified index.
+
+        i.e. the equivalent of 'sum(values[:index])'.
+
+        """
+
+        tree = self._tree
+
+        result = 0
+        i = index
+        while i > 0:
+            result += tree[i]
+            i -= i & -i
+
+        return result
+
+#### EOF ######################################################################
@@ -39,6 +39,16 @@ class IExtensionRegistry(Interface):
 
         """
 
+    def batch(self):
+        """ Return a context manager that batches changes to the registry.
+
+        Listeners are not called for changes made inside the 'with' block.
+        Instead, when the block exits, each listener is called at most once
+        per extension point with a single event that describes the net change
+        to the extension point's contributions.
+
+        """
+
     def get_extensions(self, extension_point_id):
         """ Return the extensions contributed to an extension point.
 
@@ -46,6 +56,30 @@ class IExtensionRegistry(Interface):
 
         """
 
+    def get_extensions_mapping(self, extension_point_id):
+        """ Return the contributions to a keyed extension point by key.
+
+        Returns a dictionary that maps each contribution's key to its value
+        (see 'ExtensionPoint'). The registry keeps the mapping up to date as
+        contributions are added and removed, so this never has to look at the
+        contributions themselves.
+
+        Return an empty dictionary if the extension point does not exist, and
+        raise a 'ValueError' if the extension point is not keyed.
+
+        """
+
+    def get_extensions_view(self, extension_point_id):
+        """ Return an immutable view of the extensions to an extension point.
+
+        This is the same as 'get_extensions', except that the contributions
+        are returned as a tuple that the registry may share between callers
+        (and so it can be cheaper than 'get_extensions').
+
+        Return an empty tuple if the extension point does not exist.
+
+        """
+
     def get_extension_point(self, extension_point_id):
         """ Return the extension point with the specified Id.
 
@@ -58,6 +92,15 @@ class IExtensionRegistry(Interface):
 
         """
 
+    def get_keyed_extension(self, extension_point_id, key, default=None):
+        """ Return the contribution to a keyed extension point with a key.
+
+        Return the default if there is no such contribution (or no such
+        extension point), and raise a 'ValueError' if the extension point is
+        not keyed.
+
+        """
+
     def remove_extension_point_listener(self,listener,extension_point_id=None):
         """ Remove a listener for extensions being added or removed.
 
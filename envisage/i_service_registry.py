@@ -30,6 +30,24 @@ class IServiceRegistry(Interface):
     # An event that is fired when a service is unregistered.
     unregistered = Event
 
+    # An event that is fired when services are registered in bulk. The value
+    # is the list of their Ids.
+    services_registered = Event
+
+    # An event that is fired when services are unregistered in bulk. The
+    # value is the list of their Ids.
+    services_unregistered = Event
+
+    def checkout(self, protocol, query='', minimize='', maximize=''):
+        """ Check out a service that matches the specified query.
+
+        Return a context manager that finds the service (just like
+        'get_service') when it is entered, and gives it back when it is
+        exited. Services registered with a pooled scope can only be got this
+        way.
+
+        """
+
     def get_service(self, protocol, query='', minimize='', maximize=''):
         """ Return at most one service that matches the specified query.
 
@@ -66,6 +84,27 @@ class IServiceRegistry(Interface):
 
         """
 
+    def iter_services(self, protocol, query=''):
+        """ Return an iterator over the services that match a query.
+
+        This is like 'get_services' except that the services are found
+        lazily, so service factories are only called for the services that
+        are actually iterated over.
+
+        """
+
+    def get_service_generation(self, protocol):
+        """ Return the generation of the services registered for a protocol.
+
+        The generation changes whenever the services registered against the
+        protocol change, so it can be used to tell when a cached service
+        should be looked up again.
+
+        Returns None if services registered against the protocol must not be
+        cached at all.
+
+        """
+
     def get_service_properties(self, service_id):
         """ Return the dictionary of properties associated with a service.
 
@@ -76,7 +115,18 @@ class IServiceRegistry(Interface):
 
         """
 
-    def register_service(self, protocol, obj, properties=None):
+    def get_service_stats(self, service_id):
+        """ Return the statistics for a service registered as a factory.
+
+        The statistics record how many times the factory has been called,
+        and how many requests for the service had to wait (and for how long).
+
+        If no such service exists a 'ValueError' exception is raised.
+
+        """
+
+    def register_service(self, protocol, obj, properties=None,
+                         scope='singleton'):
         """ Register a service.
 
         The protocol can be an actual class or interface, or the *name* of a
@@ -99,6 +149,24 @@ class IServiceRegistry(Interface):
         and returns an object. For *really* lazy loading, the factory can also
         be specified as a string which is used to import the callable.
 
+        The scope of a service factory decides which callers share which
+        service objects. It is either the name of a scope ('singleton' (the
+        default), 'per_thread' or 'transient') or a scope object such as
+        'pooled(max_size)' (see 'envisage.service_scope'). A scope object is
+        copied, so each registration has its own services and statistics.
+
+        """
+
+    def register_services(self, service_offers):
+        """ Register a number of services in a single transaction.
+
+        'service_offers' is an iterable of 'ServiceOffer's. Either all of the
+        services are registered or none of them are. Once they have all been
+        registered, a single 'services_registered' event is fired, followed
+        by a 'registered' event for each service.
+
+        Return the service Ids in the same order as the offers.
+
         """
 
     def set_service_properties(self, service_id, properties):
@@ -115,4 +183,16 @@ class IServiceRegistry(Interface):
 
         """
 
+    def unregister_services(self, service_ids):
+        """ Unregister a number of services in a single transaction.
+
+        Either all of the services are unregistered or none of them are. Once
+        they have all been unregistered, a single 'services_unregistered'
+        event is fired, followed by an 'unregistered' event for each service.
+
+        If any of the services don't exist a 'ValueError' exception is
+        raised.
+
+        """
+
 #### EOF ######################################################################
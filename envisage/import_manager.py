@@ -8,6 +8,116 @@ from traits.api import HasTraits, provides
 from .i_import_manager import IImportManager
 
 
+class SymbolCache(object):
+    """ A process-wide cache of imported symbols.
+
+    Once a symbol has been imported, importing it again is just a dictionary
+    lookup. Failed imports can optionally be remembered too (a 'negative'
+    cache), so that repeatedly asking for a symbol that cannot be imported
+    does not go back to the import machinery every time.
+
+    If the code behind a symbol changes (e.g. after a 'refresh code') the
+    cache must be invalidated.
+
+    """
+
+    def __init__(self, cache_failures=False):
+        """ Constructor. """
+
+        # Should failed imports be cached?
+        self.cache_failures = cache_failures
+
+        # The number of imports satisfied from the cache (including cached
+        # failures).
+        self.hits = 0
+
+        # The number of imports that had to be done for real.
+        self.misses = 0
+
+        # The symbols that have been imported.
+        #
+        # { symbol_path : symbol }
+        self._symbols = {}
+
+        # The exceptions raised by imports that failed (only populated if
+        # 'cache_failures' is True).
+        #
+        # { symbol_path : exception }
+        self._failures = {}
+
+        return
+
+    def __contains__(self, symbol_path):
+        """ Return True if the symbol (or its failure) is in the cache. """
+
+        return symbol_path in self._symbols or symbol_path in self._failures
+
+    def get_symbol(self, symbol_path, import_symbol):
+        """ Return the symbol at the specified path.
+
+        If the symbol is not in the cache then 'import_symbol' is called with
+        the symbol path to import it.
+
+        """
+
+        try:
+            symbol = self._symbols[symbol_path]
+
+        except KeyError:
+            pass
+
+        else:
+            self.hits += 1
+            return symbol
+
+        exception = self._failures.get(symbol_path)
+        if exception is not None:
+            self.hits += 1
+
+            # Don't let the traceback grow every time we re-raise it!
+            exception.__traceback__ = None
+            raise exception
+
+        self.misses += 1
+        try:
+            symbol = import_symbol(symbol_path)
+
+        except Exception as exception:
+            if self.cache_failures:
+                self._failures[symbol_path] = exception
+
+            raise
+
+        self._symbols[symbol_path] = symbol
+
+        return symbol
+
+    def invalidate(self, symbol_path=None):
+        """ Remove a symbol (or, if no path is given, all symbols). """
+
+        if symbol_path is None:
+            self._symbols.clear()
+            self._failures.clear()
+
+        else:
+            self._symbols.pop(symbol_path, None)
+            self._failures.pop(symbol_path, None)
+
+        return
+
+    def reset_statistics(self):
+        """ Reset the hit and miss counters. """
+
+        self.hits = 0
+        self.misses = 0
+
+        return
+
+
+# The symbol cache shared by all import managers.
+symbol_cache = SymbolCache()
+
+
 @provides(IImportManager)
 class ImportManager(HasTraits):
     """ The default import manager implementation.
@@ -16,6 +126,9 @@ class ImportManager(HasTraits):
     will make debugging easier (as opposed to just letting imports happen from
     all over the place).
 
+    Imported symbols are remembered in the process-wide 'symbol_cache', so
+    importing the same symbol again is cheap.
+
     """
 
     ###########################################################################
@@ -25,6 +138,20 @@ class ImportManager(HasTraits):
     def import_symbol(self, symbol_path):
         """ Import the symbol defined by the specified symbol path. """
 
+        symbol = symbol_cache.get_symbol(symbol_path, self._import_symbol)
+
+        # Event notification.
+        self.symbol_imported = symbol
+
+        return symbol
+
+    ###########################################################################
+    # Private interface.
+    ###########################################################################
+
+    def _import_symbol(self, symbol_path):
+        """ Actually import the symbol defined by the symbol path. """
+
         if ':' in symbol_path:
             module_name, symbol_name = symbol_path.split(':')
 
@@ -43,15 +170,8 @@ class ImportManager(HasTraits):
 
             symbol = getattr(module, symbol_name)
 
-        # Event notification.
-        self.symbol_imported = symbol
-
         return symbol
 
-    ###########################################################################
-    # Private interface.
-    ###########################################################################
-
     def _import_module(self, module_name):
         """ Import the module with the specified (and possibly dotted) name.
 
@@ -0,0 +1,190 @@
+""" A table of weakly referenced listeners, keyed by extension point Id.
+
+Listeners are held by weak references so that registering a listener doesn't
+keep it (or the object that it is a method of) alive. When a listener dies its
+entry is removed from the table (via a weak reference callback), so the table
+doesn't fill up with dead entries as e.g. windows and views come and go.
+
+The listeners to each extension point (i.e. those listening to that extension
+point specifically, followed by those listening to all extension points) are
+kept in an immutable snapshot that is only rebuilt when listeners are added or
+removed, so dispatching an event doesn't allocate anything, and listeners can
+be added or removed (or die) while an event is being dispatched.
+
+"""
+
+
+# Standard library imports.
+import threading
+import weakref
+
+# Local imports.
+from . import safeweakref
+
+
+class ListenerTable(object):
+    """ A table of weakly referenced listeners, keyed by extension point Id.
+
+    Listeners that are registered with an Id of None listen to *all*
+    extension points.
+
+    """
+
+    def __init__(self):
+        """ Constructor. """
+
+        # The weak references to the listeners.
+        #
+        # { extension_point_id : [ref, ...] }
+        self._refs = {}
+
+        # The snapshot of the weak references to the listeners to each
+        # extension point.
+        #
+        # { extension_point_id : (ref, ...) }
+        self._snapshots = {}
+
+        # The weak references whose listeners have died, but that have not
+        # been removed from the table yet.
+        #
+        # [(extension_point_id, ref), ...]
+        self._pending_removals = []
+
+        # A lock that makes the table safe to use from multiple threads.
+        self._lock = threading.RLock()
+
+        return
+
+    def __len__(self):
+        """ Return the number of (live) listeners in the table. """
+
+        with self._lock:
+            self._remove_dead_refs()
+
+            return sum(len(refs) for refs in self._refs.values())
+
+    def add(self, listener, extension_point_id=None):
+        """ Add a listener to an extension point. """
+
+        with self._lock:
+            self._remove_dead_refs()
+
+            refs = self._refs.setdefault(extension_point_id, [])
+            refs.append(
+                self._create_ref(
+                    listener, self._create_callback(extension_point_id)
+                )
+            )
+
+            self._invalidate_snapshots(extension_point_id)
+
+        return
+
+    def get_refs(self, extension_point_id):
+        """ Return the weak references to the listeners to an extension point.
+
+        Returns a tuple containing the weak references to those listeners that
+        are listening to this extension point specifically first, followed by
+        those that are listening to any extension point.
+
+        """
+
+        refs = self._snapshots.get(extension_point_id)
+        if refs is None:
+            with self._lock:
+                self._remove_dead_refs()
+
+                refs = tuple(self._refs.get(extension_point_id, [])) \
+                    + tuple(self._refs.get(None, []))
+                self._snapshots[extension_point_id] = refs
+
+        return refs
+
+    def remove(self, listener, extension_point_id=None):
+        """ Remove a listener from an extension point.
+
+        Raise a 'ValueError' if the listener is not listening to the extension
+        point.
+
+        """
+
+        with self._lock:
+            self._remove_dead_refs()
+
+            refs = self._refs.get(extension_point_id, [])
+            refs.remove(self._create_ref(listener))
+            if len(refs) == 0:
+                self._refs.pop(extension_point_id, None)
+
+            self._invalidate_snapshots(extension_point_id)
+
+        return
+
+    ###########################################################################
+    # Private interface.
+    ###########################################################################
+
+    def _create_callback(self, extension_point_id):
+        """ Create the callback for a weak reference to a listener.
+
+        The callback removes the reference from the table when the listener
+        dies.
+
+        """
+
+        # The callback only holds a weak reference to the table so that the
+        # listeners don't keep the table alive.
+        table_ref = weakref.ref(self)
+
+        def callback(ref):
+            """ Called when a listener dies. """
+
+            table = table_ref()
+            if table is not None:
+                table._pending_removals.append((extension_point_id, ref))
+                table._snapshots = {}
+
+            return
+
+        return callback
+
+    def _create_ref(self, listener, callback=None):
+        """ Create a weak reference to a listener. """
+
+        # Bound methods need special treatment, as they are created on the fly
+        # (and so would die immediately), which 'safeweakref' takes care of.
+        return safeweakref.ref(listener, callback)
+
+    def _invalidate_snapshots(self, extension_point_id):
+        """ Discard the snapshots that include an extension point's refs. """
+
+        # Listeners to all extension points are in every snapshot.
+        if extension_point_id is None:
+            self._snapshots = {}
+
+        else:
+            self._snapshots.pop(extension_point_id, None)
+
+        return
+
+    def _remove_dead_refs(self):
+        """ Remove the weak references whose listeners have died. """
+
+        # The weak reference callbacks can be called at any time (e.g. while
+        # we are in the middle of adding a listener), so they just make a
+        # note of the dead references and we remove them here.
+        while self._pending_removals:
+            extension_point_id, ref = self._pending_removals.pop()
+
+            refs = self._refs.get(extension_point_id, [])
+            for index, other in enumerate(refs):
+                if other is ref:
+                    del refs[index]
+                    break
+
+            if len(refs) == 0:
+                self._refs.pop(extension_point_id, None)
+
+        return
+
+#### EOF ######################################################################
@@ -5,10 +5,13 @@ import inspect, logging, os
 from os.path import exists, join
 
 # Enthought library imports.
-from traits.api import Instance, List, Property, Str, provides
+from traits.api import Enum, Instance, List, Property, Str, TraitDictEvent
+from traits.api import provides
 from traits.util.camel_case import camel_case_to_words
 
 # Local imports.
+from .extension_index import get_extension_index
+from .extension_index import invalidate_extension_index
 from .extension_point import ExtensionPoint
 from .extension_provider import ExtensionProvider
 from .i_application import IApplication
@@ -19,6 +22,7 @@ from .i_plugin_activator import IPluginActivator
 from .i_service_registry import IServiceRegistry
 from .i_service_user import IServiceUser
 from .plugin_activator import PluginActivator
+from .sequence_diff import get_sequence_diff
 
 # Logging.
 logger = logging.getLogger(__name__)
@@ -62,6 +66,30 @@ class Plugin(ExtensionProvider):
     # just set it!
     name = Str
 
+    #### 'Plugin' interface ###################################################
+
+    # The Ids of the plugins that this plugin requires, i.e. plugins that must
+    # be started before (and stopped after) this one.
+    #
+    # The plugin manager refuses to start if a required plugin is missing.
+    requires = List(Str)
+
+    # The Ids of plugins that, *if* they are present, must be started before
+    # (and stopped after) this one.
+    after = List(Str)
+
+    # When the plugin is started.
+    #
+    # 'eager' - the plugin is started when the plugin manager is started.
+    #
+    # 'lazy'  - the plugin is started the first time that one of the extension
+    #           points that it offers is read, or one of the service offers
+    #           that it contributes is used to create a service (or if it is
+    #           started explicitly via 'application.start_plugin'). Note that
+    #           a lazy plugin that an eager plugin requires (or comes after)
+    #           is started eagerly.
+    activation = Enum('eager', 'lazy')
+
     #### 'IExtensionPointUser' interface ######################################
 
     # The extension registry that the object's extension points are stored in.
@@ -77,6 +105,45 @@ class Plugin(ExtensionProvider):
     # The Ids of the services that were automatically registered.
     _service_ids = List
 
+    ###########################################################################
+    # 'object' interface.
+    ###########################################################################
+
+    def __init__(self, **traits):
+        """ Constructor. """
+
+        # Listen for changes to the traits that contribute to extension points
+        # (and *only* those traits, so that plugins can change any other
+        # traits without the overhead of checking whether the change needs to
+        # be passed on to the extension registry). We do this before
+        # initializing the traits so that the same events are fired as if
+        # the traits were set later.
+        index = get_extension_index(self)
+        for trait_names in index.contributing_traits.values():
+            for trait_name in trait_names:
+                self._connect_contribution_trait(trait_name)
+
+        super(Plugin, self).__init__(**traits)
+
+        return
+
+    ###########################################################################
+    # 'HasTraits' interface.
+    ###########################################################################
+
+    def add_trait(self, name, *trait):
+        """ Add a trait to the object. """
+
+        super(Plugin, self).add_trait(name, *trait)
+
+        # The trait might have replaced one with different extension metadata.
+        invalidate_extension_index(self)
+
+        if self.trait(name).contributes_to is not None:
+            self._connect_contribution_trait(name)
+
+        return
+
     ###########################################################################
     # 'IExtensionPointUser' interface.
     ###########################################################################
@@ -102,10 +169,12 @@ class Plugin(ExtensionProvider):
     def get_extension_points(self):
         """ Return the extension points offered by the provider. """
 
+        index = get_extension_index(self)
+
         extension_points = [
-            trait.trait_type
+            self.trait(trait_name).trait_type
 
-            for trait in self.traits(__extension_point__=True).values()
+            for trait_name in index.extension_point_traits
         ]
 
         return extension_points
@@ -119,26 +188,30 @@ class Plugin(ExtensionProvider):
         # fixme: We make this restriction in case that in future we can wire up
         # the list traits directly. If we don't end up doing that then it is
         # fine to allow mutiple traits!
-        trait_names = self.trait_names(contributes_to=extension_point_id)
+        #
+        # The contributing traits (and methods) are found via the class's
+        # extension index rather than by scanning the metadata of every trait.
+        index = get_extension_index(self)
+        trait_names = index.contributing_traits.get(extension_point_id, [])
 
         # FIXME: This is a temporary fix, which was necessary due to the
         #        namespace refactor, but should be removed at some point.
         if len(trait_names) == 0:
             old_id = 'enthought.' + extension_point_id
-            trait_names = self.trait_names(contributes_to=old_id)
+            trait_names = index.contributing_traits.get(old_id, [])
 #            if trait_names:
 #                print 'deprecated:', old_id
 
         if len(trait_names) == 0:
             # If there is no contributing trait then look for any decorated
             # methods.
-            extensions = self._harvest_methods(extension_point_id)
+            extensions = self._harvest_methods(extension_point_id, index)
 
             # FIXME: This is a temporary fix, which was necessary due to the
             #        namespace refactor, but should be removed at some point.
             if not extensions:
                 old_id = 'enthought.' + extension_point_id
-                extensions = self._harvest_methods(old_id)
+                extensions = self._harvest_methods(old_id, index)
 #                if extensions:
 #                    print 'deprecated:', old_id
 
@@ -272,8 +345,8 @@ class Plugin(ExtensionProvider):
         service_ids = self._service_ids[:]
         service_ids.reverse()
 
-        for service_id in service_ids:
-            self.application.unregister_service(service_id)
+        if len(service_ids) > 0:
+            self.application.unregister_services(service_ids)
 
         # Just in case the plugin is started again!
         self._service_ids = []
@@ -286,28 +359,43 @@ class Plugin(ExtensionProvider):
 
     #### Trait change handlers ################################################
 
-    def _anytrait_changed(self, trait_name, old, new):
-        """ Static trait change handler. """
+    def _contribution_trait_changed(self, obj, trait_name, old, new):
+        """ Dynamic trait change handler for contribution traits. """
+
+        # The handler is used for both the trait and its '_items' trait.
+        if trait_name.endswith('_items'):
+            trait_name = trait_name[:-len('_items')]
+            trait = self.trait(trait_name)
+
+            # Contributions made via a dictionary are '(key, value)' tuples
+            # (see '_get_extensions_from_trait'), and a dictionary doesn't
+            # have indices, so we replace all of them.
+            if isinstance(new, TraitDictEvent):
+                current = getattr(self, trait_name)
+                old = dict(
+                    (key, value) for key, value in current.items()
+                    if key not in new.added
+                )
+                old.update(new.changed)
+                old.update(new.removed)
+                changes = [(0, list(old.items()), list(current.items()))]
 
-        # Ignore the '_items' part of the trait name (if it is there!), and get
-        # the actual trait.
-        base_trait_name = trait_name.split('_items')[0]
-        trait           = self.trait(base_trait_name)
+            else:
+                changes = [(new.index, new.removed, new.added)]
 
-        # If the trait is one that contributes to an extension point then fire
-        # an appropriate 'extension point changed' event.
-        if trait.contributes_to is not None:
-            if trait_name.endswith('_items'):
-                added   = new.added
-                removed = new.removed
-                index   = new.index
+        elif isinstance(new, dict):
+            trait = self.trait(trait_name)
+            changes = [(0, list(old.items()), list(new.items()))]
 
-            else:
-                added   = new
-                removed = old
-                index   = slice(0, max(len(old), len(new)))
+        # If a whole new list has been assigned then we only tell the
+        # extension registry about the items that have actually changed (so
+        # that listeners don't have to redo any work for the others).
+        else:
+            trait = self.trait(trait_name)
+            changes = get_sequence_diff(old, new)
 
-            # Let the extension registry know about the change.
+        # Let the extension registry know about the change(s).
+        for index, removed, added in changes:
             self._fire_extension_point_changed(
                 trait.contributes_to, added, removed, index
             )
@@ -316,6 +404,22 @@ class Plugin(ExtensionProvider):
 
     #### Methods ##############################################################
 
+    def _connect_contribution_trait(self, trait_name):
+        """ Listen for changes to a trait that contributes to an extension
+        point.
+
+        """
+
+        self.on_trait_change(self._contribution_trait_changed, trait_name)
+
+        # Only list traits (and the like) have an '_items' trait.
+        if self.trait(trait_name + '_items') is not None:
+            self.on_trait_change(
+                self._contribution_trait_changed, trait_name + '_items'
+            )
+
+        return
+
     def _create_multiple_traits_exception(self, extension_point_id):
         """ Create the exception raised when multiple traits are found. """
 
@@ -339,6 +443,11 @@ class Plugin(ExtensionProvider):
             )
             raise
 
+        # The contributions made via a dictionary are its '(key, value)'
+        # tuples (for a keyed extension point, see 'ExtensionPoint').
+        if isinstance(extensions, dict):
+            extensions = list(extensions.items())
+
         return extensions
 
     def _get_service_protocol(self, trait):
@@ -361,18 +470,24 @@ class Plugin(ExtensionProvider):
 
         return protocol
 
-    def _harvest_methods(self, extension_point_id):
+    def _harvest_methods(self, extension_point_id, index=None):
         """ Harvest all method-based contributions. """
 
+        if index is None:
+            index = get_extension_index(self)
+
         extensions = []
-        # Using inspect.getmembers(self) here will cause an infinite recursion,
-        # so use an internal HasTraits method for inspecting the MRO of the
-        # instance's type to find all methods instead.
-        for name in self._each_trait_method(self):
+        # The index only holds the names of the methods that are marked as
+        # contributing to the extension point, so there is no need to look at
+        # every method on the class.
+        for name in index.contributing_methods.get(extension_point_id, []):
             value = getattr(self, name)
             if self._is_extension_method(value, extension_point_id):
                 result = value()
-                if not isinstance(result, list):
+                if isinstance(result, dict):
+                    result = list(result.items())
+
+                elif not isinstance(result, list):
                     result = [result]
 
                 extensions.extend(result)
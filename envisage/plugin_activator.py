@@ -6,6 +6,7 @@ from traits.api import HasTraits, provides
 
 # Local imports.
 from .i_plugin_activator import IPluginActivator
+from .profiler import profile
 
 
 @provides(IPluginActivator)
@@ -21,13 +22,18 @@ class PluginActivator(HasTraits):
 
         # Connect all of the plugin's extension point traits so that the plugin
         # will be notified if and when contributions are added or removed.
-        plugin.connect_extension_point_traits()
+        with profile(
+            'connect_extension_point_traits', 'plugin', plugin=plugin.id
+        ):
+            plugin.connect_extension_point_traits()
 
         # Register all services.
-        plugin.register_services()
+        with profile('register_services', 'plugin', plugin=plugin.id):
+            plugin.register_services()
 
         # Plugin specific start.
-        plugin.start()
+        with profile('start', 'plugin', plugin=plugin.id):
+            plugin.start()
 
         return
 
@@ -35,13 +41,18 @@ class PluginActivator(HasTraits):
         """ Stop the specified plugin. """
 
         # Plugin specific stop.
-        plugin.stop()
+        with profile('stop', 'plugin', plugin=plugin.id):
+            plugin.stop()
 
         # Unregister all service.
-        plugin.unregister_services()
+        with profile('unregister_services', 'plugin', plugin=plugin.id):
+            plugin.unregister_services()
 
         # Disconnect all of the plugin's extension point traits.
-        plugin.disconnect_extension_point_traits()
+        with profile(
+            'disconnect_extension_point_traits', 'plugin', plugin=plugin.id
+        ):
+            plugin.disconnect_extension_point_traits()
 
         return
 
@@ -0,0 +1,106 @@
+""" Utility functions for working with dependencies between plugins. """
+
+
+# The Id of the core plugin (which is always started before any other plugin).
+CORE_PLUGIN_ID = 'envisage.core'
+
+
+def get_plugin_dependencies(plugins):
+    """ Return the plugins that each plugin depends on.
+
+    Returns a dictionary mapping each plugin to the list of plugins (from
+    'plugins') that must be started before it.
+
+    A plugin depends on:
+
+    1) the plugins whose Ids are in its 'requires' list (a 'SystemError' is
+       raised if any of them is not in 'plugins').
+
+    2) the plugins whose Ids are in its 'after' list (if they are in
+       'plugins' - if not, they are simply ignored).
+
+    3) the core plugin (if it is in 'plugins').
+
+    Plugins that don't have 'requires' or 'after' traits (i.e. 'IPlugin'
+    implementations that don't derive from 'Plugin') only depend on the core
+    plugin.
+
+    """
+
+    plugins_by_id = dict((plugin.id, plugin) for plugin in plugins)
+    core_plugin = plugins_by_id.get(CORE_PLUGIN_ID)
+
+    dependencies = {}
+    for plugin in plugins:
+        depends_on = []
+        if core_plugin is not None and plugin is not core_plugin:
+            depends_on.append(core_plugin)
+
+        for plugin_id in getattr(plugin, 'requires', []):
+            required = plugins_by_id.get(plugin_id)
+            if required is None:
+                raise SystemError(
+                    'plugin %s requires plugin %s which does not exist' % (
+                        plugin.id, plugin_id
+                    )
+                )
+
+            depends_on.append(required)
+
+        for plugin_id in getattr(plugin, 'after', []):
+            after = plugins_by_id.get(plugin_id)
+            if after is not None:
+                depends_on.append(after)
+
+        dependencies[plugin] = depends_on
+
+    return dependencies
+
+
+def get_plugins_in_start_order(plugins):
+    """ Return the plugins in the order that they should be started.
+
+    Every plugin comes after all of the plugins that it depends on (see
+    'get_plugin_dependencies'). Otherwise, the plugins stay in the order that
+    they were given in (so if no plugin declares any dependencies, the only
+    thing that can change is that the core plugin is moved to the front).
+
+    Raise a 'ValueError' if the dependencies contain a cycle.
+
+    """
+
+    plugins = list(plugins)
+    dependencies = get_plugin_dependencies(plugins)
+
+    start_order = []
+    started = set()
+    visiting = set()
+
+    def visit(plugin):
+        """ Add a plugin (after its dependencies) to the start order. """
+
+        if plugin in started:
+            return
+
+        if plugin in visiting:
+            raise ValueError(
+                'plugin %s has a circular dependency' % plugin.id
+            )
+
+        visiting.add(plugin)
+        for dependency in dependencies[plugin]:
+            visit(dependency)
+
+        visiting.remove(plugin)
+
+        started.add(plugin)
+        start_order.append(plugin)
+
+        return
+
+    for plugin in plugins:
+        visit(plugin)
+
+    return start_order
+
+#### EOF ######################################################################
@@ -3,18 +3,36 @@
 
 from fnmatch import fnmatch
 import logging
+import threading
+import time
 
-from traits.api import Event, HasTraits, Instance, List, Str, provides
+from traits.api import Any, Dict, Enum, Event, Float, HasTraits, Instance, Int
+from traits.api import List, Str, provides
 
 from .i_application import IApplication
 from .i_plugin import IPlugin
 from .i_plugin_manager import IPluginManager
+from .plugin_dependencies import get_plugin_dependencies
+from .plugin_dependencies import get_plugins_in_start_order
 from .plugin_event import PluginEvent
+from .profiler import profile
 
+# 'concurrent.futures' is only in the standard library in Python 3 (in Python
+# 2 it is provided by the 'futures' backport), and it is only needed to start
+# plugins in 'parallel' mode.
+try:
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+except ImportError:
+    ThreadPoolExecutor = None
 
 
 logger = logging.getLogger(__name__)
 
+# The Id of the extension point that service offers are contributed to (see
+# 'CorePlugin').
+SERVICE_OFFERS = 'envisage.service_offers'
+
 
 @provides(IPluginManager)
 class PluginManager(HasTraits):
@@ -67,6 +85,71 @@ class PluginManager(HasTraits):
     # Each item in the list is actually an 'fnmatch' expression.
     include = List(Str)
 
+    # How the plugins are started by 'start'.
+    #
+    # In both modes, plugins are started in dependency order (see the
+    # 'requires' and 'after' traits on 'Plugin'), with the core plugin always
+    # started first.
+    #
+    # 'sequential' - plugins are started one after another.
+    #
+    # 'parallel'   - plugins that do not depend on each other are started
+    #                concurrently on a pool of threads. Only use this if your
+    #                plugins' 'start' methods are safe to run concurrently!
+    #                The application's registries are put into concurrent
+    #                mode while the plugins start. If 'concurrent.futures' is
+    #                not available (i.e. on Python 2 without the 'futures'
+    #                package) then an error is logged and the plugins are
+    #                started sequentially.
+    start_mode = Enum('sequential', 'parallel')
+
+    # The maximum number of threads used to start plugins in 'parallel' mode
+    # (if zero then the default for a 'ThreadPoolExecutor' is used).
+    max_workers = Int(0)
+
+    # The time (in seconds) that it took to start each plugin.
+    #
+    # { plugin_id : seconds }
+    start_durations = Dict(Str, Float)
+
+    #### Private protocol #####################################################
+
+    # The lazily activated plugins (see 'Plugin.activation') that have not
+    # been started yet.
+    _pending = List(IPlugin)
+
+    # The lazily activated plugins that have been started (in the order that
+    # they were started).
+    _activated = List(IPlugin)
+
+    # The plugins that each lazily activated plugin depends on.
+    #
+    # { plugin : [plugin, ...] }
+    _lazy_dependencies = Dict
+
+    # The pending plugins that offer each extension point.
+    #
+    # { extension_point_id : plugin }
+    _lazy_extension_points = Dict
+
+    # The pending plugins that contribute service offers with each factory,
+    # along with the properties of the offers (several offers can share a
+    # factory, and the properties tell them apart).
+    #
+    # { factory : [(plugin, properties), ...] }
+    _lazy_factories = Dict
+
+    # The lock held while lazily activated plugins are activated (plugins can
+    # be used, and hence activated, on any thread, e.g. when they are started
+    # in 'parallel' mode). It is held until the plugin has started, so other
+    # threads that use the plugin wait for it to be ready.
+    _activation_lock = Any
+
+    def __activation_lock_default(self):
+        """ Trait initializer. """
+
+        return threading.RLock()
+
     #### 'object' protocol #####################################################
 
     def __init__(self, plugins=None, **traits):
@@ -134,8 +217,33 @@ class PluginManager(HasTraits):
     def start(self):
         """ Start the plugin manager. """
 
-        for plugin in self._plugins:
-            self.start_plugin(plugin)
+        start_order = get_plugins_in_start_order(self._plugins)
+
+        # Lazily activated plugins are not started now, but when they are
+        # first used.
+        lazy = self._get_lazy_plugins(start_order)
+        eager = [plugin for plugin in start_order if plugin not in lazy]
+
+        # The lazy plugins are deferred first, so that any eager plugin that
+        # uses them as it starts activates them.
+        if len(lazy) > 0:
+            self._defer_plugins(
+                [plugin for plugin in start_order if plugin in lazy]
+            )
+
+        if self.start_mode == 'parallel' and ThreadPoolExecutor is None:
+            logger.error(
+                "plugins can't be started in parallel as 'concurrent.futures' "
+                "is not available (on Python 2 install the 'futures' "
+                "package), so they will be started sequentially"
+            )
+
+        if self.start_mode == 'parallel' and ThreadPoolExecutor is not None:
+            self._start_plugins_in_parallel(eager)
+
+        else:
+            for plugin in eager:
+                self.start_plugin(plugin)
 
         return
 
@@ -144,9 +252,10 @@ class PluginManager(HasTraits):
 
         plugin = plugin or self.get_plugin(plugin_id)
         if plugin is not None:
-            logger.debug('plugin %s starting', plugin.id)
-            plugin.activator.start_plugin(plugin)
-            logger.debug('plugin %s started', plugin.id)
+            # If the plugin is waiting to be activated lazily then activate it
+            # now (which also starts any pending plugins that it depends on).
+            if not self._activate_plugin(plugin):
+                self.start_durations[plugin.id] = self._start_plugin(plugin)
 
         else:
             raise SystemError('no such plugin %s' % plugin_id)
@@ -156,9 +265,9 @@ class PluginManager(HasTraits):
     def stop(self):
         """ Stop the plugin manager. """
 
-        # We stop the plugins in the reverse order that they were started.
-        stop_order = self._plugins[:]
-        stop_order.reverse()
+        stop_order = self._get_stop_order()
+
+        self._reset_lazy_activation()
 
         for plugin in stop_order:
             self.stop_plugin(plugin)
@@ -171,7 +280,8 @@ class PluginManager(HasTraits):
         plugin = plugin or self.get_plugin(plugin_id)
         if plugin is not None:
             logger.debug('plugin %s stopping', plugin.id)
-            plugin.activator.stop_plugin(plugin)
+            with profile('stop_plugin', 'plugin_manager', plugin=plugin.id):
+                self._get_activator(plugin).stop_plugin(plugin)
             logger.debug('plugin %s stopped', plugin.id)
 
         else:
@@ -211,6 +321,309 @@ class PluginManager(HasTraits):
 
     #### Private protocol ######################################################
 
+    def _activate_plugin(self, plugin):
+        """ Start a lazily activated plugin if it is pending.
+
+        Any pending plugins that the plugin depends on are started first.
+        Return True if the plugin was pending (i.e. if it was activated).
+
+        If another thread is activating the plugin then this waits until the
+        plugin has started (and returns False).
+
+        """
+
+        with self._activation_lock:
+            if plugin not in self._pending:
+                return False
+
+            # Take the plugin out of the pending list *before* starting it, in
+            # case starting it triggers its own activation again.
+            self._pending.remove(plugin)
+
+            for dependency in self._lazy_dependencies[plugin]:
+                self._activate_plugin(dependency)
+
+            logger.debug('plugin %s activated lazily', plugin.id)
+
+            self._activated.append(plugin)
+            self.start_durations[plugin.id] = self._start_plugin(plugin)
+
+        return True
+
+    def _connect_lazy_activation(self, remove=False):
+        """ Connect/disconnect the triggers that activate pending plugins. """
+
+        if self.application is None:
+            return
+
+        # Only the registries that fire the appropriate events can trigger
+        # lazy activation (pending plugins can still be started explicitly).
+        extension_registry = self.application.extension_registry
+        if extension_registry.trait('extension_point_accessed') is not None:
+            extension_registry.on_trait_change(
+                self._on_extension_point_accessed, 'extension_point_accessed',
+                remove=remove
+            )
+
+        service_registry = self.application.service_registry
+        if service_registry.trait('resolving') is not None:
+            service_registry.on_trait_change(
+                self._on_service_resolving, 'resolving', remove=remove
+            )
+
+        return
+
+    def _defer_plugins(self, plugins):
+        """ Defer starting plugins until they are first used. """
+
+        self._lazy_dependencies = get_plugin_dependencies(self._plugins)
+
+        for plugin in plugins:
+            logger.debug('plugin %s will be activated lazily', plugin.id)
+
+            for extension_point in plugin.get_extension_points():
+                self._lazy_extension_points[extension_point.id] = plugin
+
+            for offer in plugin.get_extensions(SERVICE_OFFERS):
+                try:
+                    self._lazy_factories.setdefault(offer.factory, []).append(
+                        (plugin, offer.properties or {})
+                    )
+
+                # Unhashable factories can't trigger activation.
+                except TypeError:
+                    pass
+
+        with self._activation_lock:
+            self._pending = plugins
+
+        self._connect_lazy_activation()
+
+        return
+
+    def _get_activator(self, plugin):
+        """ Return the activator used to start and stop a plugin. """
+
+        return plugin.activator
+
+    def _get_lazy_plugins(self, start_order):
+        """ Return the plugins that should be activated lazily.
+
+        A plugin whose activation policy is 'lazy' is only activated lazily if
+        no eagerly started plugin depends on it (directly or indirectly).
+
+        """
+
+        dependencies = get_plugin_dependencies(start_order)
+
+        # Walk the plugins in reverse start order so that we see every plugin
+        # before we see any of the plugins that it depends on.
+        lazy = set()
+        required = set()
+        for plugin in reversed(start_order):
+            if getattr(plugin, 'activation', 'eager') == 'lazy':
+                if plugin not in required:
+                    lazy.add(plugin)
+                    continue
+
+            required.update(dependencies[plugin])
+
+        return lazy
+
+    def _get_stop_order(self):
+        """ Return the plugins that have been started, in stop order. """
+
+        # We stop the plugins in the reverse order that they were started
+        # (lazily activated plugins are stopped first, as they were usually
+        # started after all of the others, and pending ones were never started
+        # at all).
+        with self._activation_lock:
+            deferred = set(self._pending) | set(self._activated)
+            activated = list(self._activated)
+
+        stop_order = [
+            plugin for plugin in get_plugins_in_start_order(self._plugins)
+
+            if plugin not in deferred
+        ]
+        stop_order.extend(activated)
+        stop_order.reverse()
+
+        return stop_order
+
+    def _on_extension_point_accessed(self, extension_point_id):
+        """ Dynamic trait change handler. """
+
+        plugin = self._lazy_extension_points.get(extension_point_id)
+        if plugin is not None:
+            self._activate_plugin(plugin)
+
+        return
+
+    def _on_service_resolving(self, service_id):
+        """ Dynamic trait change handler. """
+
+        service_registry = self.application.service_registry
+        try:
+            factory = service_registry.get_service_from_id(service_id)
+            properties = service_registry.get_service_properties(service_id)
+            offers = self._lazy_factories.get(factory, [])
+
+        # The service might have been unregistered, and unhashable factories
+        # can't trigger activation.
+        except (TypeError, ValueError):
+            offers = []
+
+        # Start the plugin(s) that offered the service. If the service's
+        # properties have been changed since it was registered then we can't
+        # tell which of the offers with the same factory it was, so we start
+        # all of their plugins.
+        plugins = [
+            plugin for plugin, offer_properties in offers
+            if offer_properties == properties
+        ]
+        if len(plugins) == 0:
+            plugins = [plugin for plugin, offer_properties in offers]
+
+        for plugin in plugins:
+            self._activate_plugin(plugin)
+
+        return
+
+    def _reset_lazy_activation(self):
+        """ Forget about any lazily activated plugins. """
+
+        # The triggers are only connected if any plugins were deferred.
+        if len(self._lazy_dependencies) > 0:
+            self._connect_lazy_activation(remove=True)
+
+        with self._activation_lock:
+            self._pending = []
+            self._activated = []
+
+        self._lazy_dependencies = {}
+        self._lazy_extension_points = {}
+        self._lazy_factories = {}
+
+        return
+
+    def _set_registries_concurrent(self, concurrent):
+        """ Put the application's registries into (or out of) concurrent mode.
+
+        Return the registries that were changed (registries that don't have a
+        concurrent mode, or that are already in the requested mode, are left
+        alone).
+
+        """
+
+        if self.application is None:
+            return []
+
+        registries = [
+            self.application.extension_registry,
+            self.application.service_registry
+        ]
+
+        changed = []
+        for registry in registries:
+            if registry.trait('concurrent') is None:
+                continue
+
+            if registry.concurrent != concurrent:
+                registry.concurrent = concurrent
+                changed.append(registry)
+
+        return changed
+
+    def _start_plugin(self, plugin):
+        """ Start a plugin and return how long it took (in seconds). """
+
+        logger.debug('plugin %s starting', plugin.id)
+
+        start_time = time.time()
+        with profile('start_plugin', 'plugin_manager', plugin=plugin.id):
+            self._get_activator(plugin).start_plugin(plugin)
+        duration = time.time() - start_time
+
+        logger.debug('plugin %s started in %.3fs', plugin.id, duration)
+
+        return duration
+
+    def _start_plugins_in_parallel(self, plugins):
+        """ Start plugins concurrently, respecting their dependencies.
+
+        A plugin is only started once all of the plugins that it depends on
+        have started. If any plugin fails to start then no more plugins are
+        started and (once any plugins that are already starting have
+        finished) the first exception is re-raised.
+
+        """
+
+        dependencies = get_plugin_dependencies(plugins)
+
+        # The number of plugins that each plugin is still waiting for, and the
+        # plugins that are waiting for each plugin.
+        waiting_for = {}
+        dependents = dict((plugin, []) for plugin in plugins)
+        for plugin in plugins:
+            waiting_for[plugin] = len(dependencies[plugin])
+            for dependency in dependencies[plugin]:
+                dependents[dependency].append(plugin)
+
+        positions = dict((plugin, i) for i, plugin in enumerate(plugins))
+        ready = [plugin for plugin in plugins if waiting_for[plugin] == 0]
+        starting = {}
+        errors = []
+
+        # The plugins use the registries from several threads at once.
+        registries = self._set_registries_concurrent(True)
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers or None)
+        try:
+            while len(ready) > 0 or len(starting) > 0:
+                if len(errors) == 0:
+                    for plugin in ready:
+                        future = executor.submit(self._start_plugin, plugin)
+                        starting[future] = plugin
+
+                ready = []
+
+                done, not_done = wait(starting, return_when=FIRST_COMPLETED)
+                for future in done:
+                    plugin = starting.pop(future)
+                    try:
+                        duration = future.result()
+
+                    except Exception as exc:
+                        logger.exception('plugin %s failed to start', plugin.id)
+                        errors.append(exc)
+                        continue
+
+                    # We record the durations here (rather than in the worker
+                    # threads) as trait notifications are not thread-safe.
+                    self.start_durations[plugin.id] = duration
+
+                    # Any plugins waiting for this one may now be ready.
+                    for dependent in dependents[plugin]:
+                        waiting_for[dependent] -= 1
+                        if waiting_for[dependent] == 0:
+                            ready.append(dependent)
+
+                # Start the plugins that are ready in the same relative order
+                # that they would have been started sequentially.
+                ready.sort(key=positions.get)
+
+        finally:
+            executor.shutdown(wait=True)
+
+            for registry in registries:
+                registry.concurrent = False
+
+        if len(errors) > 0:
+            raise errors[0]
+
+        return
+
     def _is_excluded(self, plugin_id):
         """ Return True if the plugin Id is excluded.
 
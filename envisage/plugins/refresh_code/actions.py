@@ -18,9 +18,13 @@ class RefreshCode(Action):
         """ Perform the action. """
 
         from traits.util.refresh import refresh
+        from envisage.import_manager import symbol_cache
 
         refresh()
 
+        # Any symbols imported before the refresh may now be stale.
+        symbol_cache.invalidate()
+
         return
 
 #### EOF ######################################################################
@@ -0,0 +1,279 @@
+""" A profiler for the application lifecycle (e.g. starting plugins).
+
+The framework wraps the interesting parts of the lifecycle (discovering
+plugins, loading entry points, each step of starting and stopping each plugin,
+loading preferences, registering services, calling extension point listeners
+etc.) in calls to 'profile'. Unless a profiler is enabled, 'profile' returns a
+shared, do-nothing context manager, so the cost of the instrumentation is
+just a function call.
+
+e.g. To find out where an application spends its time when starting::
+
+    profiler = Profiler()
+    with profiler:
+        application.start()
+
+    print(profiler.summary())
+    profiler.save_trace('startup.json')
+
+The trace file can be loaded into Chrome's 'about:tracing' page (or any other
+viewer that understands the trace event format).
+
+"""
+
+
+# Standard library imports.
+import json
+import os
+import threading
+import time
+
+
+# The clock used to time spans (in seconds).
+try:
+    clock = time.perf_counter
+
+except AttributeError:
+    clock = time.time
+
+
+class _NullSpan(object):
+    """ The span returned by 'profile' when profiling is disabled. """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class _Span(object):
+    """ A span of time that is being recorded by a profiler. """
+
+    __slots__ = ('_profiler', '_name', '_category', '_args', '_start')
+
+    def __init__(self, profiler, name, category, args):
+        """ Constructor. """
+
+        self._profiler = profiler
+        self._name = name
+        self._category = category
+        self._args = args
+
+        return
+
+    def __enter__(self):
+        self._start = clock()
+
+        return self
+
+    def __exit__(self, *exc_info):
+        end = clock()
+        self._profiler.add_span(
+            self._name, self._category, self._start, end, self._args
+        )
+
+        return False
+
+
+# The (shared) span returned by 'profile' when profiling is disabled.
+_null_span = _NullSpan()
+
+# The profiler that is currently enabled (if any).
+_profiler = None
+
+
+def get_profiler():
+    """ Return the profiler that is currently enabled (or None). """
+
+    return _profiler
+
+
+def profile(name, category='envisage', **args):
+    """ Return a context manager that records how long its body takes.
+
+    'args' are any extra information about the span (e.g. the Id of the
+    plugin being started) and must be JSON serializable.
+
+    If no profiler is enabled then nothing is recorded.
+
+    """
+
+    profiler = _profiler
+    if profiler is None:
+        return _null_span
+
+    return _Span(profiler, name, category, args)
+
+
+class Profiler(object):
+    """ Records how long each part of the application lifecycle takes.
+
+    A profiler can be enabled and disabled explicitly, or used as a context
+    manager. Only one profiler is enabled at a time (enabling a profiler
+    disables any other).
+
+    """
+
+    def __init__(self):
+        """ Constructor. """
+
+        # The spans that have been recorded, in the order that they ended.
+        #
+        # [(name, category, start, end, thread_id, args), ...]
+        self.spans = []
+
+        # The time that the profiler was created (trace timestamps are
+        # relative to this).
+        self._origin = clock()
+
+        return
+
+    def __enter__(self):
+        self.enable()
+
+        return self
+
+    def __exit__(self, *exc_info):
+        self.disable()
+
+        return False
+
+    @property
+    def enabled(self):
+        """ True if the profiler is enabled. """
+
+        return _profiler is self
+
+    def add_span(self, name, category, start, end, args=None):
+        """ Record a span (with start and end times as returned by 'clock').
+
+        """
+
+        # Appending to a list is atomic, so spans can be recorded from any
+        # thread (e.g. when plugins are started in parallel).
+        self.spans.append(
+            (name, category, start, end, threading.current_thread().ident,
+             args or {})
+        )
+
+        return
+
+    def clear(self):
+        """ Discard all of the recorded spans. """
+
+        self.spans = []
+
+        return
+
+    def disable(self):
+        """ Stop recording spans. """
+
+        global _profiler
+
+        if _profiler is self:
+            _profiler = None
+
+        return
+
+    def enable(self):
+        """ Start recording spans. """
+
+        global _profiler
+
+        _profiler = self
+
+        return
+
+    def save_trace(self, filename):
+        """ Save the spans to a file in the Chrome trace event format. """
+
+        with open(filename, 'w') as f:
+            trace = {
+                'traceEvents'     : self.to_trace_events(),
+                'displayTimeUnit' : 'ms'
+            }
+            json.dump(trace, f)
+
+        return
+
+    def summary(self, limit=None):
+        """ Return a human-readable summary of the recorded spans.
+
+        Spans with the same name and arguments (e.g. starting the same plugin)
+        are added together, and the summary lists them by total time (slowest
+        first). If 'limit' is specified then only that many rows are included.
+
+        """
+
+        totals = {}
+        for name, category, start, end, thread_id, args in self.spans:
+            label = self._get_label(name, args)
+            count, total, longest = totals.get(label, (0, 0.0, 0.0))
+            duration = end - start
+            totals[label] = (count + 1, total+duration, max(longest, duration))
+
+        rows = sorted(
+            totals.items(), key=lambda item: item[1][1], reverse=True
+        )
+        if limit is not None:
+            rows = rows[:limit]
+
+        width = max([len('Span')] + [len(label) for label, stats in rows])
+        lines = [
+            '%-*s  %6s  %10s  %10s' % (
+                width, 'Span', 'Calls', 'Total (ms)', 'Max (ms)'
+            )
+        ]
+        for label, (count, total, longest) in rows:
+            lines.append(
+                '%-*s  %6d  %10.3f  %10.3f' % (
+                    width, label, count, total * 1000, longest * 1000
+                )
+            )
+
+        return '\n'.join(lines)
+
+    def to_trace_events(self):
+        """ Return the spans as a list of Chrome trace events. """
+
+        pid = os.getpid()
+
+        events = []
+        for name, category, start, end, thread_id, args in self.spans:
+            events.append(
+                {
+                    'name' : name,
+                    'cat'  : category,
+                    'ph'   : 'X',
+                    'ts'   : (start - self._origin) * 1e6,
+                    'dur'  : (end - start) * 1e6,
+                    'pid'  : pid,
+                    'tid'  : thread_id,
+                    'args' : args
+                }
+            )
+
+        # Viewers cope with any order, but sorting by start time makes the
+        # file easier to read.
+        events.sort(key=lambda event: event['ts'])
+
+        return events
+
+    ###########################################################################
+    # Private interface.
+    ###########################################################################
+
+    def _get_label(self, name, args):
+        """ Return the label for a span in the summary. """
+
+        if len(args) == 0:
+            return name
+
+        return '%s (%s)' % (
+            name, ', '.join('%s=%s' % item for item in sorted(args.items()))
+        )
+
+#### EOF ######################################################################
@@ -2,39 +2,164 @@
 
 
 # Standard library imports.
+from collections import OrderedDict
 import logging
+import threading
+import time
 
 # Enthought library imports.
-from traits.api import List, provides, on_trait_change
+from traits.api import Any, Bool, Dict, Event, Instance, Int, Str
+from traits.api import provides
 
 # Local imports.
 from .extension_registry import ExtensionRegistry
-from .i_extension_provider import IExtensionProvider
+from .fenwick_tree import FenwickTree
 from .i_provider_extension_registry import IProviderExtensionRegistry
+from .usage_profile import UsageProfile
 
 
 # Logging.
 logger = logging.getLogger(__name__)
 
 
+class _NullLock(object):
+    """ The 'lock' used when the registry is not in concurrent mode. """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+# The (shared) lock used when the registry is not in concurrent mode.
+_null_lock = _NullLock()
+
+
 @provides(IProviderExtensionRegistry)
 class ProviderExtensionRegistry(ExtensionRegistry):
     """ An extension registry implementation with multiple providers. """
 
+    #### 'ProviderExtensionRegistry' interface ################################
+
+    # An event that is fired the first time that the contributions to an
+    # extension point are read (the value is the Id of the extension point).
+    #
+    # This allows, for example, a plugin manager to start the plugin that
+    # offers the extension point before its contributions are collected.
+    extension_point_accessed = Event(Str)
+
+    # If True then the registry can safely be read from any number of threads
+    # while providers are being added and removed.
+    #
+    # The contributions to each extension point are published as an immutable
+    # tuple that is replaced (never changed) when the contributions change, so
+    # reading contributions that have already been collected never takes a
+    # lock. Changes to the registry (and collecting the contributions to an
+    # extension point for the first time) are serialized by a lock.
+    concurrent = Bool(False)
+
+    # The usage profile that records the extension points whose contributions
+    # are collected, so that they can be pre-warmed the next time that the
+    # application starts (see 'envisage.usage_profile'). If this is None (the
+    # default) then nothing is recorded.
+    usage_profile = Instance(UsageProfile)
+
     #### Protected 'ProviderExtensionRegistry' interface ######################
 
-    # The extension providers that populate the registry.
-    _providers = List(IExtensionProvider)
+    # The extension providers that populate the registry (in the order that
+    # they were added), and the slot that holds each provider's contributions
+    # in the (per extension point) list of lists of contributions.
+    #
+    # { provider : slot }
+    #
+    # Each provider gets the next slot when it is added. When a provider is
+    # removed its slot is simply emptied (rather than shuffling all of the
+    # following providers' contributions down), and the slots are compacted
+    # once there are more empty slots than providers. This is an ordered
+    # dictionary, so removing a provider doesn't mean searching for it.
+    _provider_slots = Any
+
+    # The number of slots that have been handed out.
+    _slot_count = Int
+
+    # The number of contributions in each slot of each extension point that
+    # has been accessed (used to find where a provider's contributions are in
+    # the flattened list of all contributions).
+    #
+    # { extension_point_id : FenwickTree }
+    _offsets = Dict
+
+    # The flattened contributions to each extension point that has been
+    # accessed.
+    #
+    # { extension_point_id : tuple }
+    #
+    # The tuple is computed the first time it is needed and then reused until
+    # a provider is added or removed, or a provider's contributions change.
+    _flattened = Dict
+
+    # The lock held while the registry is changed in concurrent mode.
+    _lock = Any
+
+    # The extension points whose contributions were collected while the usage
+    # profile was pre-warming them. They are only recorded in the profile
+    # when they are actually used (otherwise the profile would never forget
+    # an extension point).
+    #
+    # { extension_point_id : duration }
+    _prewarmed = Dict
+
+    def __lock_default(self):
+        """ Trait initializer. """
+
+        return threading.RLock()
+
+    def __provider_slots_default(self):
+        """ Trait initializer. """
+
+        return OrderedDict()
 
     ###########################################################################
     # 'IExtensionRegistry' interface.
     ###########################################################################
 
+    def get_extensions(self, extension_point_id):
+        """ Return the extensions contributed to an extension point. """
+
+        return list(self._get_extensions(extension_point_id))
+
+    def remove_extension_point(self, extension_point_id):
+        """ Remove an extension point. """
+
+        with self._get_lock():
+            self._flattened.pop(extension_point_id, None)
+            self._offsets.pop(extension_point_id, None)
+
+            super(ProviderExtensionRegistry, self).remove_extension_point(
+                extension_point_id
+            )
+
+        return
+
     def set_extensions(self, extension_point_id, extensions):
         """ Set the extensions to an extension point. """
 
         raise SystemError('extension points cannot be set')
 
+    ###########################################################################
+    # 'ExtensionRegistry' interface.
+    ###########################################################################
+
+    def get_extensions_view(self, extension_point_id):
+        """ Return an immutable view of the extensions to an extension point.
+
+        """
+
+        return self._get_extensions(extension_point_id)
+
     ###########################################################################
     # 'ProviderExtensionRegistry' interface.
     ###########################################################################
@@ -42,7 +167,8 @@ class ProviderExtensionRegistry(ExtensionRegistry):
     def add_provider(self, provider):
         """ Add an extension provider. """
 
-        events = self._add_provider(provider)
+        with self._get_lock():
+            events = self._add_provider(provider)
 
         for extension_point_id, (refs, added, index) in events.items():
             self._call_listeners(refs, extension_point_id, added, [], index)
@@ -52,7 +178,7 @@ class ProviderExtensionRegistry(ExtensionRegistry):
     def get_providers(self):
         """ Return all of the providers in the registry. """
 
-        return self._providers[:]
+        return list(self._provider_slots)
 
     def remove_provider(self, provider):
         """ Remove an extension provider.
@@ -61,7 +187,8 @@ class ProviderExtensionRegistry(ExtensionRegistry):
 
         """
 
-        events = self._remove_provider(provider)
+        with self._get_lock():
+            events = self._remove_provider(provider)
 
         for extension_point_id, (refs, removed, index) in events.items():
             self._call_listeners(refs, extension_point_id, [], removed, index)
@@ -72,8 +199,44 @@ class ProviderExtensionRegistry(ExtensionRegistry):
     # Protected 'ExtensionRegistry' interface.
     ###########################################################################
 
+    def _get_current_extensions(self, extension_point_id):
+        """ Return a copy of the current extensions to an extension point.
+
+        If the contributions have already been collected then they are read
+        directly, so that bookkeeping (e.g. remembering the contributions
+        before a change in a batch) isn't mistaken for a real use of the
+        extension point (which would be recorded in the usage profile).
+
+        """
+
+        if extension_point_id not in self._extension_points:
+            return []
+
+        if extension_point_id in self._extensions:
+            return list(self._iter_extensions(extension_point_id))
+
+        return super(ProviderExtensionRegistry, self)._get_current_extensions(
+            extension_point_id
+        )
+
     def _get_extensions(self, extension_point_id):
-        """ Return the extensions for the given extension point. """
+        """ Return the extensions for the given extension point.
+
+        The extensions are returned as a tuple that is shared by all callers
+        until the extension point's contributions change.
+
+        """
+
+        # Is this the first real use of an extension point that was
+        # pre-warmed?
+        if self._prewarmed and extension_point_id in self._prewarmed:
+            self._record_prewarmed_extension_point(extension_point_id)
+
+        try:
+            return self._flattened[extension_point_id]
+
+        except KeyError:
+            pass
 
         # If we don't know about the extension point then it sure ain't got
         # any extensions!
@@ -82,32 +245,68 @@ class ProviderExtensionRegistry(ExtensionRegistry):
                 'getting extensions of unknown extension point <%s>' \
                 % extension_point_id
             )
-            extensions = []
-
-        # Has this extension point already been accessed?
-        elif extension_point_id in self._extensions:
-            extensions = self._extensions[extension_point_id]
+            return ()
 
-        # If not, then ask each provider for its contributions to the extension
-        # point.
-        else:
-            extensions = self._initialize_extensions(extension_point_id)
-            self._extensions[extension_point_id] = extensions
-
-        # We store the extensions as a list of lists, with each inner list
-        # containing the contributions from a single provider. Here we just
-        # concatenate them into a single list.
-        #
-        # You could use a list comprehension, here:-
-        #
-        #     all = [x for y in extensions for x in y]
-        #
-        # But I'm sure that that makes it any clearer ;^)
+        # Is this the first time that the extension point has been accessed?
+        if not extension_point_id in self._extensions:
+            self.extension_point_accessed = extension_point_id
+
+        with self._get_lock():
+            # In concurrent mode, another thread may have collected the
+            # contributions while we were waiting for the lock.
+            flattened = self._flattened.get(extension_point_id)
+            if flattened is not None:
+                return flattened
+
+            # Has this extension point already been accessed (if it is the
+            # first time then whoever handled the event above may have
+            # accessed it already)?
+            if extension_point_id in self._extensions:
+                extensions = self._extensions[extension_point_id]
+
+            # If not, then ask each provider for its contributions to the
+            # extension point.
+            else:
+                start = time.time()
+                extensions = self._initialize_extensions(extension_point_id)
+                usage_profile = self.usage_profile
+                if usage_profile is not None:
+                    duration = time.time() - start
+                    if usage_profile.is_prewarming():
+                        self._prewarmed[extension_point_id] = duration
+
+                    else:
+                        usage_profile.record_extension_point(
+                            extension_point_id, duration
+                        )
+
+                self._extensions[extension_point_id] = extensions
+                self._offsets[extension_point_id] = FenwickTree(
+                    map(len, extensions)
+                )
+
+                # If the extension point is keyed then we map the
+                # contributions by key now, so that any that clash are
+                # reported when they are first collected.
+                extension_point = self._extension_points[extension_point_id]
+                if self._is_keyed(extension_point):
+                    self._set_mapping(
+                        extension_point,
+                        self._iter_extensions(extension_point_id)
+                    )
+
+            # We store the extensions as a list of lists, with each inner
+            # list containing the contributions from a single provider. Here
+            # we just concatenate them into a single tuple that we keep until
+            # something changes.
+            flattened = tuple(
+                extension
+                for extensions_of_single_provider in extensions
+                for extension in extensions_of_single_provider
+            )
+            self._flattened[extension_point_id] = flattened
 
-        all = []
-        for extensions_of_single_provider in extensions:
-            all.extend(extensions_of_single_provider)
-        return all
+        return flattened
 
     ###########################################################################
     # Protected 'ProviderExtensionRegistry' interface.
@@ -116,14 +315,24 @@ class ProviderExtensionRegistry(ExtensionRegistry):
     def _add_provider(self, provider):
         """ Add a new provider. """
 
+        # Give the provider the next slot.
+        self._provider_slots[provider] = self._slot_count
+        self._slot_count += 1
+
         # Add the provider's extension points.
         self._add_provider_extension_points(provider)
 
         # Add the provider's extensions.
         events = self._add_provider_extensions(provider)
 
-        # And finally, tag it into the list of providers.
-        self._providers.append(provider)
+        # The flattened contributions to any extension point that the provider
+        # contributes to are now out of date.
+        self._invalidate_flattened(events)
+
+        # And finally, listen for changes to its contributions.
+        provider.on_trait_change(
+            self._providers_extension_point_changed, 'extension_point_changed'
+        )
 
         return events
 
@@ -138,17 +347,28 @@ class ProviderExtensionRegistry(ExtensionRegistry):
         # Does the provider contribute any extensions to an extension point
         # that has already been accessed?
 
+        #
+        # The provider's slot is always the last one, so its contributions go
+        # at the end of the extension point's contributions.
         for extension_point_id, extensions in self._extensions.items():
             new = provider.get_extensions(extension_point_id)
+            offsets = self._offsets[extension_point_id]
 
             # We only need fire an event for this extension point if the
             # provider contributes any extensions.
             if len(new) > 0:
-                index = sum(map(len, extensions))
+                index = offsets.total
                 refs  = self._get_listener_refs(extension_point_id)
                 events[extension_point_id] = (refs, new[:], index)
+                self._remember_extensions(extension_point_id)
 
             extensions.append(new)
+            offsets.append(len(new))
+            self._update_mapping(
+                extension_point_id, new, (),
+                self._iter_extensions(extension_point_id),
+                copy=self.concurrent
+            )
 
         return events
 
@@ -157,6 +377,7 @@ class ProviderExtensionRegistry(ExtensionRegistry):
 
         for extension_point in provider.get_extension_points():
             self._extension_points[extension_point.id] = extension_point
+            self._discard_mapping(extension_point.id)
 
         return
 
@@ -169,8 +390,25 @@ class ProviderExtensionRegistry(ExtensionRegistry):
         # Remove the provider's extension points.
         self._remove_provider_extension_points(provider, events)
 
-        # And finally take it out of the list of providers.
-        self._providers.remove(provider)
+        # The flattened contributions to any extension point that the provider
+        # contributed to (or offered) are now out of date.
+        self._invalidate_flattened(events)
+        self._invalidate_flattened(
+            extension_point.id
+            for extension_point in provider.get_extension_points()
+        )
+
+        # And finally take it out of the registry.
+        provider.on_trait_change(
+            self._providers_extension_point_changed, 'extension_point_changed',
+            remove=True
+        )
+        del self._provider_slots[provider]
+
+        # Don't let the empty slots pile up.
+        empty_slots = self._slot_count - len(self._provider_slots)
+        if empty_slots > max(len(self._provider_slots), 16):
+            self._compact_slots()
 
         return events
 
@@ -182,23 +420,32 @@ class ProviderExtensionRegistry(ExtensionRegistry):
         # need to fire.
         events = {}
 
-        # Find the index of the provider in the provider list. Its
-        # contributions are at the same index in the extensions list of lists.
-        index = self._providers.index(provider)
+        # Find the provider's slot in the extensions list of lists.
+        slot = self._get_provider_slot(provider)
 
         # Does the provider contribute any extensions to an extension point
         # that has already been accessed?
         for extension_point_id, extensions in self._extensions.items():
-            old = extensions[index]
+            old = extensions[slot]
+            offsets = self._offsets[extension_point_id]
 
             # We only need fire an event for this extension point if the
             # provider contributed any extensions.
             if len(old) > 0:
-                offset = sum(map(len, extensions[:index]))
+                offset = offsets.prefix_sum(slot)
                 refs  = self._get_listener_refs(extension_point_id)
                 events[extension_point_id] = (refs, old[:], offset)
-
-            del extensions[index]
+                self._remember_extensions(extension_point_id)
+
+            # Empty the slot (the slots of the providers that follow this one
+            # stay where they are).
+            extensions[slot] = []
+            offsets[slot] = 0
+            self._update_mapping(
+                extension_point_id, (), old,
+                self._iter_extensions(extension_point_id),
+                copy=self.concurrent
+            )
 
         return events
 
@@ -208,6 +455,7 @@ class ProviderExtensionRegistry(ExtensionRegistry):
         for extension_point in provider.get_extension_points():
             # Remove the extension point.
             del self._extension_points[extension_point.id]
+            self._discard_mapping(extension_point.id)
 
         return
 
@@ -217,7 +465,6 @@ class ProviderExtensionRegistry(ExtensionRegistry):
 
     #### Trait change handlers ################################################
 
-    @on_trait_change('_providers:extension_point_changed')
     def _providers_extension_point_changed(self, obj, trait_name, old, event):
         """ Dynamic trait change handler. """
 
@@ -234,29 +481,41 @@ class ProviderExtensionRegistry(ExtensionRegistry):
         if not extension_point_id in self._extensions:
             return
 
-        # This is a list of lists where each inner list contains the
-        # contributions made to the extension point by a single provider.
-        #
-        # fixme: This causes a problem if the extension point has not yet been
-        # accessed! The tricky thing is that if it hasn't been accessed yet
-        # how do we know what has changed?!? Maybe we should just return an
-        # empty list instead of barfing!
-        extensions = self._extensions[extension_point_id]
+        with self._get_lock():
+            # This is a list of lists where each inner list contains the
+            # contributions made to the extension point by a single provider.
+            #
+            # fixme: This causes a problem if the extension point has not yet
+            # been accessed! The tricky thing is that if it hasn't been
+            # accessed yet how do we know what has changed?!? Maybe we should
+            # just return an empty list instead of barfing!
+            extensions = self._extensions[extension_point_id]
+
+            # Find the provider's slot in the extensions list of lists.
+            slot = self._get_provider_slot(obj)
 
-        # Find the index of the provider in the provider list. Its
-        # contributions are at the same index in the extensions list of lists.
-        provider_index = self._providers.index(obj)
+            # Get the updated list from the provider.
+            old = extensions[slot]
+            new = obj.get_extensions(extension_point_id)
+            self._remember_extensions(extension_point_id)
 
-        # Get the updated list from the provider.
-        extensions[provider_index] = obj.get_extensions(extension_point_id)
+            extensions[slot] = new
+            self._update_mapping(
+                extension_point_id, new, old,
+                self._iter_extensions(extension_point_id),
+                copy=self.concurrent
+            )
+            self._invalidate_flattened([extension_point_id])
 
-        # Find where the provider's contributions are in the whole 'list'.
-        offset = sum(map(len, extensions[:provider_index]))
+            # Find where the provider's contributions are in the whole 'list'.
+            offsets = self._offsets[extension_point_id]
+            offsets[slot] = len(extensions[slot])
+            offset = offsets.prefix_sum(slot)
 
-        # Translate the event index from one that refers to the list of
-        # contributions from the provider, to the list of contributions from
-        # all providers.
-        index = self._translate_index(event.index, offset)
+            # Translate the event index from one that refers to the list of
+            # contributions from the provider, to the list of contributions
+            # from all providers.
+            index = self._translate_index(event.index, offset)
 
         # Find out who is listening.
         refs = self._get_listener_refs(extension_point_id)
@@ -270,19 +529,105 @@ class ProviderExtensionRegistry(ExtensionRegistry):
 
     #### Methods ##############################################################
 
+    def _compact_slots(self):
+        """ Remove the empty slots left behind by removed providers. """
+
+        for extension_point_id, extensions in list(self._extensions.items()):
+            extensions = [
+                extensions[slot] for slot in self._provider_slots.values()
+            ]
+
+            self._extensions[extension_point_id] = extensions
+            self._offsets[extension_point_id] = FenwickTree(
+                map(len, extensions)
+            )
+
+        self._provider_slots = OrderedDict(
+            (provider, slot)
+            for slot, provider in enumerate(self._provider_slots)
+        )
+        self._slot_count = len(self._provider_slots)
+
+        return
+
+    def _get_lock(self):
+        """ Return the lock held while the registry is changed.
+
+        Unless the registry is in concurrent mode this is a lock that doesn't
+        actually do anything.
+
+        """
+
+        return self._lock if self.concurrent else _null_lock
+
+    def _get_provider_slot(self, provider):
+        """ Return the slot that holds a provider's contributions.
+
+        Raise a 'ValueError' if the provider is not in the registry.
+
+        """
+
+        try:
+            slot = self._provider_slots[provider]
+
+        except KeyError:
+            raise ValueError('provider <%s> is not in the registry' % provider)
+
+        return slot
+
     def _initialize_extensions(self, extension_point_id):
         """ Initialize the extensions to an extension point. """
 
         # We store the extensions as a list of lists, with each inner list
-        # containing the contributions from a single provider.
-        extensions = []
-        for provider in self._providers:
-            extensions.append(provider.get_extensions(extension_point_id)[:])
+        # containing the contributions from a single provider (in the
+        # provider's slot).
+        extensions = [[] for slot in range(self._slot_count)]
+        for provider, slot in self._provider_slots.items():
+            extensions[slot] = provider.get_extensions(extension_point_id)[:]
 
         logger.debug('extensions to <%s> <%s>', extension_point_id, extensions)
 
         return extensions
 
+    def _invalidate_flattened(self, extension_point_ids):
+        """ Discard the flattened contributions to some extension points. """
+
+        for extension_point_id in extension_point_ids:
+            self._flattened.pop(extension_point_id, None)
+
+        return
+
+    def _iter_extensions(self, extension_point_id):
+        """ Iterate over the (collected) contributions to an extension point.
+
+        """
+
+        for extensions_of_single_provider in self._extensions[
+            extension_point_id
+        ]:
+            for extension in extensions_of_single_provider:
+                yield extension
+
+        return
+
+    def _record_prewarmed_extension_point(self, extension_point_id):
+        """ Record the first real use of an extension point that was
+        pre-warmed.
+
+        """
+
+        usage_profile = self.usage_profile
+        if usage_profile is None or usage_profile.is_prewarming():
+            return
+
+        with self._get_lock():
+            duration = self._prewarmed.pop(extension_point_id, None)
+
+        if duration is not None:
+            usage_profile.record_extension_point(extension_point_id, duration)
+
+        return
+
     def _translate_index(self, index, offset):
         """ Translate an event index by the given offset. """
 
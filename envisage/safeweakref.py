@@ -88,6 +88,11 @@ class ref(object):
 
     def __new__(cls, obj, callback=None):
         if getattr(obj, "__self__", None) is not None:  # Bound method
+            # Like 'weakref.ref', only references without a callback are
+            # shared (each callback needs a reference of its own).
+            if callback is not None:
+                return WeakMethod(obj, callback)
+
             # Caching
             func_cache = cls._cache.setdefault(obj.__self__, {})
             self = func_cache.get(obj.__func__)
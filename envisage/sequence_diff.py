@@ -0,0 +1,96 @@
+""" Find the differences between two sequences.
+
+When a plugin assigns a whole new list to a trait that contributes to an
+extension point, the list usually differs from the old one by a few items (e.g.
+a plugin that refreshes its service offers). Telling everybody that all of the
+old items have been removed and all of the new ones added makes them redo
+work for items that haven't changed, so we work out what actually changed.
+
+"""
+
+
+# Standard library imports.
+from difflib import SequenceMatcher
+
+
+# If the parts of the sequences that differ (after ignoring any common prefix
+# and suffix) contain more items than this in total, then we don't look for
+# items in common within them (finding them takes quadratic time in the worst
+# case), and just report that they were replaced.
+DIFF_CUTOFF = 2000
+
+
+def get_sequence_diff(old, new, cutoff=DIFF_CUTOFF):
+    """ Return the changes that turn one sequence into another.
+
+    Returns a list of '(index, removed, added)' tuples, where 'removed' is the
+    list of items removed at 'index' and 'added' the list of items inserted
+    there. The changes must be applied in order (i.e. each 'index' assumes
+    that the changes before it have already been made), in the same way as
+    a sequence of trait list events. If the sequences are the same then the
+    list is empty.
+
+    Items are the same if they are identical or equal. Items are only compared
+    by hashing (i.e. to find items in common other than a prefix or suffix)
+    if they are hashable.
+
+    """
+
+    # Ignore any common prefix...
+    start = 0
+    end = min(len(old), len(new))
+    while start < end and _is_same(old[start], new[start]):
+        start += 1
+
+    # ... and suffix.
+    old_end = len(old)
+    new_end = len(new)
+    while (old_end > start and new_end > start
+           and _is_same(old[old_end - 1], new[new_end - 1])):
+        old_end -= 1
+        new_end -= 1
+
+    removed = list(old[start:old_end])
+    added   = list(new[start:new_end])
+
+    if len(removed) == 0 and len(added) == 0:
+        return []
+
+    if len(removed) == 0 or len(added) == 0:
+        return [(start, removed, added)]
+
+    if len(removed) + len(added) > cutoff:
+        return [(start, removed, added)]
+
+    try:
+        matcher = SequenceMatcher(None, removed, added, autojunk=False)
+        opcodes = matcher.get_opcodes()
+
+    except (TypeError, ValueError):
+        # The items aren't hashable (or can't be compared).
+        return [(start, removed, added)]
+
+    diff = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag != 'equal':
+            diff.append((start + j1, removed[i1:i2], added[j1:j2]))
+
+    return diff
+
+
+def _is_same(a, b):
+    """ Return True if two items are identical or equal. """
+
+    if a is b:
+        return True
+
+    try:
+        is_same = bool(a == b)
+
+    except (TypeError, ValueError):
+        # e.g. numpy arrays, which compare element-wise.
+        is_same = False
+
+    return is_same
+
+#### EOF ######################################################################
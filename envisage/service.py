@@ -3,10 +3,14 @@
 
 # Standard library imports.
 import logging
+import weakref
 
 # Enthought library imports.
 from traits.api import TraitType
 
+# Local imports.
+from .service_query import compile_query
+
 
 # Logging.
 logger = logging.getLogger(__name__)
@@ -18,6 +22,19 @@ class Service(TraitType):
     Note that this is a trait *type* and hence does *NOT* have traits itself
     (i.e. it does *not* inherit from 'HasTraits').
 
+    By default the service registry is queried every time that the trait is
+    read. If 'cache' is True then the service is remembered (for each object)
+    until the services registered against the protocol change (i.e. a
+    service is registered, unregistered, evicted or has its properties
+    changed). Note that a cached service is *not* looked up again if the
+    query depends on attributes of the services themselves and they change.
+    Using a cached service still counts as using it as far as the registry's
+    eviction policy is concerned.
+
+    Caching is skipped if any of the services registered against the
+    protocol are not singletons (e.g. 'per_thread' or 'transient' services),
+    since the registry may hand out a different service every time.
+
     """
 
     ###########################################################################
@@ -25,7 +42,8 @@ class Service(TraitType):
     ###########################################################################
 
     def __init__(
-        self, protocol=None, query='', minimize='', maximize='', **metadata
+        self, protocol=None, query='', minimize='', maximize='', cache=False,
+        **metadata
     ):
         """ Constructor. """
 
@@ -35,6 +53,12 @@ class Service(TraitType):
         self._protocol = protocol
 
         # The optional query.
+        #
+        # We compile it here so that an invalid query is reported when the
+        # trait is declared rather than the first time it is used.
+        if len(query) > 0:
+            compile_query(query)
+
         self._query = query
 
         # The optional name of the trait/property to minimize.
@@ -43,6 +67,11 @@ class Service(TraitType):
         # The optional name of the trait/property to maximize.
         self._maximize = maximize
 
+        # The services found for each object (if caching is enabled).
+        #
+        # { obj : (service_registry, generation, service) }
+        self._cache = weakref.WeakKeyDictionary() if cache else None
+
         return
 
     ###########################################################################
@@ -54,12 +83,31 @@ class Service(TraitType):
 
         service_registry = self._get_service_registry(obj)
 
-
-        obj = service_registry.get_service(
+        generation = self._get_generation(service_registry)
+        if generation is not None:
+            entry = self._cache.get(obj)
+            if entry is not None and entry[0] is service_registry \
+               and entry[1] == generation:
+                # The registry doesn't see the service being used, so we tell
+                # it (otherwise the service might be evicted while in use).
+                touch_service = getattr(
+                    service_registry, 'touch_service', None
+                )
+                if touch_service is not None:
+                    touch_service(entry[2])
+
+                return entry[2]
+
+        service = service_registry.get_service(
             self._protocol, self._query, self._minimize, self._maximize
         )
 
-        return obj
+        # We got the generation *before* looking up the service, so if the
+        # services changed in the meantime we just look it up again next time.
+        if generation is not None:
+            self._cache[obj] = (service_registry, generation, service)
+
+        return service
 
     def set(self, obj, name, value):
         """ Trait type setter. """
@@ -70,6 +118,26 @@ class Service(TraitType):
     # Private interface.
     ###########################################################################
 
+    def _get_generation(self, service_registry):
+        """ Return the generation of the services for the trait's protocol.
+
+        Returns None if the service should not be cached.
+
+        """
+
+        if self._cache is None:
+            return None
+
+        # Service registries that don't keep generations (e.g. ones written
+        # before they existed) are simply not cached.
+        get_service_generation = getattr(
+            service_registry, 'get_service_generation', None
+        )
+        if get_service_generation is None:
+            return None
+
+        return get_service_generation(self._protocol)
+
     def _get_service_registry(self, obj):
         """ Return the service registry in effect for an object. """
 
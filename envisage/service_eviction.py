@@ -0,0 +1,202 @@
+""" Eviction of services that were created by factories.
+
+By default, once a service factory has been called, the service that it
+created is cached by the service registry for as long as the service is
+registered. In a long-running application that can mean holding on to large
+services (e.g. indexes or model caches) that were last used hours ago, and
+that could cheaply be created again if they are ever needed.
+
+An eviction policy lets the registry forget such services. An evicted
+service's factory is put back in its place, so the factory is simply called
+again the next time that the service is requested, e.g.::
+
+    # Evict services that haven't been used for ten minutes, and keep the
+    # total size of the cached services under 500MB.
+    service_registry.eviction_policy = EvictionPolicy(
+        idle_timeout=600, memory_budget=500 * 1024 * 1024
+    )
+
+Only singleton services created by factories are ever evicted (services that
+were registered as objects can't be created again!).
+
+Services can take part via two optional methods:
+
+'get_approximate_size()'
+    Return the approximate size of the service in bytes (otherwise the
+    shallow size given by 'sys.getsizeof' is used).
+
+'release_resources()'
+    Called after the service has been evicted. Note that the registry can't
+    know whether anybody is still using the service (e.g. it may have been
+    injected via a 'Service' trait), so this should only release resources
+    that are cheap to get back, or that the service can get back on demand.
+
+"""
+
+
+# Standard library imports.
+from collections import OrderedDict
+import threading
+import time
+
+
+# The clock used to tell how long services have been idle.
+_clock = getattr(time, 'monotonic', time.time)
+
+
+class EvictionPolicy(object):
+    """ Decides which cached services to evict (least recently used first).
+
+    The policy only does the bookkeeping. The service registry tells it when
+    services are created and used, and evicts the services that it chooses.
+
+    """
+
+    def __init__(self, idle_timeout=None, memory_budget=None, clock=None):
+        """ Constructor.
+
+        'idle_timeout' is the number of seconds after which an unused service
+        is evicted, and 'memory_budget' is the total (approximate) size in
+        bytes of the services that can be cached. Either can be None, in
+        which case services are never evicted for that reason.
+
+        """
+
+        self.idle_timeout = idle_timeout
+        self.memory_budget = memory_budget
+
+        # The clock used to tell how long services have been idle.
+        self.clock = clock or _clock
+
+        # The total size of the cached services.
+        self.total_size = 0
+
+        # The cached services, least recently used first.
+        #
+        # { service_id : [size, last_used] }
+        self._entries = OrderedDict()
+
+        # A lock that makes the policy safe to use from multiple threads.
+        self._lock = threading.Lock()
+
+        return
+
+    def __contains__(self, service_id):
+        """ Is the policy tracking the specified service? """
+
+        return service_id in self._entries
+
+    def __len__(self):
+        """ Return the number of services that the policy is tracking. """
+
+        return len(self._entries)
+
+    def add(self, service_id, size):
+        """ Start tracking a service that has just been created.
+
+        Returns the Ids of the services that should be evicted to make room
+        for it (it is never evicted itself, even if it is bigger than the
+        whole budget).
+
+        """
+
+        with self._lock:
+            entry = self._entries.pop(service_id, None)
+            if entry is not None:
+                self.total_size -= entry[0]
+
+            self._entries[service_id] = [size, self.clock()]
+            self.total_size += size
+
+            service_ids = self._collect(keep=service_id)
+
+        return service_ids
+
+    def collect(self):
+        """ Return the Ids of the services that should be evicted now.
+
+        The services are no longer tracked by the policy.
+
+        """
+
+        with self._lock:
+            service_ids = self._collect()
+
+        return service_ids
+
+    def remove(self, service_id):
+        """ Stop tracking a service (e.g. because it has been evicted). """
+
+        with self._lock:
+            entry = self._entries.pop(service_id, None)
+            if entry is not None:
+                self.total_size -= entry[0]
+
+        return
+
+    def touch(self, service_id):
+        """ Note that a service has been used.
+
+        Returns the Ids of any services that have been idle for too long.
+
+        """
+
+        # Services that aren't being tracked (e.g. ones that were registered
+        # as objects) are ignored without taking the lock.
+        if service_id not in self._entries:
+            return ()
+
+        with self._lock:
+            entry = self._entries.pop(service_id, None)
+            if entry is None:
+                return ()
+
+            entry[1] = self.clock()
+            self._entries[service_id] = entry
+
+            service_ids = self._collect(keep=service_id)
+
+        return service_ids
+
+    ###########################################################################
+    # Private interface.
+    ###########################################################################
+
+    def _collect(self, keep=None):
+        """ Remove (and return the Ids of) the services to evict.
+
+        The caller must hold the lock.
+
+        """
+
+        service_ids = []
+
+        # The services are in least recently used order, so we only ever
+        # need to look at the front of the queue.
+        if self.idle_timeout is not None:
+            expired = self.clock() - self.idle_timeout
+            for service_id, (size, last_used) in self._entries.items():
+                if last_used > expired or service_id == keep:
+                    break
+
+                service_ids.append(service_id)
+
+        if self.memory_budget is not None:
+            total_size = self.total_size - sum(
+                self._entries[service_id][0] for service_id in service_ids
+            )
+            for service_id, (size, last_used) in self._entries.items():
+                if total_size <= self.memory_budget:
+                    break
+
+                if service_id != keep and service_id not in service_ids:
+                    service_ids.append(service_id)
+                    total_size -= size
+
+        for service_id in service_ids:
+            size, last_used = self._entries.pop(service_id)
+            self.total_size -= size
+
+        return service_ids
+
+#### EOF ######################################################################
@@ -2,7 +2,10 @@
 
 
 # Enthought library imports.
-from traits.api import Callable, Dict, Either, HasTraits, Str, Type
+from traits.api import Callable, Dict, Either, HasTraits, Instance, Str, Type
+
+# Local imports.
+from .service_scope import ServiceScope
 
 
 class ServiceOffer(HasTraits):
@@ -33,4 +36,18 @@ class ServiceOffer(HasTraits):
     # This dictionary is passed as keyword arguments to the factory.
     properties = Dict
 
+    # The scope of the service, i.e. which callers share which service objects
+    # created by the factory. This is either the name of a scope:-
+    #
+    # 'singleton'  - the factory is called once and everybody shares the
+    #                service (the default).
+    # 'per_thread' - the factory is called once per thread.
+    # 'transient'  - the factory is called every time the service is
+    #                requested.
+    #
+    # or a scope object, e.g. 'pooled(max_size)' to check services out of a
+    # bounded pool (see 'envisage.service_scope'). Each time the offer is
+    # registered it gets its own copy of the scope object.
+    scope = Either(Str, Instance(ServiceScope), default='singleton')
+
 #### EOF ######################################################################
@@ -0,0 +1,182 @@
+""" Compiled service queries.
+
+A service query is an arbitrary Python expression that is evaluated against
+each candidate service (see 'IServiceRegistry.get_services'). Queries tend to
+be static strings (e.g. in 'Service' traits) that are evaluated over and over
+again, so rather than parse them on every evaluation we compile each distinct
+query once and keep the resulting code object in a bounded LRU cache.
+
+"""
+
+
+# Standard library imports.
+from collections import OrderedDict
+import threading
+import types
+
+
+class InvalidQueryError(ValueError):
+    """ Raised when a service query is not a valid Python expression. """
+
+
+class QueryNamespace(object):
+    """ A read-only view of the namespace that a query is evaluated in.
+
+    The namespace contains the service's attributes, followed by the
+    properties that the service was registered with (i.e., properties take
+    precedence over attributes). Names are looked up on demand, so evaluating
+    a query does not need to copy either dictionary.
+
+    """
+
+    __slots__ = ('_attributes', '_properties')
+
+    def __init__(self, service, properties):
+        """ Constructor. """
+
+        self._attributes = getattr(service, '__dict__', {})
+        self._properties = properties
+
+        return
+
+    def __contains__(self, name):
+        """ Return True if the namespace contains the name. """
+
+        return name in self._properties or name in self._attributes
+
+    def __getitem__(self, name):
+        """ Return the value of a name in the namespace. """
+
+        try:
+            return self._properties[name]
+
+        except KeyError:
+            return self._attributes[name]
+
+    def get(self, name, default=None):
+        """ Return the value of a name, or the default if it does not exist. """
+
+        try:
+            return self[name]
+
+        except KeyError:
+            return default
+
+
+class QueryCache(object):
+    """ A bounded, least-recently-used cache of compiled queries. """
+
+    def __init__(self, max_size=256):
+        """ Constructor. """
+
+        # The maximum number of compiled queries to keep.
+        self.max_size = max_size
+
+        # The compiled queries (and the names that they use), in order of
+        # least to most recently used.
+        #
+        # { query : (code, names) }
+        self._code = OrderedDict()
+
+        # Lookups reorder the cache, so they must not interleave.
+        self._lock = threading.Lock()
+
+        return
+
+    def __len__(self):
+        """ Return the number of queries in the cache. """
+
+        return len(self._code)
+
+    def clear(self):
+        """ Remove all queries from the cache. """
+
+        with self._lock:
+            self._code.clear()
+
+        return
+
+    def compile(self, query):
+        """ Return the code object for a query.
+
+        Raise an 'InvalidQueryError' if the query is not a valid Python
+        expression.
+
+        """
+
+        return self.lookup(query)[0]
+
+    def lookup(self, query):
+        """ Return the code object for a query and the names that it uses.
+
+        The names are those that the query (including any nested scopes such
+        as generator expressions) might look up in the namespace.
+
+        Raise an 'InvalidQueryError' if the query is not a valid Python
+        expression.
+
+        """
+
+        with self._lock:
+            entry = self._code.pop(query, None)
+            if entry is None:
+                code = self._compile(query)
+                entry = (code, frozenset(self._get_names(code)))
+                if len(self._code) >= self.max_size:
+                    self._code.popitem(last=False)
+
+            # (Re)insert the query as the most recently used one.
+            self._code[query] = entry
+
+        return entry
+
+    ###########################################################################
+    # Private interface.
+    ###########################################################################
+
+    def _compile(self, query):
+        """ Compile a query into a code object. """
+
+        try:
+            code = compile(query, '<query>', 'eval')
+
+        except (SyntaxError, ValueError, TypeError) as exc:
+            raise InvalidQueryError('invalid query %r: %s' % (query, exc))
+
+        return code
+
+    def _get_names(self, code):
+        """ Return the names used by a code object and its nested scopes. """
+
+        names = set(code.co_names)
+        for constant in code.co_consts:
+            if isinstance(constant, types.CodeType):
+                names.update(self._get_names(constant))
+
+        return names
+
+
+# The cache used by 'compile_query'.
+_query_cache = QueryCache()
+
+
+def compile_query(query):
+    """ Return the (cached) code object for a query.
+
+    Raise an 'InvalidQueryError' if the query is not a valid Python expression.
+
+    """
+
+    return _query_cache.compile(query)
+
+
+def lookup_query(query):
+    """ Return the (cached) code object for a query and the names it uses.
+
+    Raise an 'InvalidQueryError' if the query is not a valid Python expression.
+
+    """
+
+    return _query_cache.lookup(query)
+
+#### EOF ######################################################################
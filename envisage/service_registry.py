@@ -2,14 +2,25 @@
 
 
 # Standard library imports.
+from contextlib import contextmanager
 import logging
+import sys
+import threading
+import time
 
 # Enthought library imports.
-from traits.api import Dict, Event, HasTraits, Int, provides
+from traits.api import Any, Bool, Dict, Event, HasTraits, Instance, Int
+from traits.api import provides
 
 # Local imports.
+from .dispatcher import Dispatcher
+from .service_eviction import EvictionPolicy
+from .i_import_manager import IImportManager
 from .i_service_registry import IServiceRegistry
 from .import_manager import ImportManager
+from .service_query import QueryNamespace, compile_query, lookup_query
+from .service_scope import ServiceScopeStats, create_scope
+from .usage_profile import UsageProfile
 from ._compat import STRING_BASE_CLASS
 
 
@@ -21,6 +32,63 @@ class NoSuchServiceError(Exception):
     """ Raised when a required service is not found. """
 
 
+# Returned in place of a service that has not been created by its factory yet.
+_UNRESOLVED = object()
+
+
+class _Flight(object):
+    """ The creation of a service by its factory.
+
+    Threads that want a service while another thread is creating it wait on
+    the flight, and then share the result.
+
+    """
+
+    def __init__(self):
+        """ Constructor. """
+
+        # The thread that is calling the factory.
+        self.thread = threading.current_thread()
+
+        # The service created by the factory.
+        self.result = None
+
+        # The exception raised by the factory (if any).
+        self.exception = None
+
+        # Set when the factory has returned (or raised).
+        self._done = threading.Event()
+
+        return
+
+    def fail(self, exception):
+        """ Called when the factory raises an exception. """
+
+        self.exception = exception
+        self._done.set()
+
+        return
+
+    def succeed(self, result):
+        """ Called when the factory returns a service. """
+
+        self.result = result
+        self._done.set()
+
+        return
+
+    def wait(self):
+        """ Wait for the factory, and return its result (or raise its error).
+
+        """
+
+        self._done.wait()
+        if self.exception is not None:
+            raise self.exception
+
+        return self.result
+
+
 @provides(IServiceRegistry)
 class ServiceRegistry(HasTraits):
     """ The service registry. """
@@ -33,8 +101,63 @@ class ServiceRegistry(HasTraits):
     # An event that is fired when a service is unregistered.
     unregistered = Event
 
+    # An event that is fired (once) when services are registered in bulk via
+    # 'register_services', before the 'registered' event for each service.
+    # The value is the list of their Ids.
+    services_registered = Event
+
+    # An event that is fired (once) when services are unregistered in bulk via
+    # 'unregister_services', before the 'unregistered' event for each
+    # service. The value is the list of their Ids.
+    services_unregistered = Event
+
+    #### 'ServiceRegistry' interface ##########################################
+
+    # The dispatcher used to fire the 'registered' and 'unregistered' events
+    # (see 'envisage.dispatcher'). By default the events are fired
+    # synchronously, on the thread that changed the registry.
+    dispatcher = Instance(Dispatcher, ())
+
+    # An event that is fired just before a service factory is called to create
+    # a service. The value is the Id of the service (so its factory, exactly
+    # as it was registered, and its properties can be looked up).
+    #
+    # This allows, for example, a plugin manager to start the plugin that
+    # offered the service before the service is created.
+    resolving = Event
+
+    # If True then the registry can safely be read from any number of threads
+    # while it is being changed, without readers ever taking a lock.
+    #
+    # Writers take a lock and, instead of changing the list of services
+    # registered against a protocol in place, replace it with a new (immutable)
+    # tuple, so readers always see a consistent snapshot without having to
+    # copy it. Services themselves are looked up by Id, which is a single
+    # atomic dictionary lookup.
+    #
+    # This makes registering a service cost more (proportional to the number
+    # of services registered against the same protocol), so it is off by
+    # default.
+    concurrent = Bool(False)
+
+    # The policy used to evict services created by factories when they have
+    # not been used for a while, or to stay within a memory budget (see
+    # 'envisage.service_eviction'). If this is None (the default) then
+    # services are never evicted. Only services created after the policy is
+    # set can be evicted.
+    eviction_policy = Instance(EvictionPolicy)
+
+    # The usage profile that records the (singleton) services created by
+    # factories, so that they can be pre-warmed the next time that the
+    # application starts (see 'envisage.usage_profile'). If this is None (the
+    # default) then nothing is recorded.
+    usage_profile = Instance(UsageProfile)
+
     ####  Private interface ###################################################
 
+    # The import manager used to import string protocols and factories.
+    _import_manager = Instance(IImportManager, factory=ImportManager)
+
     # The services in the registry.
     #
     # { service_id : (protocol_name, obj, properties) }
@@ -50,10 +173,94 @@ class ServiceRegistry(HasTraits):
     # registered with the object.
     _services = Dict
 
+    # An index of the services in the registry by protocol name.
+    #
+    # { protocol_name : [service_id, ...] }
+    #
+    # (or '{ protocol_name : (service_id, ...) }' in concurrent mode).
+    #
+    # The Ids for each protocol are kept in the order that the services were
+    # registered in, so lookups only ever have to look at the services that
+    # were registered against the protocol that they are asking for.
+    _protocol_index = Dict
+
+    # A counter for each protocol that is incremented whenever the services
+    # registered against the protocol change (see 'get_service_generation').
+    # Entries are never removed, so that a counter never goes backwards.
+    #
+    # { protocol_name : int }
+    _generations = Dict
+
+    # The number of services registered against each protocol that are not
+    # singletons (and so must not be cached by their users).
+    #
+    # { protocol_name : int }
+    _scoped_counts = Dict
+
+    # The scopes of the services that were not registered as singletons (see
+    # 'envisage.service_scope').
+    #
+    # { service_id : ServiceScope }
+    _scopes = Dict
+
+    # The statistics for the singleton services that have been created by
+    # their factories (other services' statistics are kept by their scopes).
+    #
+    # { service_id : ServiceScopeStats }
+    _singleton_stats = Dict
+
+    # The factories that created the services that can be evicted (an
+    # evicted service's factory is put back in its place in '_services').
+    #
+    # { service_id : factory }
+    _evicted_factories = Dict
+
+    # The Ids of the services that can be evicted, keyed by the 'id' of the
+    # service objects, so that 'touch_service' can find a service without
+    # looking at all of them (the same object can be more than one service).
+    #
+    # { id(service) : [service_id, ...] }
+    _evictable_ids = Dict
+
+    # The services that were created while the usage profile was pre-warming
+    # them. They are only recorded in the profile when they are actually
+    # used (otherwise the profile would never forget a service).
+    #
+    # { service_id : (protocol_name, properties, duration) }
+    _prewarmed = Dict
+
+    # The services that each thread has checked out (see 'checkout').
+    _checkouts = Any
+
+    def __checkouts_default(self):
+        """ Trait initializer. """
+
+        return threading.local()
+
+    # The services that are currently being created by their factories.
+    #
+    # { service_id : _Flight }
+    _flights = Dict
+
+    # The flights that threads are waiting on (used to detect factories on
+    # different threads that are waiting for each other's services).
+    #
+    # { thread : _Flight }
+    _waiting = Dict
+
     # The next service Id (service Ids are never persisted between process
     # invocations so this is simply an ever increasing integer!).
     _service_id = Int
 
+    # A lock that makes registering and unregistering services safe when
+    # plugins are started concurrently (see 'PluginManager.start_mode').
+    _lock = Any
+
+    def __lock_default(self):
+        """ Trait initializer. """
+
+        return threading.RLock()
+
     ###########################################################################
     # 'IServiceRegistry' interface.
     ###########################################################################
@@ -72,14 +279,63 @@ class ServiceRegistry(HasTraits):
         return service
 
     def get_service(self, protocol, query='', minimize='', maximize=''):
-        """ Return at most one service that matches the specified query. """
+        """ Return at most one service that matches the specified query.
 
-        services = self.get_services(protocol, query, minimize, maximize)
-        if len(services) > 0:
-            service = services[0]
+        Service factories are only called for services that might be
+        returned, i.e. without any ranking the search stops at the first
+        matching service, and with ranking a factory is not called if the
+        service's properties are enough to rank it. Services are ranked by
+        the value of the attribute being minimized or maximized, except that
+        a service that hasn't been created yet is ranked by the value of the
+        property with the same name (if it was registered with one).
 
-        else:
-            service = None
+        """
+
+        if minimize == '' and maximize == '':
+            for service in self.iter_services(protocol, query):
+                return service
+
+            return None
+
+        protocol, service_ids = self._get_candidates(protocol, query)
+
+        attribute = minimize or maximize
+        best = None
+        for service_id in service_ids:
+            matched, service = self._match_service(
+                protocol, service_id, query, resolve=False
+            )
+            if not matched:
+                continue
+
+            # The service might have been unregistered (by another thread, or
+            # a factory) since it was matched.
+            entry = self._services.get(service_id)
+            if entry is None:
+                continue
+
+            # Only use the property to avoid calling the service's factory.
+            properties = entry[2]
+            if service is _UNRESOLVED and attribute in properties:
+                key = properties[attribute]
+
+            else:
+                if service is _UNRESOLVED:
+                    service = self._resolve_service(protocol, service_id)
+
+                key = getattr(service, attribute)
+
+            # Ties go to the service that was registered first (just like the
+            # stable sort in 'get_services').
+            if best is None or (key < best[0] if minimize else key > best[0]):
+                best = (key, service_id, service)
+
+        if best is None:
+            return None
+
+        key, service_id, service = best
+        if service is _UNRESOLVED:
+            service = self._resolve_service(protocol, service_id)
 
         return service
 
@@ -95,39 +351,41 @@ class ServiceRegistry(HasTraits):
         return obj
 
     def get_services(self, protocol, query='', minimize='', maximize=''):
-        """ Return all services that match the specified query. """
+        """ Return all services that match the specified query.
 
-        services = []
-        for service_id, (name, obj, properties) in self._services.items():
-            if self._get_protocol_name(protocol) == name:
-                # If the protocol is a string then we need to import it!
-                if isinstance(protocol, STRING_BASE_CLASS):
-                    actual_protocol = ImportManager().import_symbol(protocol)
+        If an attribute is being minimized or maximized then the services are
+        ranked by its value.
 
-                # Otherwise, it is an actual protocol, so just use it!
-                else:
-                    actual_protocol = protocol
+        """
 
-                # If the registered service is actually a factory then use it
-                # to create the actual object.
-                obj = self._resolve_factory(
-                    actual_protocol, name, obj, properties, service_id
-                )
+        if minimize == '' and maximize == '':
+            return list(self.iter_services(protocol, query))
 
-                # If a query was specified then only add the service if it
-                # matches it!
-                if len(query) == 0 or self._eval_query(obj, properties, query):
-                    services.append(obj)
+        protocol, service_ids = self._get_candidates(protocol, query)
 
-        # Are we minimizing or maximising anything? If so then sort the list
-        # of services by the specified attribute/property.
-        if minimize != '':
-            services.sort(key=lambda x: getattr(x, minimize))
+        attribute = minimize or maximize
+        ranked = []
+        for service_id in service_ids:
+            matched, service = self._match_service(protocol, service_id, query)
+            if matched and service_id in self._services:
+                ranked.append((getattr(service, attribute), service))
 
-        elif maximize != '':
-            services.sort(key=lambda x: getattr(x, maximize), reverse=True)
+        ranked.sort(key=lambda item: item[0], reverse=(minimize == ''))
 
-        return services
+        return [service for key, service in ranked]
+
+    def iter_services(self, protocol, query=''):
+        """ Return an iterator over the services that match a query.
+
+        Services are found lazily (in the order that they were registered),
+        so service factories are only called for the services that are
+        actually iterated over.
+
+        """
+
+        protocol, service_ids = self._get_candidates(protocol, query)
+
+        return self._iter_services(protocol, service_ids, query)
 
     def get_service_properties(self, service_id):
         """ Return the dictionary of properties associated with a service. """
@@ -141,7 +399,8 @@ class ServiceRegistry(HasTraits):
 
         return properties
 
-    def register_service(self, protocol, obj, properties=None):
+    def register_service(self, protocol, obj, properties=None,
+                         scope='singleton'):
         """ Register a service. """
 
         protocol_name = self._get_protocol_name(protocol)
@@ -150,20 +409,93 @@ class ServiceRegistry(HasTraits):
         if properties is None:
             properties = {}
 
-        service_id = self._next_service_id()
-        self._services[service_id] = (protocol_name, obj, properties)
-        self.registered = service_id
+        # Singletons (the default) are cached in '_services' when they are
+        # created, so they don't need a scope object.
+        scope = create_scope(scope)
+
+        with self._lock:
+            service_id = self._add_service(
+                protocol_name, obj, properties, scope
+            )
+            self._add_to_protocol_index(protocol_name, [service_id])
+            self._increment_generation(protocol_name)
+
+        self._fire_event('registered', service_id)
 
         logger.debug('service <%d> registered %s', service_id, protocol_name)
 
         return service_id
 
+    def register_services(self, service_offers):
+        """ Register a number of services in a single transaction.
+
+        'service_offers' is an iterable of 'ServiceOffer's (or any objects
+        with 'protocol', 'factory', 'properties' and 'scope' traits).
+
+        Either all of the services are registered or (if any of the offers
+        is invalid) none of them are. Once they have all been registered, a
+        single 'services_registered' event is fired, followed by a
+        'registered' event for each service.
+
+        Return the service Ids in the same order as the offers.
+
+        """
+
+        # Check all of the offers before we change anything.
+        registrations = [
+            (
+                self._get_protocol_name(service_offer.protocol),
+                service_offer.factory,
+                service_offer.properties,
+                create_scope(service_offer.scope)
+            )
+
+            for service_offer in service_offers
+        ]
+
+        if len(registrations) == 0:
+            return []
+
+        with self._lock:
+            service_ids = []
+
+            # The Ids of the new services grouped by protocol, so that the
+            # protocol index is only updated once per protocol.
+            by_protocol = {}
+            for protocol_name, obj, properties, scope in registrations:
+                if properties is None:
+                    properties = {}
+
+                service_id = self._add_service(
+                    protocol_name, obj, properties, scope
+                )
+                service_ids.append(service_id)
+                by_protocol.setdefault(protocol_name, []).append(service_id)
+
+            for protocol_name, protocol_service_ids in by_protocol.items():
+                self._add_to_protocol_index(
+                    protocol_name, protocol_service_ids
+                )
+                self._increment_generation(protocol_name)
+
+        self._fire_event('services_registered', service_ids)
+        for service_id in service_ids:
+            self._fire_event('registered', service_id)
+
+        logger.debug('%d services registered', len(service_ids))
+
+        return service_ids
+
     def set_service_properties(self, service_id, properties):
         """ Set the dictionary of properties associated with a service. """
 
+        # The protocol that a service is registered against never changes, so
+        # there is no need to touch the protocol index here.
         try:
-            protocol, obj, old_properties = self._services[service_id]
-            self._services[service_id] = protocol, obj, properties.copy()
+            with self._lock:
+                protocol, obj, old_properties = self._services[service_id]
+                self._services[service_id] = protocol, obj, properties.copy()
+                self._increment_generation(protocol)
 
         except KeyError:
             raise ValueError('no service with id <%d>' % service_id)
@@ -174,8 +506,14 @@ class ServiceRegistry(HasTraits):
         """ Unregister a service. """
 
         try:
-            protocol, obj, properties = self._services.pop(service_id)
-            self.unregistered = service_id
+            with self._lock:
+                protocol, scope = self._remove_service(service_id)
+                self._remove_from_protocol_index(protocol, [service_id])
+                self._increment_generation(protocol)
+
+            self._clear_service(service_id, scope)
+
+            self._fire_event('unregistered', service_id)
 
             logger.debug('service <%d> unregistered', service_id)
 
@@ -184,35 +522,429 @@ class ServiceRegistry(HasTraits):
 
         return
 
+    def unregister_services(self, service_ids):
+        """ Unregister a number of services in a single transaction.
+
+        Either all of the services are unregistered or (if any of them don't
+        exist) none of them are, in which case a 'ValueError' is raised.
+        Once they have all been unregistered, a single 'services_unregistered'
+        event is fired, followed by an 'unregistered' event for each service.
+
+        """
+
+        service_ids = list(service_ids)
+        if len(service_ids) == 0:
+            return
+
+        with self._lock:
+            # Check all of the Ids before we change anything.
+            seen = set()
+            for service_id in service_ids:
+                if service_id not in self._services:
+                    raise ValueError('no service with id <%d>' % service_id)
+
+                if service_id in seen:
+                    raise ValueError(
+                        'service <%d> can only be unregistered once'
+                        % service_id
+                    )
+
+                seen.add(service_id)
+
+            # The Ids of the services grouped by protocol, so that the
+            # protocol index is only updated once per protocol.
+            by_protocol = {}
+            scopes = []
+            for service_id in service_ids:
+                protocol, scope = self._remove_service(service_id)
+                by_protocol.setdefault(protocol, []).append(service_id)
+                scopes.append(scope)
+
+            for protocol, protocol_service_ids in by_protocol.items():
+                self._remove_from_protocol_index(
+                    protocol, protocol_service_ids
+                )
+                self._increment_generation(protocol)
+
+        for service_id, scope in zip(service_ids, scopes):
+            self._clear_service(service_id, scope)
+
+        self._fire_event('services_unregistered', service_ids)
+        for service_id in service_ids:
+            self._fire_event('unregistered', service_id)
+
+        logger.debug('%d services unregistered', len(service_ids))
+
+        return
+
+    def checkout(self, protocol, query='', minimize='', maximize=''):
+        """ Check out a service that matches the specified query.
+
+        This returns a context manager that finds the service (just like
+        'get_service') when it is entered, and gives it back when it is
+        exited, e.g.::
+
+            with service_registry.checkout(IParser) as parser:
+                parser.parse(...)
+
+        Services registered with a pooled scope can *only* be got via
+        'checkout' (the service is returned to its pool when the context
+        manager is exited). For any other service this is equivalent to
+        calling 'get_service'.
+
+        """
+
+        return self._checkout(protocol, query, minimize, maximize)
+
+    def evict_idle_services(self):
+        """ Evict the services that the eviction policy says to.
+
+        Services that have been idle for too long are normally only evicted
+        when another service is created or used. Call this (e.g. on a timer)
+        to evict them even when nothing else is going on.
+
+        Returns the Ids of the services that were evicted.
+
+        """
+
+        if self.eviction_policy is None:
+            return []
+
+        return self._evict_services(self.eviction_policy.collect())
+
+    def evict_service(self, service_id):
+        """ Evict a service that was created by a factory.
+
+        The service's factory is called again the next time that the service
+        is requested.
+
+        Returns True if the service was evicted, or False if it wasn't (i.e.
+        if it hasn't been created yet, or it was registered as an object).
+
+        """
+
+        if self.eviction_policy is not None:
+            self.eviction_policy.remove(service_id)
+
+        return len(self._evict_services([service_id])) > 0
+
+    def get_service_generation(self, protocol):
+        """ Return the generation of the services registered for a protocol.
+
+        The generation changes whenever a service is registered against the
+        protocol, unregistered, evicted or has its properties changed. So a
+        service found by a query can be cached for as long as the generation
+        of its protocol stays the same (as long as the query doesn't depend
+        on any of the services' attributes changing!).
+
+        Returns None if services registered against the protocol must not be
+        cached at all (i.e. if any of them are not singletons).
+
+        """
+
+        protocol_name = self._get_protocol_name(protocol)
+        if protocol_name in self._scoped_counts:
+            return None
+
+        return self._generations.get(protocol_name, 0)
+
+    def get_service_stats(self, service_id):
+        """ Return the statistics for a service registered as a factory.
+
+        Returns a 'ServiceScopeStats' instance that holds the number of times
+        that the factory has been called, and how many requests for the
+        service had to wait (and for how long).
+
+        If no such service exists a 'ValueError' exception is raised.
+
+        """
+
+        if service_id not in self._services:
+            raise ValueError('no service with id <%d>' % service_id)
+
+        scope = self._scopes.get(service_id)
+        if scope is not None:
+            stats = scope.stats
+
+        else:
+            stats = self._singleton_stats.get(service_id)
+            if stats is None:
+                stats = ServiceScopeStats()
+
+        return stats
+
+    def touch_service(self, service):
+        """ Note that a service was used without asking the registry for it.
+
+        Services that are cached outside the registry (e.g. by 'Service'
+        traits) call this whenever they are used, so that the eviction policy
+        (if any) doesn't evict them while they are still in use.
+
+        """
+
+        if self.eviction_policy is None:
+            return
+
+        # Only services that were created by factories can be evicted.
+        with self._lock:
+            service_ids = list(self._evictable_ids.get(id(service), ()))
+
+        for service_id in service_ids:
+            self._evict_services(self.eviction_policy.touch(service_id))
+
+        return
+
     ###########################################################################
     # Private interface.
     ###########################################################################
 
+    def _add_service(self, protocol_name, obj, properties, scope):
+        """ Add a service (but not to the protocol index!).
+
+        The caller must hold the lock. Return the service Id.
+
+        """
+
+        service_id = self._next_service_id()
+        self._services[service_id] = (protocol_name, obj, properties)
+        if scope is not None:
+            self._scopes[service_id] = scope
+            self._scoped_counts[protocol_name] = \
+                self._scoped_counts.get(protocol_name, 0) + 1
+
+        return service_id
+
+    def _add_to_protocol_index(self, protocol_name, service_ids):
+        """ Add service Ids to the protocol index. """
+
+        if self.concurrent:
+            existing = self._protocol_index.get(protocol_name, ())
+            self._protocol_index[protocol_name] = existing + tuple(service_ids)
+
+        else:
+            self._protocol_index.setdefault(protocol_name, []).extend(
+                service_ids
+            )
+
+        return
+
+    def _call_factory(self, factory, properties, service_id):
+        """ Call a service factory to create a service. """
+
+        # A service factory is any callable that takes two arguments, the
+        # first is the protocol, the second is the (possibly empty)
+        # dictionary of properties that were registered with the service.
+        #
+        # Let anyone who is interested know that the factory is about to be
+        # used.
+        self.resolving = service_id
+
+        # If the factory is specified as a symbol path then import it.
+        if isinstance(factory, STRING_BASE_CLASS):
+            factory = self._import_manager.import_symbol(factory)
+
+        return factory(**properties)
+
+    def _can_eval_query_on_properties(self, query, properties):
+        """ Can a query be evaluated using just a service's properties?
+
+        i.e. does every name that the query uses refer to a property (in
+        which case the service's attributes would never be looked at, so it
+        does not need to be created by its factory).
+
+        """
+
+        code, names = lookup_query(query)
+        for name in names:
+            if name not in properties:
+                return False
+
+        return True
+
+    @contextmanager
+    def _checkout(self, protocol, query, minimize, maximize):
+        """ The context manager returned by 'checkout'. """
+
+        # Collect any pooled services that are checked out while we look for
+        # the service (more than one might be, e.g. when ranking services).
+        stack = getattr(self._checkouts, 'stack', None)
+        if stack is None:
+            stack = self._checkouts.stack = []
+
+        checkouts = []
+        stack.append(checkouts)
+        try:
+            service = self.get_service(protocol, query, minimize, maximize)
+
+        except BaseException:
+            self._release_checkouts(checkouts)
+            raise
+
+        finally:
+            stack.pop()
+
+        # Give back any pooled services that we don't need straight away.
+        needed, unneeded = [], []
+        for checkout in checkouts:
+            if checkout[1] is service and len(needed) == 0:
+                needed.append(checkout)
+
+            else:
+                unneeded.append(checkout)
+
+        self._release_checkouts(unneeded)
+
+        try:
+            yield service
+
+        finally:
+            self._release_checkouts(needed)
+
+    def _clear_service(self, service_id, scope):
+        """ Clean up after a service has been unregistered.
+
+        This is done *without* holding the lock.
+
+        """
+
+        if self.eviction_policy is not None:
+            self.eviction_policy.remove(service_id)
+
+        if scope is not None:
+            scope.clear()
+
+        return
+
+    def _concurrent_changed(self, new):
+        """ Static trait change handler. """
+
+        # The protocol index holds lists when the registry isn't concurrent
+        # and tuples when it is, so convert it to the new representation.
+        convert = tuple if new else list
+        with self._lock:
+            self._protocol_index = dict(
+                (protocol_name, convert(service_ids))
+                for protocol_name, service_ids in self._protocol_index.items()
+            )
+
+        return
+
     def _create_namespace(self, service, properties):
-        """ Create a namespace in which to evaluate a query. """
+        """ Create a namespace in which to evaluate a query.
 
-        namespace = {}
-        namespace.update(service.__dict__)
-        namespace.update(properties)
+        The namespace is a read-only view onto the service's attributes and
+        properties, so nothing is copied.
 
-        return namespace
+        """
+
+        return QueryNamespace(service, properties)
+
+    def _end_flight(self, service_id, flight):
+        """ Stop tracking the creation of a service.
+
+        The caller must hold the lock.
+
+        """
+
+        # If a factory asked for its own service then the nested call
+        # replaced our flight with its own (and has already removed it).
+        if self._flights.get(service_id) is flight:
+            del self._flights[service_id]
+
+        return
 
     def _eval_query(self, service, properties, query):
         """ Evaluate a query over a single service.
 
         Return True if the service matches the query, otherwise return False.
 
+        Raise an 'InvalidQueryError' if the query is not a valid Python
+        expression.
+
         """
 
+        code, names = lookup_query(query)
+
+        # The namespace is used as the *globals* so that nested scopes in the
+        # query (e.g. generator expressions) can see it too. Only the names
+        # that the query actually uses are copied out of it.
         namespace = self._create_namespace(service, properties)
+        query_globals = dict(
+            (name, namespace[name]) for name in names if name in namespace
+        )
         try:
-            result = eval(query, namespace)
+            result = eval(code, query_globals)
 
-        except:
+        except Exception:
             result = False
 
         return result
 
+    def _evict_services(self, service_ids):
+        """ Evict services (putting their factories back in their place).
+
+        Returns the Ids of the services that were actually evicted.
+
+        """
+
+        evicted = []
+        for service_id in service_ids:
+            with self._lock:
+                factory = self._evicted_factories.pop(service_id, None)
+                entry = self._services.get(service_id)
+                if factory is None or entry is None:
+                    continue
+
+                name, service, properties = entry
+                self._services[service_id] = (name, factory, properties)
+                self._forget_evictable_service(service_id, service)
+
+                # Don't let anyone who cached the service keep it alive.
+                self._increment_generation(name)
+
+            evicted.append(service_id)
+
+            logger.debug('service <%d> evicted', service_id)
+
+            # Give the service a chance to let go of anything expensive.
+            release_resources = getattr(service, 'release_resources', None)
+            if release_resources is not None:
+                try:
+                    release_resources()
+
+                except Exception:
+                    logger.exception(
+                        'error releasing resources of service <%d>',
+                        service_id
+                    )
+
+        return evicted
+
+    def _fire_event(self, trait_name, value):
+        """ Fire one of the registry's events via the dispatcher. """
+
+        if self.dispatcher.synchronous:
+            setattr(self, trait_name, value)
+
+        else:
+            self.dispatcher.dispatch(setattr, (self, trait_name, value))
+
+        return
+
+    def _forget_evictable_service(self, service_id, service):
+        """ Forget that a service can be evicted.
+
+        The caller must hold the lock.
+
+        """
+
+        service_ids = self._evictable_ids[id(service)]
+        service_ids.remove(service_id)
+        if len(service_ids) == 0:
+            del self._evictable_ids[id(service)]
+
+        return
+
     def _get_protocol_name(self, protocol_or_name):
         """ Returns the full class name for a protocol. """
 
@@ -226,6 +958,99 @@ class ServiceRegistry(HasTraits):
 
         return name
 
+    def _get_candidates(self, protocol, query):
+        """ Return the services that might match a query.
+
+        Returns a tuple in the form '(actual_protocol, service_ids)' where
+        'actual_protocol' is the protocol itself (imported if necessary) and
+        'service_ids' is a copy of the Ids of the services registered against
+        it (a service factory might register other services when it is
+        called). In concurrent mode the Ids are an immutable snapshot, so
+        there is no need to copy them.
+
+        """
+
+        protocol_name = self._get_protocol_name(protocol)
+
+        # Compile the query up front so that an invalid query is reported
+        # whether or not there are any services to evaluate it against.
+        if len(query) > 0:
+            compile_query(query)
+
+        # If nothing has been registered against the protocol then there is
+        # nothing to look at (and, importantly, nothing to import!).
+        service_ids = self._protocol_index.get(protocol_name)
+        if not service_ids:
+            return protocol, []
+
+        # If the protocol is a string then we need to import it!
+        if isinstance(protocol, STRING_BASE_CLASS):
+            actual_protocol = self._import_manager.import_symbol(protocol)
+
+        # Otherwise, it is an actual protocol, so just use it!
+        else:
+            actual_protocol = protocol
+
+        if not self.concurrent:
+            service_ids = service_ids[:]
+
+        return actual_protocol, service_ids
+
+    def _get_scoped_service(self, scope, factory, properties, service_id):
+        """ Get a service from its scope. """
+
+        if scope.checkout_required:
+            stack = getattr(self._checkouts, 'stack', None)
+            if not stack:
+                raise ValueError(
+                    'service <%d> must be got via checkout' % service_id
+                )
+
+        service = scope.get(
+            lambda: self._call_factory(factory, properties, service_id)
+        )
+        if scope.checkout_required:
+            stack[-1].append((scope, service))
+
+        return service
+
+    def _get_service_size(self, service):
+        """ Return the approximate size of a service (in bytes). """
+
+        get_approximate_size = getattr(service, 'get_approximate_size', None)
+        if get_approximate_size is not None:
+            size = get_approximate_size()
+
+        else:
+            size = sys.getsizeof(service)
+
+        return size
+
+    def _get_singleton_stats(self, service_id):
+        """ Return the statistics for a singleton service.
+
+        The caller must hold the lock.
+
+        """
+
+        stats = self._singleton_stats.get(service_id)
+        if stats is None:
+            stats = self._singleton_stats[service_id] = ServiceScopeStats()
+
+        return stats
+
+    def _increment_generation(self, protocol_name):
+        """ Note that the services registered for a protocol have changed.
+
+        The caller must hold the lock.
+
+        """
+
+        self._generations[protocol_name] = \
+            self._generations.get(protocol_name, 0) + 1
+
+        return
+
     def _is_service_factory(self, protocol, obj):
         """ Is the object a factory for services supporting the protocol? """
 
@@ -235,6 +1060,80 @@ class ServiceRegistry(HasTraits):
 
         return not isinstance(obj, protocol)
 
+    def _is_waiting_for_us(self, flight):
+        """ Would waiting on a flight deadlock the current thread?
+
+        That is the case if the flight is the current thread's own, or if the
+        thread that owns it is waiting (perhaps via other threads) on one of
+        the current thread's flights. The caller must hold the lock.
+
+        """
+
+        current_thread = threading.current_thread()
+
+        thread = flight.thread
+        while thread is not current_thread:
+            flight = self._waiting.get(thread)
+            if flight is None:
+                return False
+
+            thread = flight.thread
+
+        return True
+
+    def _iter_services(self, protocol, service_ids, query):
+        """ Generate the services that match a query. """
+
+        for service_id in service_ids:
+            matched, service = self._match_service(protocol, service_id, query)
+            if matched:
+                yield service
+
+        return
+
+    def _match_service(self, protocol, service_id, query, resolve=True):
+        """ Does a service match a query?
+
+        Returns a tuple in the form '(matched, service)'.
+
+        If the query can be evaluated using just the service's properties then
+        the service is only created by its factory (if it is registered as
+        one) if it matches. If 'resolve' is False then it is not created at
+        all if it doesn't need to be, in which case '_UNRESOLVED' is returned
+        in place of the service.
+
+        """
+
+        # The service might have been unregistered since we got its Id (e.g.
+        # by a factory called while iterating over services).
+        try:
+            name, obj, properties = self._services[service_id]
+
+        except KeyError:
+            return False, None
+
+        if len(query) > 0:
+            if self._can_eval_query_on_properties(query, properties):
+                if not self._eval_query(None, properties, query):
+                    return False, None
+
+            else:
+                obj = self._resolve_factory(
+                    protocol, name, obj, properties, service_id
+                )
+                if not self._eval_query(obj, properties, query):
+                    return False, None
+
+        if resolve:
+            obj = self._resolve_factory(
+                protocol, name, obj, properties, service_id
+            )
+
+        elif self._is_service_factory(protocol, obj):
+            obj = _UNRESOLVED
+
+        return True, obj
+
     def _next_service_id(self):
         """ Returns the next service ID. """
 
@@ -242,25 +1141,211 @@ class ServiceRegistry(HasTraits):
 
         return self._service_id
 
+    def _record_prewarmed_service(self, service_id):
+        """ Record the first real use of a service created by pre-warming. """
+
+        usage_profile = self.usage_profile
+        if usage_profile is None or usage_profile.is_prewarming():
+            return
+
+        with self._lock:
+            entry = self._prewarmed.pop(service_id, None)
+
+        if entry is not None:
+            usage_profile.record_service(*entry)
+
+        return
+
+    def _release_checkouts(self, checkouts):
+        """ Give back services that were checked out of their scopes. """
+
+        for scope, service in checkouts:
+            scope.release(service)
+
+        return
+
+    def _remove_from_protocol_index(self, protocol_name, service_ids):
+        """ Remove service Ids from the protocol index. """
+
+        removed = set(service_ids)
+        service_ids = [
+            other for other in self._protocol_index[protocol_name]
+            if other not in removed
+        ]
+        if self.concurrent:
+            service_ids = tuple(service_ids)
+
+        self._protocol_index[protocol_name] = service_ids
+
+        # Don't let the index fill up with empty lists for protocols that no
+        # longer have any services.
+        if len(service_ids) == 0:
+            del self._protocol_index[protocol_name]
+
+        return
+
+    def _remove_service(self, service_id):
+        """ Remove a service (but not from the protocol index!).
+
+        The caller must hold the lock. Return a tuple in the form
+        '(protocol_name, scope)'. Raise a 'KeyError' if there is no such
+        service.
+
+        """
+
+        protocol_name, obj, properties = self._services.pop(service_id)
+        self._singleton_stats.pop(service_id, None)
+        if self._evicted_factories.pop(service_id, None) is not None:
+            self._forget_evictable_service(service_id, obj)
+
+        self._prewarmed.pop(service_id, None)
+        scope = self._scopes.pop(service_id, None)
+        if scope is not None:
+            count = self._scoped_counts.pop(protocol_name) - 1
+            if count > 0:
+                self._scoped_counts[protocol_name] = count
+
+        return protocol_name, scope
+
+    def _resolve_service(self, protocol, service_id):
+        """ Return a service, creating it if it was registered as a factory.
+
+        """
+
+        # The service might have been unregistered since it was found.
+        try:
+            name, obj, properties = self._services[service_id]
+
+        except KeyError:
+            return None
+
+        return self._resolve_factory(
+            protocol, name, obj, properties, service_id
+        )
+
     def _resolve_factory(self, protocol, name, obj, properties, service_id):
-        """ If 'obj' is a factory then use it to create the actual service. """
+        """ If 'obj' is a factory then use it to create the actual service.
+
+        Only one thread at a time calls the factory for any given service.
+        Any other threads that want the service while it is being created
+        wait for it, and then share it (or, if the factory raises an
+        exception, get the same exception).
+
+        """
 
         # Is the registered service actually a service *factory*?
-        if self._is_service_factory(protocol, obj):
-            # A service factory is any callable that takes two arguments, the
-            # first is the protocol, the second is the (possibly empty)
-            # dictionary of properties that were registered with the service.
-            #
-            # If the factory is specified as a symbol path then import it.
-            if isinstance(obj, STRING_BASE_CLASS):
-                obj = ImportManager().import_symbol(obj)
-
-            obj = obj(**properties)
-
-            # The resulting service object replaces the factory in the cache
-            # (i.e. the factory will not get called again unless it is
-            # unregistered first).
-            self._services[service_id] = (name, obj, properties)
+        if not self._is_service_factory(protocol, obj):
+            # Is this the first real use of a service created by pre-warming?
+            if self._prewarmed and service_id in self._prewarmed:
+                self._record_prewarmed_service(service_id)
+
+            # Let the eviction policy (if any) know that the service is being
+            # used.
+            if self.eviction_policy is not None:
+                self._evict_services(self.eviction_policy.touch(service_id))
+
+            return obj
+
+        # The factory exactly as it was registered.
+        factory = obj
+
+        # Services that are not singletons are created by their scopes.
+        scope = self._scopes.get(service_id)
+        if scope is not None:
+            return self._get_scoped_service(
+                scope, factory, properties, service_id
+            )
+
+        with self._lock:
+            # Another thread might have created the service since we looked
+            # it up.
+            entry = self._services.get(service_id)
+            if entry is not None and entry[1] is not factory:
+                return entry[1]
+
+            # If another thread is already creating the service then wait for
+            # it to finish. If it is *this* thread (i.e. the factory wants its
+            # own service), or a thread that is (indirectly) waiting for this
+            # one (i.e. factories on different threads want each other's
+            # services), then waiting would deadlock, so we carry on and call
+            # the factory again.
+            flight = self._flights.get(service_id)
+            if flight is not None and not self._is_waiting_for_us(flight):
+                wait = True
+                self._waiting[threading.current_thread()] = flight
+
+            else:
+                flight = self._flights[service_id] = _Flight()
+                wait = False
+
+        if wait:
+            start = time.time()
+            try:
+                return flight.wait()
+
+            finally:
+                with self._lock:
+                    del self._waiting[threading.current_thread()]
+                    if service_id in self._services:
+                        stats = self._get_singleton_stats(service_id)
+                        stats.waits += 1
+                        stats.wait_time += time.time() - start
+
+        start = time.time()
+        try:
+            obj = self._call_factory(factory, properties, service_id)
+
+        except BaseException as exc:
+            # The factory stays registered, so the next request for the
+            # service will call it again.
+            with self._lock:
+                self._end_flight(service_id, flight)
+
+            flight.fail(exc)
+            raise
+
+        # The resulting service object replaces the factory in the cache
+        # (i.e. the factory will not get called again unless it is
+        # unregistered first, or the service is evicted).
+        duration = time.time() - start
+        created = evictable = False
+        with self._lock:
+            entry = self._services.get(service_id)
+            if entry is not None and entry[1] is factory:
+                self._services[service_id] = (name, obj, properties)
+                self._get_singleton_stats(service_id).created += 1
+                created = True
+
+                if self.eviction_policy is not None:
+                    self._evicted_factories[service_id] = factory
+                    self._evictable_ids.setdefault(id(obj), []).append(
+                        service_id
+                    )
+                    evictable = True
+
+            # If the service was created while we were calling the factory
+            # (i.e. by a nested call) then everybody gets that one.
+            elif entry is not None:
+                obj = entry[1]
+
+            self._end_flight(service_id, flight)
+
+        flight.succeed(obj)
+
+        if created and self.usage_profile is not None:
+            if self.usage_profile.is_prewarming():
+                with self._lock:
+                    self._prewarmed[service_id] = (name, properties, duration)
+
+            else:
+                self.usage_profile.record_service(name, properties, duration)
+
+        if evictable:
+            self._evict_services(
+                self.eviction_policy.add(
+                    service_id, self._get_service_size(obj)
+                )
+            )
 
         return obj
 
@@ -0,0 +1,318 @@
+""" Service scopes decide how often a service factory is called.
+
+When a service is registered as a factory (e.g. via a 'ServiceOffer'), its
+scope decides which callers share which service objects:
+
+'singleton'
+    The factory is called once, and everybody shares the service (the
+    default, and the only behaviour before scopes existed).
+
+'per_thread'
+    The factory is called once per thread, and each thread gets its own
+    service (e.g. for services that are expensive to create but not
+    thread-safe, such as database connections).
+
+'transient'
+    The factory is called every time the service is requested.
+
+'pooled(max_size)'
+    Services are checked out of a pool of at most 'max_size' services, and
+    returned to it when they are finished with, e.g.::
+
+        with service_registry.checkout(IParser) as parser:
+            parser.parse(...)
+
+    If all of the services in a full pool are checked out then 'checkout'
+    waits until one is returned.
+
+A scope object such as 'pooled(max_size)' is a specification: each
+registration gets its own copy of it, so the same scope (e.g. from a
+'ServiceOffer' that is registered more than once, or in more than one service
+registry) never shares services or statistics between registrations.
+
+Each scope keeps statistics about the services that it creates and hands
+out (see 'ServiceScopeStats').
+
+"""
+
+
+# Standard library imports.
+import threading
+import time
+
+
+class ServiceScopeStats(object):
+    """ Statistics about the services created and handed out by a scope. """
+
+    __slots__ = ('created', 'waits', 'wait_time')
+
+    def __init__(self):
+        """ Constructor. """
+
+        # The number of times that the factory has been called.
+        self.created = 0
+
+        # The number of requests that had to wait for a service (i.e. for
+        # another thread to create a singleton, or for a pooled service to be
+        # returned).
+        self.waits = 0
+
+        # The total time (in seconds) spent waiting.
+        self.wait_time = 0.0
+
+        return
+
+    def __repr__(self):
+        """ Return a string representation of the statistics. """
+
+        return 'ServiceScopeStats(created=%d, waits=%d, wait_time=%.6f)' % (
+            self.created, self.waits, self.wait_time
+        )
+
+
+class ServiceScope(object):
+    """ The base class for all service scopes. """
+
+    # The name of the scope.
+    name = None
+
+    # True if services must be returned to the scope when they are finished
+    # with (i.e. they can only be used via 'ServiceRegistry.checkout').
+    checkout_required = False
+
+    def __init__(self):
+        """ Constructor. """
+
+        # Statistics about the services created and handed out by the scope.
+        self.stats = ServiceScopeStats()
+
+        # A lock that protects the scope's state.
+        self._lock = threading.Lock()
+
+        return
+
+    def clear(self):
+        """ Forget about any services that have been created.
+
+        This is called when the service is unregistered.
+
+        """
+
+        return
+
+    def copy(self):
+        """ Return a new scope configured like this one.
+
+        The new scope has no services and its own statistics.
+
+        """
+
+        return type(self)()
+
+    def get(self, create):
+        """ Return a service.
+
+        'create' is a callable that takes no arguments, and calls the factory
+        to create a new service.
+
+        """
+
+        raise NotImplementedError
+
+    def release(self, service):
+        """ Return a service that was got from the scope. """
+
+        return
+
+    ###########################################################################
+    # Protected 'ServiceScope' interface.
+    ###########################################################################
+
+    def _create(self, create):
+        """ Create a service and count it. """
+
+        service = create()
+        with self._lock:
+            self.stats.created += 1
+
+        return service
+
+
+class PerThreadScope(ServiceScope):
+    """ The factory is called once per thread. """
+
+    name = 'per_thread'
+
+    def __init__(self):
+        """ Constructor. """
+
+        super(PerThreadScope, self).__init__()
+
+        # Each thread's service.
+        self._local = threading.local()
+
+        return
+
+    def clear(self):
+        """ Forget about any services that have been created. """
+
+        # We can't get at other threads' services, so we just replace the
+        # lot.
+        self._local = threading.local()
+
+        return
+
+    def get(self, create):
+        """ Return a service. """
+
+        local = self._local
+        service = getattr(local, 'service', local)
+        if service is local:
+            service = local.service = self._create(create)
+
+        return service
+
+
+class TransientScope(ServiceScope):
+    """ The factory is called every time the service is requested. """
+
+    name = 'transient'
+
+    def get(self, create):
+        """ Return a service. """
+
+        return self._create(create)
+
+
+class PooledScope(ServiceScope):
+    """ Services are checked out of (and returned to) a bounded pool. """
+
+    name = 'pooled'
+
+    checkout_required = True
+
+    def __init__(self, max_size):
+        """ Constructor. """
+
+        if max_size < 1:
+            raise ValueError('a pool must hold at least one service')
+
+        super(PooledScope, self).__init__()
+
+        # The maximum number of services in the pool.
+        self.max_size = max_size
+
+        # The services that are not checked out.
+        self._idle = []
+
+        # The number of services that exist (checked out or not).
+        self._size = 0
+
+        # Notified when a service is returned to the pool.
+        self._returned = threading.Condition(self._lock)
+
+        return
+
+    @property
+    def checked_out(self):
+        """ The number of services that are currently checked out. """
+
+        return self._size - len(self._idle)
+
+    def clear(self):
+        """ Forget about any services that have been created. """
+
+        with self._lock:
+            self._size -= len(self._idle)
+            self._idle = []
+
+        return
+
+    def copy(self):
+        """ Return a new scope configured like this one. """
+
+        return PooledScope(self.max_size)
+
+    def get(self, create):
+        """ Check a service out of the pool. """
+
+        with self._lock:
+            # Wait for a service to be returned if the pool is full and they
+            # are all checked out.
+            if len(self._idle) == 0 and self._size >= self.max_size:
+                start = time.time()
+                while len(self._idle) == 0 and self._size >= self.max_size:
+                    self._returned.wait()
+
+                self.stats.waits += 1
+                self.stats.wait_time += time.time() - start
+
+            if len(self._idle) > 0:
+                return self._idle.pop()
+
+            # Reserve a place in the pool for the service that we are about to
+            # create.
+            self._size += 1
+
+        try:
+            service = self._create(create)
+
+        except BaseException:
+            with self._lock:
+                self._size -= 1
+                self._returned.notify()
+
+            raise
+
+        return service
+
+    def release(self, service):
+        """ Return a service to the pool. """
+
+        with self._lock:
+            self._idle.append(service)
+            self._returned.notify()
+
+        return
+
+
+def pooled(max_size):
+    """ Return a scope that pools at most 'max_size' services. """
+
+    return PooledScope(max_size)
+
+
+# The scopes that can be specified by name (singletons are cached by the
+# service registry itself, so they don't need a scope object).
+SCOPES = {
+    'singleton'  : None,
+    'per_thread' : PerThreadScope,
+    'transient'  : TransientScope,
+}
+
+
+def create_scope(scope):
+    """ Return a new scope given either its name or a scope object.
+
+    A scope object is used as a specification, and a copy of it is returned
+    (so each registration gets its own services and statistics). Returns None
+    for the 'singleton' scope. Raise a 'ValueError' if there is no scope with
+    the specified name.
+
+    """
+
+    if isinstance(scope, ServiceScope):
+        return scope.copy()
+
+    try:
+        scope_class = SCOPES[scope]
+
+    except KeyError:
+        raise ValueError('no such service scope %r' % (scope,))
+
+    if scope_class is None:
+        return None
+
+    return scope_class()
+
+#### EOF ######################################################################
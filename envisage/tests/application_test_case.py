@@ -7,7 +7,8 @@ import os, shutil, unittest
 # Enthought library imports.
 from traits.etsconfig.api import ETSConfig
 from envisage.api import Application, ExtensionPoint
-from envisage.api import Plugin, PluginManager
+from envisage.api import Plugin, PluginManager, ServiceOffer, contributes_to
+from envisage.core_plugin import CorePlugin
 from traits.api import Bool, Int, List
 
 # Local imports.
@@ -110,6 +111,20 @@ class PluginC(Plugin):
     x  = List(Int, [98, 99, 100], contributes_to='a.x')
 
 
+class LazyPlugin(SimplePlugin):
+    """ A plugin that is only started when it is first used. """
+
+    id = 'lazy'
+    activation = 'lazy'
+
+    x = ExtensionPoint(List, id='lazy.x')
+
+    service_offers = List(
+        [ServiceOffer(protocol=int, factory=lambda: 42)],
+        contributes_to='envisage.service_offers'
+    )
+
+
 class ApplicationTestCase(unittest.TestCase):
     """ Tests for applications and plugins. """
 
@@ -408,6 +423,54 @@ class ApplicationTestCase(unittest.TestCase):
 
         return
 
+    def test_add_and_remove_plugins(self):
+        """ add and remove plugins """
+
+        class PluginD(Plugin):
+            """ Yet another plugin that contributes to an extension point! """
+
+            id = 'D'
+            x  = List(Int, [7, 8], contributes_to='a.x')
+
+        class PluginE(PluginA):
+            """ A plugin that listens to its extension point. """
+
+            id = 'E'
+            x_events = List
+
+            def _x_items_changed(self, event):
+                """ Static trait change handler. """
+
+                self.x_events.append(event)
+
+                return
+
+        b = PluginB()
+        c = PluginC()
+        d = PluginD()
+        e = PluginE()
+
+        application = TestApplication(plugins=[e])
+        application.start()
+        self.assertEqual([], e.x)
+
+        # Add several plugins at once.
+        application.add_plugins([b, c, d])
+
+        self.assertEqual([1, 2, 3, 98, 99, 100, 7, 8], e.x)
+        self.assertEqual(1, len(e.x_events))
+        self.assertEqual([1, 2, 3, 98, 99, 100, 7, 8], e.x_events[0].added)
+
+        # And remove them again.
+        application.remove_plugins([b, d])
+
+        self.assertEqual([98, 99, 100], e.x)
+        self.assertEqual(2, len(e.x_events))
+        self.assertEqual([1, 2, 3, 98, 99, 100, 7, 8], e.x_events[1].removed)
+        self.assertEqual([98, 99, 100], e.x_events[1].added)
+
+        return
+
     def test_get_plugin(self):
         """ get plugin """
 
@@ -487,6 +550,111 @@ class ApplicationTestCase(unittest.TestCase):
 
         return
 
+    def test_lazy_plugin_started_on_first_extension_point_access(self):
+        """ lazy plugin started on first extension point access """
+
+        lazy = LazyPlugin()
+
+        application = TestApplication(
+            plugins=[CorePlugin(), lazy, PluginA(), PluginB()]
+        )
+        application.start()
+        self.assertEqual(False, lazy.started)
+
+        # Reading the contributions to an extension point that the plugin
+        # does *not* offer doesn't start it...
+        self.assertEqual([1, 2, 3], application.get_extensions('a.x'))
+        self.assertEqual(False, lazy.started)
+
+        # ... but reading one that it does offer does.
+        self.assertEqual([], application.get_extensions('lazy.x'))
+        self.assertEqual(True, lazy.started)
+
+        application.stop()
+        self.assertEqual(True, lazy.stopped)
+
+        return
+
+    def test_lazy_plugin_started_on_first_service_offer_use(self):
+        """ lazy plugin started on first service offer use """
+
+        lazy = LazyPlugin()
+
+        application = TestApplication(plugins=[CorePlugin(), lazy])
+        application.start()
+        self.assertEqual(False, lazy.started)
+
+        self.assertEqual(42, application.get_service(int))
+        self.assertEqual(True, lazy.started)
+
+        return
+
+    def test_lazy_plugins_sharing_a_service_factory(self):
+        """ lazy plugins sharing a service factory """
+
+        def factory(**properties):
+            return properties['name']
+
+        class PluginD(SimplePlugin):
+            id = 'D'
+            activation = 'lazy'
+
+            service_offers = List(
+                [
+                    ServiceOffer(
+                        protocol=str, factory=factory,
+                        properties={'name' : 'd'}
+                    )
+                ],
+                contributes_to='envisage.service_offers'
+            )
+
+        class PluginE(SimplePlugin):
+            id = 'E'
+            activation = 'lazy'
+
+            # Offers contributed by methods are created anew every time that
+            # the contributions are asked for.
+            @contributes_to('envisage.service_offers')
+            def _get_service_offers(self):
+                return [
+                    ServiceOffer(
+                        protocol=str, factory=factory,
+                        properties={'name' : 'e'}
+                    )
+                ]
+
+        d = PluginD()
+        e = PluginE()
+        application = TestApplication(plugins=[CorePlugin(), d, e])
+        application.start()
+
+        # Only the plugin that offered the service is started.
+        self.assertEqual('e', application.get_service(str, "name == 'e'"))
+        self.assertEqual(False, d.started)
+        self.assertEqual(True, e.started)
+
+        self.assertEqual('d', application.get_service(str, "name == 'd'"))
+        self.assertEqual(True, d.started)
+
+        application.stop()
+
+        return
+
+    def test_lazy_plugin_never_used_is_not_started_or_stopped(self):
+        """ lazy plugin never used is not started or stopped """
+
+        lazy = LazyPlugin()
+
+        application = TestApplication(plugins=[CorePlugin(), lazy])
+        application.start()
+        application.stop()
+
+        self.assertEqual(False, lazy.started)
+        self.assertEqual(False, lazy.stopped)
+
+        return
+
 
 # Entry point for stand-alone testing.
 if __name__ == '__main__':
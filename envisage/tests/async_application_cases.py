@@ -0,0 +1,364 @@
+""" Tests for the asyncio application.
+
+The tests use 'async def', which older Pythons can't compile, so they are
+kept out of test discovery and imported by 'async_application_test_case'
+(only on Pythons that support asyncio applications).
+
+"""
+
+
+# Standard library imports.
+import asyncio
+
+# Enthought library imports.
+from envisage.api import AsyncApplication, AsyncPluginActivator, Plugin
+from envisage.core_plugin import CorePlugin
+from traits.api import Any, HasTraits, Interface, List, provides
+from traits.testing.unittest_tools import unittest
+
+
+class TestApplication(AsyncApplication):
+    """ The type of application used in the tests. """
+
+    id = 'test'
+
+
+class IFoo(Interface):
+    """ The protocol that services are registered against. """
+
+
+@provides(IFoo)
+class Foo(HasTraits):
+    """ A service. """
+
+
+class AsyncPlugin(Plugin):
+    """ A plugin that starts and stops asynchronously. """
+
+    # The list that the plugin records its events in (shared by all plugins,
+    # so it is not a 'List' trait, which would make a copy).
+    events = Any
+
+    # An optional coroutine function that the plugin awaits when it starts.
+    wait = Any
+
+    async def start(self):
+        """ Start the plugin. """
+
+        self.events.append(('starting', self.id))
+        if self.wait is not None:
+            await self.wait()
+
+        await asyncio.sleep(0)
+        self.events.append(('started', self.id))
+
+        return
+
+    async def stop(self):
+        """ Stop the plugin. """
+
+        self.events.append(('stopping', self.id))
+        await asyncio.sleep(0)
+        self.events.append(('stopped', self.id))
+
+        return
+
+
+class AsyncApplicationTestCase(unittest.TestCase):
+    """ Tests for the asyncio application. """
+
+    ###########################################################################
+    # 'TestCase' interface.
+    ###########################################################################
+
+    def setUp(self):
+        """ Prepares the test fixture before each test method is called. """
+
+        self.loop = asyncio.new_event_loop()
+
+        return
+
+    def tearDown(self):
+        """ Called immediately after each test method has been called. """
+
+        self.loop.close()
+
+        return
+
+    ###########################################################################
+    # Tests.
+    ###########################################################################
+
+    def test_independent_plugins_start_concurrently(self):
+        """ independent plugins start concurrently """
+
+        # Each plugin waits for the other to start, so they can only both
+        # start if they start concurrently.
+        a_starting = asyncio.Event()
+        b_starting = asyncio.Event()
+
+        async def wait_for_b():
+            a_starting.set()
+            await asyncio.wait_for(b_starting.wait(), 5)
+
+        async def wait_for_a():
+            b_starting.set()
+            await asyncio.wait_for(a_starting.wait(), 5)
+
+        events = []
+        a = AsyncPlugin(id='a', events=events, wait=wait_for_b)
+        b = AsyncPlugin(id='b', events=events, wait=wait_for_a)
+        application = TestApplication(plugins=[a, b], loop=self.loop)
+
+        self.assertTrue(self._run(application.start_async()))
+        self.assertEqual(
+            set(['a', 'b']), set(plugin_id for event, plugin_id in events[:2])
+        )
+        self.assertEqual(4, len(events))
+
+        self.assertTrue(self._run(application.stop_async()))
+        self.assertEqual(8, len(events))
+
+        return
+
+    def test_dependencies_are_respected(self):
+        """ dependencies are respected """
+
+        events = []
+        a = AsyncPlugin(id='a', events=events)
+        b = AsyncPlugin(id='b', events=events, requires=['a'])
+        c = AsyncPlugin(id='c', events=events, after=['b'])
+        application = TestApplication(plugins=[c, b, a], loop=self.loop)
+
+        self._run(application.start_async())
+        self.assertEqual(
+            [
+                ('starting', 'a'), ('started', 'a'),
+                ('starting', 'b'), ('started', 'b'),
+                ('starting', 'c'), ('started', 'c'),
+            ],
+            events
+        )
+
+        del events[:]
+        self._run(application.stop_async())
+        self.assertEqual(
+            [
+                ('stopping', 'c'), ('stopped', 'c'),
+                ('stopping', 'b'), ('stopped', 'b'),
+                ('stopping', 'a'), ('stopped', 'a'),
+            ],
+            events
+        )
+
+        return
+
+    def test_failed_start(self):
+        """ failed start """
+
+        async def fail():
+            raise ValueError('broken')
+
+        events = []
+        a = AsyncPlugin(id='a', events=events, wait=fail)
+        b = AsyncPlugin(id='b', events=events, requires=['a'])
+        c = AsyncPlugin(id='c', events=events)
+        application = TestApplication(plugins=[a, b, c], loop=self.loop)
+
+        with self.assertRaises(ValueError):
+            self._run(application.start_async())
+
+        # The plugin that depends on the broken one isn't started (but the
+        # independent one is).
+        self.assertNotIn(('starting', 'b'), events)
+        self.assertIn(('started', 'c'), events)
+
+        return
+
+    def test_synchronous_plugins(self):
+        """ synchronous plugins """
+
+        class SyncPlugin(Plugin):
+            events = List
+
+            def start(self):
+                self.events.append('started')
+
+            def stop(self):
+                self.events.append('stopped')
+
+        plugin = SyncPlugin()
+        application = TestApplication(plugins=[plugin], loop=self.loop)
+
+        self._run(application.start_async())
+        self.assertEqual(['started'], plugin.events)
+
+        self._run(application.stop_async())
+        self.assertEqual(['started', 'stopped'], plugin.events)
+
+        return
+
+    def test_run(self):
+        """ run """
+
+        class StoppingPlugin(AsyncPlugin):
+            async def start(self):
+                await super(StoppingPlugin, self).start()
+                self.application.loop.call_later(0.01, self.application.stop)
+
+        events = []
+        plugin = StoppingPlugin(id='a', events=events)
+        application = TestApplication(plugins=[plugin], loop=self.loop)
+
+        # The application runs until the plugin stops it (and it is only
+        # stopped once).
+        application.run()
+        self.assertEqual(
+            [
+                ('starting', 'a'), ('started', 'a'),
+                ('stopping', 'a'), ('stopped', 'a'),
+            ],
+            events
+        )
+
+        return
+
+    def test_stop_while_starting(self):
+        """ stop while starting """
+
+        class StoppingPlugin(AsyncPlugin):
+            async def start(self):
+                await super(StoppingPlugin, self).start()
+                self.application.stop()
+
+        events = []
+        plugin = StoppingPlugin(id='a', events=events)
+        application = TestApplication(plugins=[plugin], loop=self.loop)
+
+        # The event loop isn't run at all.
+        application.run()
+        self.assertEqual(
+            [
+                ('starting', 'a'), ('started', 'a'),
+                ('stopping', 'a'), ('stopped', 'a'),
+            ],
+            events
+        )
+
+        return
+
+    def test_veto_start(self):
+        """ veto start """
+
+        events = []
+        plugin = AsyncPlugin(id='a', events=events)
+        application = TestApplication(plugins=[plugin], loop=self.loop)
+        application.on_trait_change(self._veto, 'starting')
+
+        self.assertFalse(application.start())
+        self.assertEqual([], events)
+
+        return
+
+    def test_async_service_factory(self):
+        """ async service factory """
+
+        calls = []
+        async def foo_factory(**properties):
+            calls.append(properties)
+            await asyncio.sleep(0)
+            return Foo()
+
+        application = TestApplication(
+            plugins=[CorePlugin()], loop=self.loop
+        )
+        application.register_service(IFoo, foo_factory)
+
+        async def get_services():
+            return await asyncio.gather(
+                application.get_service_async(IFoo),
+                application.get_required_service_async(IFoo),
+                application.get_services_async(IFoo)
+            )
+
+        a, b, (c,) = self._run(get_services())
+        self.assertEqual(Foo, type(a))
+        self.assertIs(a, b)
+        self.assertIs(a, c)
+        self.assertEqual(1, len(calls))
+
+        # Once the service has been created it replaces the factory's task.
+        self.assertIs(a, application.get_service(IFoo))
+
+        return
+
+    def test_failed_async_service_factory(self):
+        """ failed async service factory """
+
+        calls = []
+        async def foo_factory(**properties):
+            calls.append(properties)
+            await asyncio.sleep(0)
+            if len(calls) == 1:
+                raise ValueError('broken')
+
+            return Foo()
+
+        application = TestApplication(loop=self.loop)
+        application.register_service(IFoo, foo_factory)
+
+        async def get_services():
+            return await asyncio.gather(
+                application.get_service_async(IFoo),
+                application.get_service_async(IFoo),
+                return_exceptions=True
+            )
+
+        a, b = self._run(get_services())
+        self.assertIsInstance(a, ValueError)
+        self.assertIs(a, b)
+
+        # The factory is called again the next time the service is requested.
+        service = self._run(application.get_service_async(IFoo))
+        self.assertEqual(Foo, type(service))
+        self.assertEqual(2, len(calls))
+
+        return
+
+    def test_synchronous_start_uses_the_application_loop(self):
+        """ synchronous start uses the application loop """
+
+        loops = []
+        class LoopPlugin(Plugin):
+            id = 'loop'
+
+            async def start(self):
+                loops.append(asyncio.get_running_loop())
+
+        application = TestApplication(loop=self.loop)
+        plugin = LoopPlugin(application=application)
+
+        # e.g. when the plugin is activated lazily.
+        AsyncPluginActivator().start_plugin(plugin)
+        self.assertEqual([self.loop], loops)
+        self.assertFalse(self.loop.is_closed())
+
+        return
+
+    ###########################################################################
+    # Private interface.
+    ###########################################################################
+
+    def _run(self, coroutine):
+        """ Run a coroutine on the test's event loop. """
+
+        return self.loop.run_until_complete(coroutine)
+
+    def _veto(self, event):
+        """ Veto an application event. """
+
+        event.veto = True
+
+        return
+
+#### EOF ######################################################################
@@ -0,0 +1,23 @@
+""" Tests for the asyncio application. """
+
+
+# Standard library imports.
+import sys
+
+# Enthought library imports.
+from traits.testing.unittest_tools import unittest
+
+
+# Asyncio applications need Python 3.7 or later.
+if sys.version_info < (3, 7):
+    raise unittest.SkipTest('asyncio applications need Python 3.7 or later')
+
+# Local imports.
+from envisage.tests.async_application_cases import AsyncApplicationTestCase
+
+
+# Entry point for stand-alone testing.
+if __name__ == '__main__':
+    unittest.main()
+
+#### EOF ######################################################################
@@ -0,0 +1,225 @@
+""" Stress tests for the registries in concurrent mode. """
+
+
+# Standard library imports.
+import threading
+
+# Enthought library imports.
+from envisage.api import ExtensionPoint, ExtensionProvider
+from envisage.api import ProviderExtensionRegistry, ServiceRegistry
+from traits.api import Int, List
+from traits.testing.unittest_tools import unittest
+
+
+class Foo(object):
+    """ The protocol that services are registered against. """
+
+    def __init__(self, w=None, i=None):
+        """ Constructor. """
+
+        # The writer that registered the service, and its number.
+        self.w = w
+        self.i = i
+
+        return
+
+
+class Provider(ExtensionProvider):
+    """ A provider that contributes three extensions to 'x'. """
+
+    # A number that identifies the provider's contributions.
+    n = Int
+
+    def get_extensions(self, extension_point_id):
+        """ Return the provider's extensions to an extension point. """
+
+        if extension_point_id == 'x':
+            return [(self.n, 0), (self.n, 1), (self.n, 2)]
+
+        return []
+
+
+def run_threads(targets):
+    """ Run each target in a thread of its own, and wait for them all.
+
+    Returns the exceptions raised by the targets (if any).
+
+    """
+
+    errors = []
+    def run(target):
+        try:
+            target()
+
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [
+        threading.Thread(target=run, args=(target,)) for target in targets
+    ]
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    return errors
+
+
+class ConcurrentRegistryTestCase(unittest.TestCase):
+    """ Stress tests for the registries in concurrent mode. """
+
+    # The number of reader and writer threads.
+    READERS = 4
+    WRITERS = 2
+
+    # The number of changes made by each writer.
+    CHANGES = 300
+
+    ###########################################################################
+    # Tests.
+    ###########################################################################
+
+    def test_service_registry(self):
+        """ service registry """
+
+        service_registry = ServiceRegistry(concurrent=True)
+        done = threading.Event()
+
+        def writer(w):
+            for i in range(self.CHANGES):
+                service_id = service_registry.register_service(
+                    Foo, Foo(w, i), {'i' : i}
+                )
+                if i % 2:
+                    service_registry.unregister_service(service_id)
+
+        def reader():
+            while not done.is_set():
+                services = service_registry.get_services(Foo)
+
+                # Each writer's services are seen in the order that they were
+                # registered in.
+                for w in range(self.WRITERS):
+                    numbers = [
+                        service.i for service in services if service.w == w
+                    ]
+                    self.assertEqual(sorted(numbers), numbers)
+
+                service_registry.get_services(Foo, 'i > 10', maximize='i')
+
+        def writers():
+            try:
+                self._check_no_errors(
+                    run_threads(
+                        [lambda w=w: writer(w) for w in range(self.WRITERS)]
+                    )
+                )
+
+            finally:
+                done.set()
+
+        self._check_no_errors(
+            run_threads([writers] + [reader] * self.READERS)
+        )
+
+        # Only the services that weren't unregistered are left.
+        services = service_registry.get_services(Foo)
+        self.assertEqual(self.WRITERS * self.CHANGES // 2, len(services))
+
+        return
+
+    def test_service_factory(self):
+        """ service factory """
+
+        service_registry = ServiceRegistry(concurrent=True)
+        service_registry.register_service(Foo, lambda **properties: Foo())
+
+        barrier = threading.Event()
+        services = []
+        def reader():
+            barrier.wait()
+            services.append(service_registry.get_service(Foo))
+
+        threads = [threading.Thread(target=reader) for i in range(8)]
+        for thread in threads:
+            thread.start()
+
+        barrier.set()
+        for thread in threads:
+            thread.join()
+
+        # Everybody gets the same service.
+        self.assertEqual(8, len(services))
+        self.assertEqual(1, len(set(map(id, services))))
+
+        return
+
+    def test_extension_registry(self):
+        """ extension registry """
+
+        registry = ProviderExtensionRegistry(concurrent=True)
+        registry.add_extension_point(ExtensionPoint(List, id='x'))
+        registry.add_provider(Provider(n=-1))
+
+        done = threading.Event()
+
+        def writer(w):
+            for i in range(self.CHANGES):
+                provider = Provider(n=w * self.CHANGES + i)
+                registry.add_provider(provider)
+                if i % 2:
+                    registry.remove_provider(provider)
+
+        def reader():
+            while not done.is_set():
+                extensions = registry.get_extensions('x')
+
+                # Each provider's contributions are all there (and in order).
+                self.assertEqual(0, len(extensions) % 3)
+                for index in range(0, len(extensions), 3):
+                    n = extensions[index][0]
+                    self.assertEqual(
+                        [(n, 0), (n, 1), (n, 2)], extensions[index:index + 3]
+                    )
+
+        def writers():
+            try:
+                self._check_no_errors(
+                    run_threads(
+                        [lambda w=w: writer(w) for w in range(self.WRITERS)]
+                    )
+                )
+
+            finally:
+                done.set()
+
+        self._check_no_errors(
+            run_threads([writers] + [reader] * self.READERS)
+        )
+
+        extensions = registry.get_extensions('x')
+        self.assertEqual(
+            3 * (1 + self.WRITERS * self.CHANGES // 2), len(extensions)
+        )
+
+        return
+
+    ###########################################################################
+    # Private interface.
+    ###########################################################################
+
+    def _check_no_errors(self, errors):
+        """ Re-raise the first error raised by a thread (if any). """
+
+        if len(errors) > 0:
+            raise errors[0]
+
+        return
+
+
+# Entry point for stand-alone testing.
+if __name__ == '__main__':
+    unittest.main()
+
+#### EOF ######################################################################
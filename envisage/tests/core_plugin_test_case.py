@@ -91,6 +91,60 @@ class CorePluginTestCase(unittest.TestCase):
 
         return
 
+    def test_registered_events_for_service_offers(self):
+        """ registered events for service offers """
+
+        from envisage.core_plugin import CorePlugin
+
+        class IMyService(Interface):
+            pass
+
+        class PluginA(Plugin):
+            id = 'A'
+
+            service_offers = List(
+                [
+                    ServiceOffer(protocol=IMyService, factory=lambda: 42),
+                    ServiceOffer(protocol=IMyService, factory=lambda: 43)
+                ],
+                contributes_to='envisage.service_offers'
+            )
+
+        core = CorePlugin()
+        a    = PluginA()
+
+        application = TestApplication(plugins=[core, a])
+
+        # Listeners to the per-service events see the services registered
+        # (and unregistered) in bulk by the core plugin.
+        registered = []
+        application.service_registry.on_trait_change(
+            lambda service_id: registered.append(service_id), 'registered'
+        )
+
+        unregistered = []
+        application.service_registry.on_trait_change(
+            lambda service_id: unregistered.append(service_id), 'unregistered'
+        )
+
+        application.start()
+        self.assertEqual(2, len(registered))
+
+        # The services haven't been created yet, so the registry holds their
+        # factories.
+        self.assertEqual(
+            [42, 43],
+            [
+                application.get_service_from_id(service_id)()
+                for service_id in registered
+            ]
+        )
+
+        application.stop_plugin(core)
+        self.assertEqual(sorted(registered), sorted(unregistered))
+
+        return
+
     def test_dynamically_added_service_offer(self):
         """ dynamically added service offer """
 
@@ -151,6 +205,47 @@ class CorePluginTestCase(unittest.TestCase):
 
         return
 
+    def test_reassigned_service_offers(self):
+        """ reassigned service offers """
+
+        from envisage.core_plugin import CorePlugin
+
+        class IMyService(Interface):
+            pass
+
+        class PluginA(Plugin):
+            id = 'A'
+
+            service_offers = List(
+                contributes_to='envisage.service_offers'
+            )
+
+        offers = [
+            ServiceOffer(protocol=IMyService, factory=lambda: i)
+            for i in range(1000)
+        ]
+
+        core = CorePlugin()
+        a    = PluginA(service_offers=offers)
+
+        application = TestApplication(plugins=[core, a])
+        application.start()
+
+        registered = []
+        application.service_registry.on_trait_change(
+            lambda service_id: registered.append(service_id), 'registered'
+        )
+
+        # Refresh the list of offers with one new offer in the middle.
+        a.service_offers = offers[:500] + [
+            ServiceOffer(protocol=IMyService, factory=lambda: 42)
+        ] + offers[500:]
+
+        # Only the new offer should have been registered.
+        self.assertEqual(1, len(registered))
+
+        return
+
     def test_categories(self):
         """ categories """
 
@@ -0,0 +1,253 @@
+""" Tests for the dispatchers used to call registry listeners. """
+
+
+# Standard library imports.
+import threading
+
+# Enthought library imports.
+from envisage.api import Application, ExtensionPoint, Plugin
+from envisage.api import QueuedDispatcher, ServiceRegistry, ThreadDispatcher
+from envisage.dispatcher import MarshallingDispatcher
+from traits.api import List
+from traits.testing.unittest_tools import unittest
+
+# Local imports.
+from envisage.tests.mutable_extension_registry import MutableExtensionRegistry
+
+
+class DispatcherTestCase(unittest.TestCase):
+    """ Tests for the dispatchers used to call registry listeners. """
+
+    ###########################################################################
+    # 'TestCase' interface.
+    ###########################################################################
+
+    def setUp(self):
+        """ Prepares the test fixture before each test method is called. """
+
+        self.registry = MutableExtensionRegistry()
+        self.registry.add_extension_point(self._create_extension_point('x'))
+        self.registry.add_extension_point(self._create_extension_point('y'))
+
+        self.events = []
+        self.registry.add_extension_point_listener(self._listener)
+
+        return
+
+    ###########################################################################
+    # Tests.
+    ###########################################################################
+
+    def test_queued(self):
+        """ queued """
+
+        self.registry.dispatcher = QueuedDispatcher(coalesce=False)
+
+        self.registry.add_extension('x', 1)
+        self.registry.add_extension('x', 2)
+        self.assertEqual([], self.events)
+        self.assertEqual(2, self.registry.dispatcher.pending)
+
+        self.registry.dispatcher.flush()
+        self.assertEqual(
+            [('x', [1], [], 0), ('x', [2], [], 1)], self._get_changes()
+        )
+        self.assertEqual(0, self.registry.dispatcher.pending)
+
+        return
+
+    def test_queued_and_coalesced(self):
+        """ queued and coalesced """
+
+        self.registry.dispatcher = QueuedDispatcher()
+
+        self.registry.add_extension('x', 1)
+        self.registry.add_extension('y', 42)
+        self.registry.add_extension('x', 2)
+        self.registry.add_extensions('x', [3, 4])
+        self.assertEqual([], self.events)
+        self.assertEqual(1, self.registry.dispatcher.pending)
+
+        # Each extension point gets a single event with the net change.
+        self.registry.dispatcher.flush()
+        self.assertEqual(
+            [('x', [1, 2, 3, 4], [], 0), ('y', [42], [], 0)],
+            sorted(self._get_changes())
+        )
+
+        # Changes made after a flush are reported by the next one.
+        del self.events[:]
+        self.registry.set_extensions('x', [1, 2, 5, 4])
+        self.registry.dispatcher.flush()
+        self.assertEqual([('x', [5], [3], 2)], self._get_changes())
+
+        return
+
+    def test_batch_with_coalescing_dispatcher(self):
+        """ batch with coalescing dispatcher """
+
+        self.registry.dispatcher = QueuedDispatcher()
+
+        with self.registry.batch():
+            self.registry.add_extension('x', 1)
+            self.registry.dispatcher.flush()
+            self.assertEqual([], self.events)
+
+            self.registry.add_extension('x', 2)
+
+        self.registry.dispatcher.flush()
+        self.assertEqual([('x', [1, 2], [], 0)], self._get_changes())
+
+        return
+
+    def test_coalesced_multiple_changes_to_a_contribution(self):
+        """ coalesced multiple changes to a contribution """
+
+        class PluginA(Plugin):
+            id = 'A'
+
+            x = ExtensionPoint(List, id='a.x')
+
+        class PluginB(Plugin):
+            id = 'B'
+
+            x = List([1, 2, 3], contributes_to='a.x')
+
+        dispatcher = QueuedDispatcher()
+        b = PluginB()
+        application = Application(
+            id='test', plugins=[PluginA(), b], dispatcher=dispatcher
+        )
+        self.assertEqual([1, 2, 3], application.get_extensions('a.x'))
+
+        events = []
+        def listener(registry, event):
+            events.append((event.added, event.removed, event.index))
+
+        application.add_extension_point_listener(listener, 'a.x')
+
+        # The reassignment changes two separate parts of the list.
+        b.x = [0, 2, 4]
+        b.x.append(5)
+        dispatcher.flush()
+
+        self.assertEqual([([0, 2, 4, 5], [1, 2, 3], 0)], events)
+
+        return
+
+    def test_marshalling(self):
+        """ marshalling """
+
+        scheduled = []
+        dispatcher = MarshallingDispatcher(invoke_later=scheduled.append)
+        self.registry.dispatcher = dispatcher
+
+        # The flush is scheduled once, however many changes are made.
+        self.registry.add_extension('x', 1)
+        self.registry.add_extension('x', 2)
+        self.assertEqual([dispatcher.flush], scheduled)
+        self.assertEqual([], self.events)
+
+        scheduled.pop()()
+        self.assertEqual([('x', [1, 2], [], 0)], self._get_changes())
+
+        return
+
+    def test_thread(self):
+        """ thread """
+
+        dispatcher = ThreadDispatcher()
+        self.registry.dispatcher = dispatcher
+
+        called = threading.Event()
+        threads = []
+        def listener(extension_registry, event):
+            threads.append(threading.current_thread())
+            called.set()
+
+        self.registry.add_extension_point_listener(listener, 'x')
+        self.registry.add_extension('x', 1)
+
+        self.assertTrue(called.wait(10))
+        dispatcher.stop()
+
+        self.assertEqual([dispatcher.thread], threads)
+
+        return
+
+    def test_listener_errors_do_not_stop_the_flush(self):
+        """ listener errors do not stop the flush """
+
+        dispatcher = QueuedDispatcher(coalesce=False)
+
+        def fail():
+            raise ValueError('oops')
+
+        calls = []
+        dispatcher.dispatch(fail)
+        dispatcher.dispatch(calls.append, (42,))
+        dispatcher.flush()
+
+        self.assertEqual([42], calls)
+
+        return
+
+    def test_service_registry(self):
+        """ service registry """
+
+        service_registry = ServiceRegistry(dispatcher=QueuedDispatcher())
+
+        registered = []
+        service_registry.on_trait_change(
+            lambda service_id: registered.append(service_id), 'registered'
+        )
+
+        service_id = service_registry.register_service(int, 42)
+        self.assertEqual([], registered)
+
+        service_registry.dispatcher.flush()
+        self.assertEqual([service_id], registered)
+
+        return
+
+    def test_application(self):
+        """ application """
+
+        dispatcher = QueuedDispatcher()
+        application = Application(dispatcher=dispatcher)
+
+        self.assertIs(dispatcher, application.extension_registry.dispatcher)
+        self.assertIs(dispatcher, application.service_registry.dispatcher)
+
+        return
+
+    ###########################################################################
+    # Private interface.
+    ###########################################################################
+
+    def _create_extension_point(self, id):
+        """ Create an extension point. """
+
+        return ExtensionPoint(id=id, trait_type=List)
+
+    def _get_changes(self):
+        """ Return the changes reported by the events received so far. """
+
+        return [
+            (event.extension_point_id, event.added, event.removed, event.index)
+            for event in self.events
+        ]
+
+    def _listener(self, extension_registry, event):
+        """ An extension point listener. """
+
+        self.events.append(event)
+
+        return
+
+
+# Entry point for stand-alone testing.
+if __name__ == '__main__':
+    unittest.main()
+
+#### EOF ######################################################################
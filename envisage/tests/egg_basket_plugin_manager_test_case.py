@@ -2,13 +2,16 @@
 from __future__ import print_function
 
 import glob
+import os
 import sys
 from os.path import basename, dirname, join
 import pkg_resources
 import shutil
 import tempfile
 
+from envisage.egg_basket_cache import EggBasketCache
 from envisage.egg_basket_plugin_manager import EggBasketPluginManager
+from envisage.egg_utils import add_eggs_on_path
 from traits.testing.unittest_tools import unittest
 
 
@@ -226,8 +229,140 @@ class EggBasketPluginManagerTestCase(unittest.TestCase):
 
         return
 
+    def test_discovery_cache(self):
+        discovery_cache = self._get_discovery_cache_filename()
+
+        def find_plugin_ids():
+            plugin_manager = EggBasketPluginManager(
+                plugin_path     = [self.eggs_dir],
+                discovery_cache = discovery_cache
+            )
+
+            return [plugin.id for plugin in plugin_manager]
+
+        # The first search populates the cache...
+        expected = ['acme.foo', 'acme.bar', 'acme.baz']
+        self.assertEqual(expected, find_plugin_ids())
+        self.assertEqual(
+            expected,
+            self._find_cached_entry_points(discovery_cache, self.eggs_dir)
+        )
+
+        # ... and the next one uses it.
+        self.assertEqual(expected, find_plugin_ids())
+
+        return
+
+    def test_discovery_cache_reproduces_a_full_scan(self):
+        discovery_cache = self._get_discovery_cache_filename()
+        eggs_dir = self._copy_eggs('acme.*.egg')
+
+        plugin_manager = EggBasketPluginManager(
+            plugin_path     = [eggs_dir],
+            exclude         = ['*'],
+            discovery_cache = discovery_cache
+        )
+        self.assertEqual([], list(plugin_manager))
+
+        # The eggs are in the same order as in a full scan, both when the
+        # cache is used as is...
+        working_set = pkg_resources.WorkingSet([eggs_dir])
+        add_eggs_on_path(working_set, [eggs_dir])
+        expected = [distribution.location for distribution in working_set]
+
+        cache = EggBasketCache(discovery_cache)
+        distributions, entry_points = cache.find_distributions(
+            [eggs_dir], EggBasketPluginManager.ENVISAGE_PLUGINS_ENTRY_POINT
+        )
+        self.assertEqual(
+            expected, [distribution.location for distribution in distributions]
+        )
+
+        # ... and none of the eggs were opened to find them.
+        for distribution in distributions:
+            self.assertIsNone(distribution._provider._metadata)
+
+        # ... and when the order is rebuilt after a change.
+        for egg in glob.glob(join(eggs_dir, 'acme.foo*.egg')):
+            os.utime(egg, (0, 0))
+
+        distributions, entry_points = cache.find_distributions(
+            [eggs_dir], EggBasketPluginManager.ENVISAGE_PLUGINS_ENTRY_POINT
+        )
+        self.assertEqual(
+            expected, [distribution.location for distribution in distributions]
+        )
+        self.assertEqual(
+            ['acme.foo', 'acme.bar', 'acme.baz'],
+            [entry_point.name for entry_point in entry_points]
+        )
+
+        return
+
+    def test_discovery_cache_is_updated_incrementally(self):
+        discovery_cache = self._get_discovery_cache_filename()
+        eggs_dir = self._copy_eggs('acme.*.egg')
+
+        # Populate the cache (excluding all of the plugins means that nothing
+        # gets imported from the temporary directory).
+        plugin_manager = EggBasketPluginManager(
+            plugin_path     = [eggs_dir],
+            exclude         = ['*'],
+            discovery_cache = discovery_cache
+        )
+        self.assertEqual([], list(plugin_manager))
+
+        expected = ['acme.foo', 'acme.bar', 'acme.baz']
+        self.assertEqual(
+            expected, self._find_cached_entry_points(discovery_cache, eggs_dir)
+        )
+
+        # Removing an egg updates the cache.
+        for egg in glob.glob(join(eggs_dir, 'acme.baz*.egg')):
+            os.remove(egg)
+
+        self.assertEqual(
+            ['acme.foo', 'acme.bar'],
+            self._find_cached_entry_points(discovery_cache, eggs_dir)
+        )
+
+        # As does adding one back.
+        for egg in glob.glob(join(self.eggs_dir, 'acme.baz*.egg')):
+            shutil.copy(egg, eggs_dir)
+
+        self.assertEqual(
+            expected, self._find_cached_entry_points(discovery_cache, eggs_dir)
+        )
+
+        # But if an egg's requirements can't be resolved by the other eggs
+        # then the cache can't be used (and a full search is needed to report
+        # the problem).
+        for egg in glob.glob(join(eggs_dir, 'acme.bar*.egg')):
+            os.remove(egg)
+
+        self.assertEqual(
+            None, self._find_cached_entry_points(discovery_cache, eggs_dir)
+        )
+
+        return
+
     #### Private protocol #####################################################
 
+    def _copy_eggs(self, egg_pat):
+        """ Copy the eggs matching a glob pattern to a new temp dir.
+
+        Returns the new directory.
+
+        """
+
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+
+        for egg in glob.glob(join(self.eggs_dir, egg_pat)):
+            shutil.copy(egg, tmpdir)
+
+        return tmpdir
+
     def _test_start_and_stop(self, plugin_manager, expected):
         """ Make sure the plugin manager starts and stops the expected plugins.
 
@@ -258,6 +393,32 @@ class EggBasketPluginManagerTestCase(unittest.TestCase):
 
         return
 
+    def _find_cached_entry_points(self, discovery_cache, eggs_dir):
+        """ Return the names of the entry points found using a cache.
+
+        Returns None if the cache can't be used.
+
+        """
+
+        cache = EggBasketCache(discovery_cache)
+        result = cache.find_distributions(
+            [eggs_dir], EggBasketPluginManager.ENVISAGE_PLUGINS_ENTRY_POINT
+        )
+        if result is None:
+            return None
+
+        distributions, entry_points = result
+
+        return [entry_point.name for entry_point in entry_points]
+
+    def _get_discovery_cache_filename(self):
+        """ Return the name of a discovery cache file in a new temp dir. """
+
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+
+        return join(tmpdir, 'plugins.json')
+
     def _create_broken_distribution_eggdir(self, egg_pat, replacement=None):
         """ Copy a good egg to a different version egg name in a new temp dir
         and return the new directory.
@@ -0,0 +1,174 @@
+""" Tests for the extension index. """
+
+
+# Enthought library imports.
+from envisage.api import ExtensionPoint, Plugin, contributes_to
+from envisage.extension_index import get_extension_index
+from envisage.extension_index import invalidate_extension_index
+from traits.api import HasTraits, List
+from traits.testing.unittest_tools import unittest
+
+
+class PluginA(Plugin):
+    """ A plugin that offers an extension point. """
+
+    x = ExtensionPoint(List, id='a.x')
+
+    y = List(contributes_to='a.y')
+
+    @contributes_to('a.z')
+    def _get_z(self):
+        """ Contribute to 'a.z'. """
+
+        return [1, 2, 3]
+
+
+class PluginB(PluginA):
+    """ A plugin that overrides a contributing method. """
+
+    def _get_z(self):
+        """ No longer contributes to 'a.z'. """
+
+        return [4, 5, 6]
+
+
+class ExtensionIndexTestCase(unittest.TestCase):
+    """ Tests for the extension index. """
+
+    ###########################################################################
+    # Tests.
+    ###########################################################################
+
+    def test_index(self):
+        """ index """
+
+        index = get_extension_index(PluginA())
+        self.assertEqual(['x'], index.extension_point_traits)
+        self.assertEqual({'a.y' : ['y']}, index.contributing_traits)
+        self.assertEqual({'a.z' : ['_get_z']}, index.contributing_methods)
+
+        # Only the most derived definition of a method counts.
+        index = get_extension_index(PluginB())
+        self.assertEqual({}, index.contributing_methods)
+
+        return
+
+    def test_index_is_shared_by_instances_of_a_class(self):
+        """ index is shared by instances of a class """
+
+        self.assertIs(
+            get_extension_index(PluginA()), get_extension_index(PluginA())
+        )
+
+        self.assertIsNot(
+            get_extension_index(PluginA()), get_extension_index(PluginB())
+        )
+
+        return
+
+    def test_class_trait_added(self):
+        """ class trait added """
+
+        class Foo(HasTraits):
+            pass
+
+        foo = Foo()
+        self.assertEqual({}, get_extension_index(foo).contributing_traits)
+
+        Foo.add_class_trait('bar', List(contributes_to='a.bar'))
+        self.assertEqual(
+            {'a.bar' : ['bar']}, get_extension_index(foo).contributing_traits
+        )
+
+        return
+
+    def test_class_trait_replaced(self):
+        """ class trait replaced """
+
+        class Foo(HasTraits):
+            bar = List(contributes_to='a.bar')
+
+        foo = Foo()
+        self.assertEqual(
+            {'a.bar' : ['bar']}, get_extension_index(foo).contributing_traits
+        )
+
+        # Replacing a trait doesn't change the number of traits, so the index
+        # must be invalidated explicitly.
+        Foo.__base_traits__['bar'] = List(contributes_to='a.baz').as_ctrait()
+        invalidate_extension_index(Foo)
+        self.assertEqual(
+            {'a.baz' : ['bar']}, get_extension_index(foo).contributing_traits
+        )
+
+        return
+
+    def test_instance_trait_added(self):
+        """ instance trait added """
+
+        a = PluginA()
+        a.add_trait('w', List([42], contributes_to='a.w'))
+
+        index = get_extension_index(a)
+        self.assertEqual(
+            {'a.w' : ['w'], 'a.y' : ['y']}, index.contributing_traits
+        )
+        self.assertEqual([42], a.get_extensions('a.w'))
+
+        # Other instances of the class are not affected.
+        index = get_extension_index(PluginA())
+        self.assertEqual({'a.y' : ['y']}, index.contributing_traits)
+        self.assertEqual([], PluginA().get_extensions('a.w'))
+
+        return
+
+    def test_listening_to_traits_does_not_invalidate_index(self):
+        """ listening to traits does not invalidate index """
+
+        a = PluginA()
+        a.on_trait_change(lambda: None, 'y')
+        a.on_trait_change(lambda: None, 'x_items')
+
+        self.assertIs(get_extension_index(PluginA()), get_extension_index(a))
+
+        # Nor does adding traits that have nothing to do with extensions.
+        a.add_trait('w', List([42]))
+        self.assertIs(get_extension_index(PluginA()), get_extension_index(a))
+
+        # But replacing an instance trait does.
+        a.add_trait('w', List([42], contributes_to='a.w'))
+        self.assertEqual(
+            {'a.w' : ['w'], 'a.y' : ['y']},
+            get_extension_index(a).contributing_traits
+        )
+
+        return
+
+    def test_instance_trait_replaced(self):
+        """ instance trait replaced """
+
+        class Foo(HasTraits):
+            pass
+
+        foo = Foo()
+        foo.add_trait('bar', List(contributes_to='a.bar'))
+        index = get_extension_index(foo)
+        self.assertEqual({'a.bar' : ['bar']}, index.contributing_traits)
+        self.assertIs(index, get_extension_index(foo))
+
+        # 'Plugin.add_trait' does this for us, but 'HasTraits.add_trait'
+        # doesn't.
+        foo.add_trait('bar', List(contributes_to='a.baz'))
+        invalidate_extension_index(foo)
+        self.assertEqual(
+            {'a.baz' : ['bar']}, get_extension_index(foo).contributing_traits
+        )
+
+        return
+
+
+# Entry point for stand-alone testing.
+if __name__ == '__main__':
+    unittest.main()
+
+#### EOF ######################################################################
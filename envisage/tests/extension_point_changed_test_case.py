@@ -2,6 +2,8 @@
 
 
 # Enthought library imports.
+from envisage.api import Plugin
+from traits.api import Int, List
 from traits.testing.unittest_tools import unittest
 
 # Local imports.
@@ -175,8 +177,7 @@ class ExtensionPointChangedTestCase(unittest.TestCase):
         self.assertEqual('x_items', listener.trait_name)
         self.assertEqual([], listener.new.added)
         self.assertEqual([1, 2, 3], listener.new.removed)
-        self.assertEqual(0, listener.new.index.start)
-        self.assertEqual(3, listener.new.index.stop)
+        self.assertEqual(0, listener.new.index)
 
         return
 
@@ -245,14 +246,15 @@ class ExtensionPointChangedTestCase(unittest.TestCase):
         self.assertEqual(7, len(extensions))
         self.assertEqual([2, 4, 6, 8, 98, 99, 100], extensions)
 
-        # Make sure we got a trait event telling us that the contributions
-        # to the extension point have been changed.
+        # Make sure we got trait events telling us that the contributions
+        # to the extension point have been changed (only the contributions
+        # that actually changed are reported, i.e. '1' was removed, '2' stayed
+        # where it was, and '3' was replaced by '4, 6, 8').
         self.assertEqual(a, listener.obj)
         self.assertEqual('x_items', listener.trait_name)
-        self.assertEqual([2, 4, 6, 8], listener.new.added)
-        self.assertEqual([1, 2, 3], listener.new.removed)
-        self.assertEqual(0, listener.new.index.start)
-        self.assertEqual(4, listener.new.index.stop)
+        self.assertEqual([4, 6, 8], listener.new.added)
+        self.assertEqual([3], listener.new.removed)
+        self.assertEqual(1, listener.new.index)
 
         return
 
@@ -359,6 +361,48 @@ class ExtensionPointChangedTestCase(unittest.TestCase):
 
         return
 
+    def test_other_traits_do_not_fire_events(self):
+        """ other traits do not fire events """
+
+        b = PluginB()
+
+        events = []
+        b.on_trait_change(
+            lambda event: events.append(event), 'extension_point_changed'
+        )
+
+        b.name = 'Plugin B'
+        b.home = 'somewhere'
+        self.assertEqual([], events)
+
+        b.x.append(4)
+        self.assertEqual(1, len(events))
+        self.assertEqual('a.x', events[0].extension_point_id)
+
+        return
+
+    def test_add_contributing_trait(self):
+        """ add contributing trait """
+
+        a = PluginA(); a.on_trait_change(listener, 'x_items')
+        b = PluginB()
+
+        application = TestApplication(plugins=[a, b])
+        application.start()
+
+        # A trait that is added to a plugin on the fly can contribute too.
+        c = Plugin(id='C')
+        c.add_trait('y', List(Int, [98, 99, 100], contributes_to='a.x'))
+        application.add_plugin(c)
+        self.assertEqual([1, 2, 3, 98, 99, 100], sorted(a.x))
+
+        # Changes to it are passed on to the extension point.
+        c.y.append(42)
+        self.assertEqual([1, 2, 3, 42, 98, 99, 100], sorted(a.x))
+        self.assertEqual([42], listener.new.added)
+
+        return
+
 
 # Entry point for stand-alone testing.
 if __name__ == '__main__':
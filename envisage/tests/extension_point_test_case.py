@@ -174,6 +174,27 @@ class ExtensionPointTestCase(unittest.TestCase):
 
         return
 
+    def test_extension_point_without_validation(self):
+        """ extension point without validation """
+
+        registry = self.registry
+
+        # Add an extension point.
+        registry.add_extension_point(self._create_extension_point('my.ep'))
+
+        # Set the extensions.
+        registry.set_extensions('my.ep', [42, 43])
+
+        # Declare a class that consumes the extension.
+        class Foo(TestBase):
+            x = ExtensionPoint(List(Int), id='my.ep', validate_extensions=False)
+
+        # We get the registry's immutable view of the contributions.
+        f = Foo()
+        self.assertEqual((42, 43), f.x)
+
+        return
+
     def test_invalid_extension_point(self):
         """ invalid extension point """
 
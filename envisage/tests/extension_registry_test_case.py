@@ -4,7 +4,7 @@
 # Enthought library imports.
 from envisage.api import Application, ExtensionPoint
 from envisage.api import ExtensionRegistry, UnknownExtensionPoint
-from traits.api import List
+from traits.api import List, TraitListEvent
 from traits.testing.unittest_tools import unittest
 
 
@@ -167,6 +167,31 @@ class ExtensionRegistryTestCase(unittest.TestCase):
 
         return
 
+    def test_extension_point_changed_event(self):
+        """ extension point changed event """
+
+        # Use the base registry (extension points can't be set in a provider
+        # registry).
+        registry = ExtensionRegistry()
+        registry.add_extension_point(self._create_extension_point('my.ep'))
+        registry.set_extensions('my.ep', [1, 2])
+
+        events = []
+        def listener(extension_registry, event):
+            events.append(event)
+
+        registry.add_extension_point_listener(listener, 'my.ep')
+        registry.set_extensions('my.ep', [3])
+
+        # The event is a list event (with the extension point Id too).
+        event = events[0]
+        self.assertIsInstance(event, TraitListEvent)
+        self.assertEqual('my.ep', event.extension_point_id)
+        self.assertEqual([1, 2], event.removed)
+        self.assertEqual([3], event.added)
+
+        return
+
     ###########################################################################
     # Private interface.
     ###########################################################################
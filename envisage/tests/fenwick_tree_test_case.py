@@ -0,0 +1,70 @@
+""" Tests for the Fenwick tree. """
+
+
+# Standard library imports.
+import random
+
+# Enthought library imports.
+from envisage.fenwick_tree import FenwickTree
+from traits.testing.unittest_tools import unittest
+
+
+class FenwickTreeTestCase(unittest.TestCase):
+    """ Tests for the Fenwick tree. """
+
+    ###########################################################################
+    # Tests.
+    ###########################################################################
+
+    def test_empty(self):
+        tree = FenwickTree()
+
+        self.assertEqual(0, len(tree))
+        self.assertEqual(0, tree.total)
+        self.assertEqual(0, tree.prefix_sum(0))
+
+        return
+
+    def test_prefix_sums(self):
+        values = [3, 0, 1, 4, 1, 5, 9, 2, 6]
+        tree = FenwickTree(values)
+
+        self.assertEqual(len(values), len(tree))
+        for index in range(len(values) + 1):
+            self.assertEqual(sum(values[:index]), tree.prefix_sum(index))
+
+        return
+
+    def test_append_set_and_add(self):
+        rng = random.Random(42)
+
+        values = [rng.randint(0, 5) for i in range(10)]
+        tree = FenwickTree(values)
+        for i in range(100):
+            value = rng.randint(0, 5)
+            values.append(value)
+            tree.append(value)
+
+        for i in range(200):
+            index = rng.randrange(len(values))
+            value = rng.randint(0, 5)
+
+            values[index] = value
+            tree[index] = value
+            self.assertEqual(value, tree[index])
+
+            tree.add(index, 1)
+            values[index] += 1
+
+            self.assertEqual(sum(values), tree.total)
+            index = rng.randrange(len(values) + 1)
+            self.assertEqual(sum(values[:index]), tree.prefix_sum(index))
+
+        return
+
+
+# Entry point for stand-alone testing.
+if __name__ == '__main__':
+    unittest.main()
+
+#### EOF ######################################################################
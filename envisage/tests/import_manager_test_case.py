@@ -3,6 +3,7 @@
 
 # Enthought library imports.
 from envisage.api import Application, ImportManager
+from envisage.import_manager import SymbolCache, symbol_cache
 from traits.testing.unittest_tools import unittest
 
 
@@ -61,6 +62,83 @@ class ImportManagerTestCase(unittest.TestCase):
 
         return
 
+    def test_import_symbol_is_cached(self):
+        """ import symbol is cached """
+
+        import tarfile
+
+        symbol_cache.invalidate('tarfile.TarFile')
+        symbol_cache.reset_statistics()
+
+        symbol = self.import_manager.import_symbol('tarfile.TarFile')
+        self.assertEqual(symbol, tarfile.TarFile)
+        self.assertEqual(0, symbol_cache.hits)
+        self.assertEqual(1, symbol_cache.misses)
+
+        symbol = self.import_manager.import_symbol('tarfile.TarFile')
+        self.assertEqual(symbol, tarfile.TarFile)
+        self.assertEqual(1, symbol_cache.hits)
+        self.assertEqual(1, symbol_cache.misses)
+
+        return
+
+    def test_failed_imports_are_not_cached_by_default(self):
+        """ failed imports are not cached by default """
+
+        cache = SymbolCache()
+        import_manager = ImportManager()
+
+        for i in range(2):
+            with self.assertRaises(ImportError):
+                cache.get_symbol(
+                    'bogus.IBogus', import_manager._import_symbol
+                )
+
+        self.assertEqual(2, cache.misses)
+        self.assertNotIn('bogus.IBogus', cache)
+
+        return
+
+    def test_negative_cache(self):
+        """ negative cache """
+
+        cache = SymbolCache(cache_failures=True)
+        import_manager = ImportManager()
+
+        for i in range(2):
+            with self.assertRaises(ImportError):
+                cache.get_symbol(
+                    'bogus.IBogus', import_manager._import_symbol
+                )
+
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(1, cache.misses)
+
+        # Once invalidated, the import is tried again.
+        cache.invalidate('bogus.IBogus')
+        with self.assertRaises(ImportError):
+            cache.get_symbol('bogus.IBogus', import_manager._import_symbol)
+
+        self.assertEqual(2, cache.misses)
+
+        return
+
+    def test_invalidate(self):
+        """ invalidate """
+
+        cache = SymbolCache()
+        import_manager = ImportManager()
+
+        cache.get_symbol('tarfile.TarFile', import_manager._import_symbol)
+        cache.get_symbol('tarfile:TarFile.open', import_manager._import_symbol)
+        self.assertIn('tarfile.TarFile', cache)
+
+        cache.invalidate()
+        self.assertNotIn('tarfile.TarFile', cache)
+        self.assertNotIn('tarfile:TarFile.open', cache)
+
+        return
+
 
 # Entry point for stand-alone testing.
 if __name__ == '__main__':
@@ -0,0 +1,306 @@
+""" Tests for keyed extension points. """
+
+
+# Enthought library imports.
+from envisage.api import Application, ExtensionPoint
+from envisage.api import ExtensionRegistry, Plugin
+from traits.api import Dict, HasTraits, Int, List, Str
+from traits.testing.unittest_tools import unittest
+
+
+class Item(HasTraits):
+    """ A contribution that carries its own key. """
+
+    id = Str
+
+    value = Int
+
+
+class PluginA(Plugin):
+    """ A plugin that offers keyed extension points. """
+
+    id = 'A'
+
+    namespace = ExtensionPoint(Dict, id='a.namespace')
+
+    items = ExtensionPoint(List, id='a.items', key='id')
+
+
+class PluginB(Plugin):
+    """ A plugin that contributes via a list and via a dictionary. """
+
+    id = 'B'
+
+    namespace = Dict({'x': 1, 'y': 2}, contributes_to='a.namespace')
+
+    items = List(contributes_to='a.items')
+
+    def _items_default(self):
+        """ Trait initializer. """
+
+        return [Item(id='foo', value=1), Item(id='bar', value=2)]
+
+
+class PluginC(Plugin):
+    """ A plugin that contributes '(key, value)' tuples. """
+
+    id = 'C'
+
+    namespace = List([('z', 3)], contributes_to='a.namespace')
+
+
+class KeyedExtensionPointTestCase(unittest.TestCase):
+    """ Tests for keyed extension points. """
+
+    ###########################################################################
+    # 'TestCase' interface.
+    ###########################################################################
+
+    def setUp(self):
+        """ Prepares the test fixture before each test method is called. """
+
+        self.a = PluginA()
+        self.b = PluginB()
+        self.c = PluginC()
+
+        self.application = Application(
+            id='test', plugins=[self.a, self.b, self.c]
+        )
+
+        return
+
+    ###########################################################################
+    # Tests.
+    ###########################################################################
+
+    def test_dict_extension_point(self):
+        """ dict extension point """
+
+        self.assertEqual({'x': 1, 'y': 2, 'z': 3}, self.a.namespace)
+        self.assertEqual(
+            3, self.application.get_keyed_extension('a.namespace', 'z')
+        )
+        self.assertIsNone(
+            self.application.get_keyed_extension('a.namespace', 'w')
+        )
+
+        # The contributions are still '(key, value)' tuples.
+        self.assertEqual(
+            [('x', 1), ('y', 2), ('z', 3)],
+            sorted(self.application.get_extensions('a.namespace'))
+        )
+
+        return
+
+    def test_key_attribute(self):
+        """ key attribute """
+
+        foo = self.application.get_keyed_extension('a.items', 'foo')
+        self.assertEqual(1, foo.value)
+        self.assertEqual(
+            ['bar', 'foo'],
+            sorted(self.application.get_extensions_mapping('a.items'))
+        )
+
+        # Extension points that aren't keyed can't be looked up by key.
+        self.application.add_extension_point(
+            ExtensionPoint(List, id='a.unkeyed')
+        )
+        with self.assertRaises(ValueError):
+            self.application.get_keyed_extension('a.unkeyed', 'foo')
+
+        # Nor can extension points that don't exist!
+        self.assertEqual(
+            {}, self.application.get_extensions_mapping('a.bogus')
+        )
+
+        return
+
+    def test_mapping_is_maintained_incrementally(self):
+        """ mapping is maintained incrementally """
+
+        self.assertEqual({'x': 1, 'y': 2, 'z': 3}, self.a.namespace)
+
+        # Removing a provider removes its keys.
+        self.application.remove_plugin(self.b)
+        self.assertEqual({'z': 3}, self.a.namespace)
+
+        # Changing a provider's contributions changes the mapping.
+        self.c.namespace = [('z', 4), ('w', 5)]
+        self.assertEqual({'z': 4, 'w': 5}, self.a.namespace)
+
+        # And so does adding a provider.
+        self.application.add_plugin(self.b)
+        self.assertEqual(
+            {'x': 1, 'y': 2, 'z': 4, 'w': 5}, self.a.namespace
+        )
+
+        # Including changes to a dictionary contribution.
+        self.b.namespace['v'] = 6
+        del self.b.namespace['x']
+        self.assertEqual({'y': 2, 'z': 4, 'w': 5, 'v': 6}, self.a.namespace)
+
+        return
+
+    def test_duplicate_key_on_first_access(self):
+        """ duplicate key on first access """
+
+        self.c.namespace = [('x', 42)]
+
+        # The last contribution wins.
+        self.assertEqual({'x': 42, 'y': 2}, self.a.namespace)
+
+        return
+
+    def test_duplicate_key_in_changed_contributions(self):
+        """ duplicate key in changed contributions """
+
+        self.assertEqual({'x': 1, 'y': 2, 'z': 3}, self.a.namespace)
+
+        # The registry always agrees with the plugin.
+        self.c.namespace = [('a', 1), ('b', 2), ('a', 3)]
+        self.assertEqual(
+            self.b.get_extensions('a.namespace')
+            + self.c.get_extensions('a.namespace'),
+            self.application.get_extensions('a.namespace')
+        )
+        self.assertEqual(
+            {'x': 1, 'y': 2, 'a': 3, 'b': 2}, self.a.namespace
+        )
+
+        # ... including after later changes.
+        self.c.namespace.append(('z', 9))
+        self.assertEqual(9, self.application.get_keyed_extension(
+            'a.namespace', 'z'
+        ))
+
+        # Removing the winning contribution uncovers the one it shadowed.
+        self.c.namespace = [('x', 42)]
+        self.assertEqual(42, self.a.namespace['x'])
+        self.c.namespace = []
+        self.assertEqual({'x': 1, 'y': 2}, self.a.namespace)
+
+        return
+
+    def test_duplicate_key_in_added_plugin(self):
+        """ duplicate key in added plugin """
+
+        self.application.get_extensions('a.items')
+
+        class PluginD(Plugin):
+            id = 'D'
+
+            items = List([Item(id='foo', value=42)], contributes_to='a.items')
+
+        d = PluginD()
+        self.application.add_plugin(d)
+        self.assertEqual(3, len(self.application.get_extensions('a.items')))
+        self.assertEqual(
+            42, self.application.get_keyed_extension('a.items', 'foo').value
+        )
+
+        self.application.remove_plugin(d)
+        self.assertEqual(2, len(self.application.get_extensions('a.items')))
+        self.assertEqual(
+            1, self.application.get_keyed_extension('a.items', 'foo').value
+        )
+
+        return
+
+    def test_first_duplicate_key_wins(self):
+        """ first duplicate key wins """
+
+        registry = ExtensionRegistry()
+        registry.add_extension_point(
+            ExtensionPoint(List, id='my.ep', key='id', duplicates='first')
+        )
+
+        # On first access.
+        foo_1 = Item(id='foo', value=1)
+        foo_2 = Item(id='foo', value=2)
+        registry.set_extensions('my.ep', [foo_1, foo_2])
+        self.assertEqual(foo_1, registry.get_keyed_extension('my.ep', 'foo'))
+
+        # ... after a change.
+        foo_3 = Item(id='foo', value=3)
+        registry.set_extensions('my.ep', [foo_3, foo_1])
+        self.assertEqual(foo_3, registry.get_keyed_extension('my.ep', 'foo'))
+
+        return
+
+    def test_first_duplicate_key_wins_in_added_plugin(self):
+        """ first duplicate key wins in added plugin """
+
+        class PluginD(Plugin):
+            id = 'D'
+
+            items = ExtensionPoint(
+                List, id='d.items', key='id', duplicates='first'
+            )
+
+        class PluginE(Plugin):
+            id = 'E'
+
+            items = List([Item(id='foo', value=1)], contributes_to='d.items')
+
+        class PluginF(Plugin):
+            id = 'F'
+
+            items = List([Item(id='foo', value=2)], contributes_to='d.items')
+
+        d, e, f = PluginD(), PluginE(), PluginF()
+        application = Application(id='test', plugins=[d, e])
+        self.assertEqual(
+            1, application.get_keyed_extension('d.items', 'foo').value
+        )
+
+        # A later plugin doesn't replace the first contribution ...
+        application.add_plugin(f)
+        self.assertEqual(
+            1, application.get_keyed_extension('d.items', 'foo').value
+        )
+
+        # ... but it is used once the first contribution is gone.
+        application.remove_plugin(e)
+        self.assertEqual(
+            2, application.get_keyed_extension('d.items', 'foo').value
+        )
+
+        return
+
+    def test_bad_duplicates(self):
+        """ bad duplicates """
+
+        with self.assertRaises(ValueError):
+            ExtensionPoint(List, id='my.ep', key='id', duplicates='all')
+
+        return
+
+    def test_set_extensions(self):
+        """ set extensions """
+
+        registry = ExtensionRegistry()
+        registry.add_extension_point(ExtensionPoint(Dict, id='my.ep'))
+
+        registry.set_extensions('my.ep', [('a', 1), ('b', 2)])
+        self.assertEqual(2, registry.get_keyed_extension('my.ep', 'b'))
+
+        registry.set_extensions('my.ep', [('a', 1), ('a', 2)])
+        self.assertEqual({'a': 2}, registry.get_extensions_mapping('my.ep'))
+
+        return
+
+    def test_key_with_dict(self):
+        """ key with dict """
+
+        with self.assertRaises(ValueError):
+            ExtensionPoint(Dict, id='my.ep', key='id')
+
+        return
+
+
+# Entry point for stand-alone testing.
+if __name__ == '__main__':
+    unittest.main()
+
+#### EOF ######################################################################
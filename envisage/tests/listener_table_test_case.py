@@ -0,0 +1,143 @@
+""" Tests for the table of extension point listeners. """
+
+
+# Standard library imports.
+import gc
+
+# Enthought library imports.
+from envisage.listener_table import ListenerTable
+from traits.testing.unittest_tools import unittest
+
+
+class Listener(object):
+    """ An object with a method that is used as a listener. """
+
+    def listener(self, extension_registry, event):
+        """ The listener. """
+
+        return
+
+
+class ListenerTableTestCase(unittest.TestCase):
+    """ Tests for the table of extension point listeners. """
+
+    ###########################################################################
+    # Tests.
+    ###########################################################################
+
+    def test_get_refs(self):
+        """ get refs """
+
+        def a(extension_registry, event):
+            pass
+
+        def b(extension_registry, event):
+            pass
+
+        table = ListenerTable()
+        table.add(a, None)
+        table.add(b, 'x')
+
+        # Specific listeners come before the listeners to all extension
+        # points.
+        self.assertEqual([b, a], [ref() for ref in table.get_refs('x')])
+        self.assertEqual([a], [ref() for ref in table.get_refs('y')])
+
+        return
+
+    def test_snapshots(self):
+        """ snapshots """
+
+        def a(extension_registry, event):
+            pass
+
+        def b(extension_registry, event):
+            pass
+
+        table = ListenerTable()
+        table.add(a, 'x')
+
+        # The same snapshot is returned until the listeners change.
+        refs = table.get_refs('x')
+        self.assertIs(refs, table.get_refs('x'))
+
+        # Adding a listener to another extension point doesn't affect it...
+        table.add(b, 'y')
+        self.assertIs(refs, table.get_refs('x'))
+
+        # ... but adding a listener to all extension points does.
+        table.add(b, None)
+        self.assertEqual([a, b], [ref() for ref in table.get_refs('x')])
+
+        # The old snapshot is unchanged.
+        self.assertEqual([a], [ref() for ref in refs])
+
+        return
+
+    def test_remove(self):
+        """ remove """
+
+        listener = Listener()
+
+        table = ListenerTable()
+        table.add(listener.listener, 'x')
+        self.assertEqual(1, len(table.get_refs('x')))
+
+        table.remove(listener.listener, 'x')
+        self.assertEqual(0, len(table.get_refs('x')))
+        self.assertEqual(0, len(table))
+
+        # Removing it again is an error.
+        with self.assertRaises(ValueError):
+            table.remove(listener.listener, 'x')
+
+        return
+
+    def test_dead_listeners_are_removed(self):
+        """ dead listeners are removed """
+
+        table = ListenerTable()
+
+        listeners = [Listener() for i in range(10)]
+        for listener in listeners:
+            table.add(listener.listener, 'x')
+
+        def function(extension_registry, event):
+            pass
+
+        table.add(function, None)
+        self.assertEqual(11, len(table))
+        self.assertEqual(11, len(table.get_refs('x')))
+
+        del listeners[:5]
+        del function
+        gc.collect()
+
+        self.assertEqual(5, len(table))
+        self.assertEqual(5, len(table.get_refs('x')))
+
+        return
+
+    def test_dead_listener_to_several_extension_points_is_removed(self):
+        """ dead listener to several extension points is removed """
+
+        table = ListenerTable()
+
+        listener = Listener()
+        table.add(listener.listener, 'x')
+        table.add(listener.listener, 'y')
+        self.assertEqual(2, len(table))
+
+        del listener
+        gc.collect()
+
+        self.assertEqual(0, len(table))
+
+        return
+
+
+# Entry point for stand-alone testing.
+if __name__ == '__main__':
+    unittest.main()
+
+#### EOF ######################################################################
@@ -23,6 +23,7 @@ class MutableExtensionRegistry(ExtensionRegistry):
         """ Contribute a list of extensions to an extension point. """
 
         self._check_extension_point(extension_point_id)
+        self._remember_extensions(extension_point_id)
 
         old   = self._get_extensions(extension_point_id)
         index = len(old)
@@ -44,6 +45,7 @@ class MutableExtensionRegistry(ExtensionRegistry):
     def remove_extensions(self, extension_point_id, extensions):
         """ Remove a list of contributions from an extension point. """
 
+        self._remember_extensions(extension_point_id)
         for extension in extensions:
             try:
                 self._get_extensions(extension_point_id).remove(extension)
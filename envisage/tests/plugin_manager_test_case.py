@@ -1,9 +1,14 @@
 """ Tests for the plugin manager. """
 
 
+# Standard library imports.
+import threading
+import time
+
 # Enthought library imports.
-from envisage.api import Plugin, PluginManager
-from traits.api import Bool
+from envisage.api import Application, ExtensionPoint, Plugin, PluginManager
+from envisage import plugin_manager as plugin_manager_module
+from traits.api import Any, Bool, List
 from traits.testing.unittest_tools import unittest
 
 
@@ -54,6 +59,42 @@ class BadPlugin(Plugin):
         raise 1/0
 
 
+class RecordingPlugin(Plugin):
+    """ A plugin that records when it is started and stopped. """
+
+    #### 'RecordingPlugin' interface ##########################################
+
+    # The (shared) list that the plugin's Id is appended to when it starts.
+    started = Any(factory=list)
+
+    # The (shared) list that the plugin's Id is appended to when it stops.
+    stopped = Any(factory=list)
+
+    # An optional barrier that the plugin waits at when it starts.
+    barrier = Any
+
+    ###########################################################################
+    # 'IPlugin' interface.
+    ###########################################################################
+
+    def start(self):
+        """ Start the plugin. """
+
+        if self.barrier is not None:
+            self.barrier.wait(timeout=5)
+
+        self.started.append(self.id)
+
+        return
+
+    def stop(self):
+        """ Stop the plugin. """
+
+        self.stopped.append(self.id)
+
+        return
+
+
 class PluginManagerTestCase(unittest.TestCase):
     """ Tests for the plugin manager. """
 
@@ -156,6 +197,248 @@ class PluginManagerTestCase(unittest.TestCase):
 
         return
 
+    def test_start_and_stop_in_dependency_order(self):
+        """ start and stop in dependency order """
+
+        started = []
+        stopped = []
+
+        def create_plugin(id, **traits):
+            return RecordingPlugin(
+                id=id, started=started, stopped=stopped, **traits
+            )
+
+        plugin_manager = PluginManager(
+            plugins = [
+                create_plugin('a', requires=['b']),
+                create_plugin('b', after=['c', 'not.there']),
+                create_plugin('c'),
+                create_plugin('envisage.core'),
+                create_plugin('d'),
+            ]
+        )
+
+        plugin_manager.start()
+        self.assertEqual(['envisage.core', 'c', 'b', 'a', 'd'], started)
+        self.assertEqual(
+            set(['a', 'b', 'c', 'd', 'envisage.core']),
+            set(plugin_manager.start_durations)
+        )
+
+        plugin_manager.stop()
+        self.assertEqual(['d', 'a', 'b', 'c', 'envisage.core'], stopped)
+
+        return
+
+    def test_missing_required_plugin(self):
+        """ missing required plugin """
+
+        plugin_manager = PluginManager(
+            plugins = [RecordingPlugin(id='a', requires=['b'])]
+        )
+
+        self.failUnlessRaises(SystemError, plugin_manager.start)
+
+        return
+
+    def test_circular_dependency(self):
+        """ circular dependency """
+
+        plugin_manager = PluginManager(
+            plugins = [
+                RecordingPlugin(id='a', requires=['b']),
+                RecordingPlugin(id='b', after=['a']),
+            ]
+        )
+
+        self.failUnlessRaises(ValueError, plugin_manager.start)
+
+        return
+
+    @unittest.skipIf(
+        not hasattr(threading, 'Barrier'), 'requires threading.Barrier'
+    )
+    def test_start_in_parallel(self):
+        """ start in parallel """
+
+        started = []
+
+        # The two independent plugins can only get past the barrier if they
+        # are started at the same time.
+        barrier = threading.Barrier(2)
+
+        plugin_manager = PluginManager(
+            plugins = [
+                RecordingPlugin(id='envisage.core', started=started),
+                RecordingPlugin(id='a', started=started, barrier=barrier),
+                RecordingPlugin(id='b', started=started, barrier=barrier),
+                RecordingPlugin(id='c', started=started, requires=['a', 'b']),
+            ],
+            start_mode = 'parallel'
+        )
+
+        plugin_manager.start()
+
+        self.assertEqual('envisage.core', started[0])
+        self.assertEqual(set(['a', 'b']), set(started[1:3]))
+        self.assertEqual('c', started[3])
+        self.assertEqual(4, len(plugin_manager.start_durations))
+
+        return
+
+    def test_start_in_parallel_errors(self):
+        """ start in parallel errors """
+
+        started = []
+
+        plugin_manager = PluginManager(
+            plugins = [
+                BadPlugin(id='bad'),
+                RecordingPlugin(id='a', started=started, requires=['bad']),
+            ],
+            start_mode = 'parallel'
+        )
+
+        self.failUnlessRaises(ZeroDivisionError, plugin_manager.start)
+
+        # Plugins that depend on a plugin that failed are not started.
+        self.assertEqual([], started)
+
+        return
+
+    def test_registries_are_concurrent_during_a_parallel_start(self):
+        """ registries are concurrent during a parallel start """
+
+        modes = []
+
+        class ModePlugin(Plugin):
+            def start(self):
+                modes.append((
+                    self.application.extension_registry.concurrent,
+                    self.application.service_registry.concurrent
+                ))
+
+        plugin_manager = PluginManager(
+            plugins = [ModePlugin(id='a'), ModePlugin(id='b')],
+            start_mode = 'parallel'
+        )
+        application = Application(plugin_manager=plugin_manager)
+        application.start()
+
+        self.assertEqual([(True, True), (True, True)], modes)
+
+        # ... and they are put back afterwards.
+        self.assertFalse(application.extension_registry.concurrent)
+        self.assertFalse(application.service_registry.concurrent)
+
+        return
+
+    @unittest.skipIf(
+        not hasattr(threading, 'Barrier'), 'requires threading.Barrier'
+    )
+    def test_lazy_activation_during_a_parallel_start(self):
+        """ lazy activation during a parallel start """
+
+        activations = []
+        seen = []
+
+        # Both eager plugins use the lazy plugin at the same time.
+        barrier = threading.Barrier(2)
+
+        class LazyPlugin(Plugin):
+            items = ExtensionPoint(List, id='lazy.items')
+
+            def start(self):
+                # Give the other thread a chance to get in the way!
+                time.sleep(0.1)
+                activations.append(self.id)
+
+        class EagerPlugin(Plugin):
+            def start(self):
+                barrier.wait(timeout=5)
+                self.application.get_extensions('lazy.items')
+
+                # The lazy plugin must have started by the time we get here.
+                seen.append(len(activations))
+
+        plugin_manager = PluginManager(
+            plugins = [
+                LazyPlugin(id='lazy', activation='lazy'),
+                EagerPlugin(id='a'),
+                EagerPlugin(id='b'),
+            ],
+            start_mode = 'parallel'
+        )
+        application = Application(plugin_manager=plugin_manager)
+        application.start()
+
+        # The lazy plugin was activated exactly once.
+        self.assertEqual(['lazy'], activations)
+        self.assertEqual([1, 1], seen)
+
+        return
+
+    def test_start_in_parallel_without_concurrent_futures(self):
+        """ start in parallel without concurrent futures """
+
+        started = []
+
+        plugin_manager = PluginManager(
+            plugins = [
+                RecordingPlugin(id='a', started=started),
+                RecordingPlugin(id='b', started=started, requires=['a']),
+            ],
+            start_mode = 'parallel'
+        )
+
+        # Pretend that we are on Python 2 without the 'futures' package.
+        executor_class = plugin_manager_module.ThreadPoolExecutor
+        plugin_manager_module.ThreadPoolExecutor = None
+        try:
+            plugin_manager.start()
+
+        finally:
+            plugin_manager_module.ThreadPoolExecutor = executor_class
+
+        # The plugins are started sequentially instead.
+        self.assertEqual(['a', 'b'], started)
+
+        return
+
+    def test_lazy_plugins(self):
+        """ lazy plugins """
+
+        started = []
+        stopped = []
+
+        def create_plugin(id, **traits):
+            return RecordingPlugin(
+                id=id, started=started, stopped=stopped, **traits
+            )
+
+        plugin_manager = PluginManager(
+            plugins = [
+                create_plugin('a', activation='lazy'),
+                create_plugin('b', activation='lazy', requires=['a']),
+                create_plugin('c', activation='lazy'),
+                create_plugin('d', requires=['c']),
+            ]
+        )
+
+        # Lazy plugins are not started unless an eager plugin depends on them.
+        plugin_manager.start()
+        self.assertEqual(['c', 'd'], started)
+
+        # Starting a lazy plugin also starts the lazy plugins it depends on.
+        plugin_manager.start_plugin(plugin_id='b')
+        self.assertEqual(['c', 'd', 'a', 'b'], started)
+
+        # Lazily started plugins are stopped first.
+        plugin_manager.stop()
+        self.assertEqual(['b', 'a', 'd', 'c'], stopped)
+
+        return
+
     def test_only_include_plugins_whose_ids_are_in_the_include_list(self):
 
         # Note that the items in the list use the 'fnmatch' syntax for matching
@@ -0,0 +1,149 @@
+""" Tests for the application lifecycle profiler. """
+
+
+# Standard library imports.
+import json
+import os
+import shutil
+import tempfile
+
+# Enthought library imports.
+from envisage.api import Application, Plugin, Profiler
+from envisage.profiler import get_profiler, profile
+from traits.testing.unittest_tools import unittest
+
+
+class TestApplication(Application):
+    """ The type of application used in the tests. """
+
+    id = 'test'
+
+
+class ProfilerTestCase(unittest.TestCase):
+    """ Tests for the application lifecycle profiler. """
+
+    ###########################################################################
+    # 'TestCase' interface.
+    ###########################################################################
+
+    def setUp(self):
+        """ Prepares the test fixture before each test method is called. """
+
+        self.tmpdir = tempfile.mkdtemp()
+
+        return
+
+    def tearDown(self):
+        """ Called immediately after each test method has been called. """
+
+        shutil.rmtree(self.tmpdir)
+
+        return
+
+    ###########################################################################
+    # Tests.
+    ###########################################################################
+
+    def test_nothing_recorded_when_disabled(self):
+        """ nothing recorded when disabled """
+
+        profiler = Profiler()
+        with profile('foo'):
+            pass
+
+        self.assertEqual([], profiler.spans)
+        self.assertEqual(None, get_profiler())
+
+        return
+
+    def test_enable_and_disable(self):
+        """ enable and disable """
+
+        profiler = Profiler()
+        with profiler:
+            self.assertEqual(True, profiler.enabled)
+            self.assertEqual(profiler, get_profiler())
+
+            with profile('foo', 'test', x=1):
+                pass
+
+        self.assertEqual(False, profiler.enabled)
+        self.assertEqual(None, get_profiler())
+
+        self.assertEqual(1, len(profiler.spans))
+        name, category, start, end, thread_id, args = profiler.spans[0]
+        self.assertEqual('foo', name)
+        self.assertEqual('test', category)
+        self.assertTrue(end >= start)
+        self.assertEqual({'x' : 1}, args)
+
+        return
+
+    def test_application_lifecycle(self):
+        """ application lifecycle """
+
+        application = TestApplication(
+            plugins=[Plugin(id='a'), Plugin(id='b')]
+        )
+
+        profiler = Profiler()
+        with profiler:
+            application.start()
+            application.stop()
+
+        names = set(
+            (name, args.get('plugin'))
+            for name, category, start, end, thread_id, args in profiler.spans
+        )
+        for plugin_id in ['a', 'b']:
+            self.assertIn(('start_plugin', plugin_id), names)
+            self.assertIn(('register_services', plugin_id), names)
+            self.assertIn(('start', plugin_id), names)
+            self.assertIn(('stop_plugin', plugin_id), names)
+        self.assertIn(('start', None), names)
+        self.assertIn(('stop', None), names)
+
+        # The summary has a header and a row for each distinct span.
+        summary = profiler.summary()
+        self.assertIn('start_plugin (plugin=a)', summary)
+        self.assertEqual(4, len(profiler.summary(limit=3).splitlines()))
+
+        return
+
+    def test_save_trace(self):
+        """ save trace """
+
+        profiler = Profiler()
+        with profiler:
+            with profile('outer', 'test'):
+                with profile('inner', 'test', plugin='a'):
+                    pass
+
+        filename = os.path.join(self.tmpdir, 'trace.json')
+        profiler.save_trace(filename)
+
+        with open(filename) as f:
+            trace = json.load(f)
+
+        events = trace['traceEvents']
+        self.assertEqual(['outer', 'inner'], [e['name'] for e in events])
+        for event in events:
+            self.assertEqual('X', event['ph'])
+            self.assertEqual('test', event['cat'])
+
+        # The inner span is nested inside the outer one.
+        outer, inner = events
+        self.assertTrue(inner['ts'] >= outer['ts'])
+        self.assertTrue(
+            inner['ts'] + inner['dur'] <= outer['ts'] + outer['dur'] + 1e-3
+        )
+        self.assertEqual({'plugin' : 'a'}, inner['args'])
+
+        return
+
+
+# Entry point for stand-alone testing.
+if __name__ == '__main__':
+    unittest.main()
+
+#### EOF ######################################################################
@@ -2,10 +2,12 @@
 
 
 # Standard imports
+import random
 import unittest
 
 # Enthought library imports.
-from envisage.api import ExtensionPoint, ExtensionProvider
+from envisage.api import Application, ExtensionPoint, ExtensionProvider
+from envisage.api import Plugin
 from envisage.api import ProviderExtensionRegistry
 from traits.api import Int, List
 
@@ -345,7 +347,281 @@ class ProviderExtensionRegistryTestCase(ExtensionRegistryTestCase):
 
         return
 
-    def test_get_providers(self):
+    def test_extensions_view_is_shared_until_contributions_change(self):
+        """ extensions view is shared until contributions change """
+
+        registry = self.registry
+
+        class ProviderA(ExtensionProvider):
+            """ An extension provider. """
+
+            def get_extension_points(self):
+                """ Return the extension points offered by the provider. """
+
+                return [ExtensionPoint(List, 'x'), ExtensionPoint(List, 'y')]
+
+            def get_extensions(self, extension_point):
+                """ Return the provider's contributions to an extension point.
+
+                """
+
+                return [42] if extension_point == 'x' else []
+
+        class ProviderB(ExtensionProvider):
+            """ An extension provider. """
+
+            def get_extensions(self, extension_point):
+                """ Return the provider's contributions to an extension point.
+
+                """
+
+                return [43, 44] if extension_point == 'x' else []
+
+        registry.add_provider(ProviderA())
+
+        view = registry.get_extensions_view('x')
+        self.assertEqual((42,), view)
+        self.assertIs(view, registry.get_extensions_view('x'))
+        y_view = registry.get_extensions_view('y')
+
+        # 'get_extensions' still returns a new list every time.
+        extensions = registry.get_extensions('x')
+        self.assertEqual([42], extensions)
+        self.assertIsNot(extensions, registry.get_extensions('x'))
+
+        # Adding a provider that contributes to 'x' invalidates its view, but
+        # not the view of 'y'.
+        b = ProviderB()
+        registry.add_provider(b)
+        self.assertEqual((42, 43, 44), registry.get_extensions_view('x'))
+        self.assertIs(y_view, registry.get_extensions_view('y'))
+
+        # As does removing it.
+        registry.remove_provider(b)
+        self.assertEqual((42,), registry.get_extensions_view('x'))
+
+        return
+
+    def test_add_and_remove_many_providers(self):
+        """ add and remove many providers """
+
+        registry = self.registry
+
+        # Each provider contributes to a couple of the extension points, and
+        # some of them contribute nothing at all.
+        class Provider(ExtensionProvider):
+            """ An extension provider. """
+
+            def __init__(self, contributions, **traits):
+                """ Constructor. """
+
+                super(Provider, self).__init__(**traits)
+                self.contributions = contributions
+
+                return
+
+            def get_extensions(self, extension_point):
+                """ Return the provider's contributions to an extension point.
+
+                """
+
+                return self.contributions.get(extension_point, [])
+
+        class ExtensionPointProvider(ExtensionProvider):
+            """ A provider that offers all of the extension points. """
+
+            def get_extension_points(self):
+                """ Return the extension points offered by the provider. """
+
+                return [
+                    ExtensionPoint(List, 'ep%d' % i) for i in range(200)
+                ]
+
+        registry.add_provider(ExtensionPointProvider())
+        extension_point_ids = ['ep%d' % i for i in range(200)]
+
+        # Access all of the extension points so that events are fired.
+        for extension_point_id in extension_point_ids:
+            registry.get_extensions(extension_point_id)
+
+        # Keep our own (simple minded!) model of what the contributions to
+        # each extension point should be, and check every event against it.
+        model = dict((id, []) for id in extension_point_ids)
+
+        def listener(registry, event):
+            """ Apply an event to the model. """
+
+            extensions = model[event.extension_point_id]
+            index = event.index
+            if event.removed:
+                self.assertEqual(
+                    event.removed,
+                    extensions[index:index + len(event.removed)]
+                )
+                del extensions[index:index + len(event.removed)]
+
+            extensions[index:index] = event.added
+
+            return
+
+        registry.add_extension_point_listener(listener)
+
+        rng = random.Random(42)
+        providers = []
+        for i in range(5000):
+            contributions = {}
+            for extension_point_id in rng.sample(extension_point_ids, 2):
+                contributions[extension_point_id] = [
+                    (i, j) for j in range(rng.randint(0, 3))
+                ]
+
+            provider = Provider(contributions)
+            registry.add_provider(provider)
+            providers.append(provider)
+
+        for extension_point_id in extension_point_ids:
+            self.assertEqual(
+                model[extension_point_id],
+                registry.get_extensions(extension_point_id)
+            )
+
+        # Remove the providers in a random order.
+        rng.shuffle(providers)
+        for i, provider in enumerate(providers):
+            registry.remove_provider(provider)
+
+            # Spot check the registry against the model as we go.
+            if i % 500 == 0:
+                for extension_point_id in extension_point_ids:
+                    self.assertEqual(
+                        model[extension_point_id],
+                        registry.get_extensions(extension_point_id)
+                    )
+
+        for extension_point_id in extension_point_ids:
+            self.assertEqual([], model[extension_point_id])
+            self.assertEqual([], registry.get_extensions(extension_point_id))
+
+        return
+
+    def test_batch_add_and_remove_providers(self):
+        """ batch add and remove providers """
+
+        registry = self.registry
+
+        class Provider(ExtensionProvider):
+            """ An extension provider. """
+
+            def __init__(self, contributions, **traits):
+                """ Constructor. """
+
+                super(Provider, self).__init__(**traits)
+                self.contributions = contributions
+
+                return
+
+            def get_extensions(self, extension_point):
+                """ Return the provider's contributions to an extension point.
+
+                """
+
+                return self.contributions.get(extension_point, [])
+
+        class ExtensionPointProvider(ExtensionProvider):
+            """ A provider that offers the extension points. """
+
+            def get_extension_points(self):
+                """ Return the extension points offered by the provider. """
+
+                return [ExtensionPoint(List, 'x'), ExtensionPoint(List, 'y')]
+
+        registry.add_provider(ExtensionPointProvider())
+
+        a = Provider({'x': [1, 2]})
+        registry.add_provider(a)
+        self.assertEqual([1, 2], registry.get_extensions('x'))
+        self.assertEqual([], registry.get_extensions('y'))
+
+        events = []
+        def listener(registry, event):
+            """ Remember the event. """
+
+            events.append(
+                (event.extension_point_id, event.added, event.removed,
+                 event.index)
+            )
+
+            return
+
+        registry.add_extension_point_listener(listener)
+
+        b = Provider({'x': [3], 'y': [10]})
+        c = Provider({'x': [4, 5], 'y': [11]})
+        d = Provider({'x': [6]})
+        with registry.batch():
+            registry.add_provider(b)
+            registry.add_provider(c)
+            registry.add_provider(d)
+
+            with registry.batch():
+                registry.remove_provider(a)
+
+            # Nothing happens until the outermost batch exits.
+            self.assertEqual([], events)
+
+        # One event per extension point that actually changed.
+        self.assertEqual(2, len(events))
+        events.sort()
+        self.assertEqual(('x', [3, 4, 5, 6], [1, 2], 0), events[0])
+        self.assertEqual(('y', [10, 11], [], 0), events[1])
+
+        # Changes that cancel each other out don't fire any events at all.
+        del events[:]
+        e = Provider({'x': [7]})
+        with registry.batch():
+            registry.add_provider(e)
+            registry.remove_provider(e)
+
+        self.assertEqual([], events)
+
+        return
+
+    def test_batch_with_multiple_changes_to_a_contribution(self):
+        """ batch with multiple changes to a contribution """
+
+        class PluginA(Plugin):
+            id = 'A'
+
+            x = ExtensionPoint(List, id='a.x')
+
+        class PluginB(Plugin):
+            id = 'B'
+
+            x = List([1, 2, 3], contributes_to='a.x')
+
+        b = PluginB()
+        application = Application(id='test', plugins=[PluginA(), b])
+        self.assertEqual([1, 2, 3], application.get_extensions('a.x'))
+
+        events = []
+        def listener(registry, event):
+            """ Remember the event. """
+
+            events.append((event.added, event.removed, event.index))
+
+            return
+
+        application.add_extension_point_listener(listener, 'a.x')
+
+        # The reassignment changes two separate parts of the list.
+        with application.batch():
+            b.x = [0, 2, 4]
+
+        self.assertEqual([([0, 2, 4], [1, 2, 3], 0)], events)
+
+        return
+
+
         """ get providers """
 
         registry = self.registry
@@ -535,6 +811,54 @@ class ProviderExtensionRegistryTestCase(ExtensionRegistryTestCase):
 
         return
 
+    def test_removed_provider_is_forgotten(self):
+        """ removed provider is forgotten """
+
+        registry = self.registry
+
+        class Provider(ExtensionProvider):
+            """ An extension provider. """
+
+            x = List(Int)
+
+            def get_extensions(self, extension_point_id):
+                """ Return the provider's contributions to an extension point.
+
+                """
+
+                return self.x if extension_point_id == 'my.ep' else []
+
+            def _x_changed(self, old, new):
+                """ Static trait change handler. """
+
+                self._fire_extension_point_changed(
+                    'my.ep', new, old, slice(0, len(old))
+                )
+
+                return
+
+        registry.add_extension_point(ExtensionPoint(List, id='my.ep'))
+
+        a, b, c = Provider(x=[1]), Provider(x=[2]), Provider(x=[3])
+        for provider in [a, b, c]:
+            registry.add_provider(provider)
+
+        self.assertEqual([1, 2, 3], registry.get_extensions('my.ep'))
+
+        # The other providers stay in the order that they were added.
+        registry.remove_provider(b)
+        self.assertEqual([a, c], registry.get_providers())
+        self.assertEqual([1, 3], registry.get_extensions('my.ep'))
+
+        # The registry no longer listens to the removed provider.
+        b.x = [42]
+        self.assertEqual([1, 3], registry.get_extensions('my.ep'))
+
+        c.x = [4]
+        self.assertEqual([1, 4], registry.get_extensions('my.ep'))
+
+        return
+
     def test_remove_non_existent_provider(self):
         """ remove provider """
 
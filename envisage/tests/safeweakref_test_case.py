@@ -138,6 +138,26 @@ class SafeWeakrefTestCase(unittest.TestCase):
 
         return
 
+    def test_weakrefs_to_bound_method_with_callbacks_are_not_shared(self):
+        class Foo(HasTraits):
+            def method(self):
+                pass
+
+        f = Foo()
+
+        # Like 'weakref.ref', each callback gets a reference of its own.
+        dead = []
+        r1 = ref(f.method, dead.append)
+        r2 = ref(f.method, dead.append)
+        self.assertIsNot(r1, r2)
+        self.assertIsNot(ref(f.method), r1)
+        self.assertEqual(ref(f.method), r1)
+
+        del f
+        self.assertEqual(2, len(dead))
+
+        return
+
     def test_get_builtin_weakref_for_non_bound_method(self):
         class Foo(HasTraits):
             pass
@@ -0,0 +1,106 @@
+""" Tests for finding the differences between two sequences. """
+
+
+# Enthought library imports.
+from envisage.sequence_diff import get_sequence_diff
+from traits.testing.unittest_tools import unittest
+
+
+class SequenceDiffTestCase(unittest.TestCase):
+    """ Tests for finding the differences between two sequences. """
+
+    ###########################################################################
+    # Tests.
+    ###########################################################################
+
+    def test_same(self):
+        """ same """
+
+        self.assertEqual([], get_sequence_diff([], []))
+        self.assertEqual([], get_sequence_diff([1, 2, 3], [1, 2, 3]))
+
+        return
+
+    def test_insert(self):
+        """ insert """
+
+        old = list(range(1000))
+        new = old[:500] + ['x'] + old[500:]
+
+        self.assertEqual([(500, [], ['x'])], get_sequence_diff(old, new))
+
+        return
+
+    def test_remove(self):
+        """ remove """
+
+        self.assertEqual([(1, [2], [])], get_sequence_diff([1, 2, 3], [1, 3]))
+        self.assertEqual(
+            [(0, [1, 2, 3], [])], get_sequence_diff([1, 2, 3], [])
+        )
+
+        return
+
+    def test_several_changes(self):
+        """ several changes """
+
+        old = [1, 2, 3, 4, 5, 6, 7]
+        new = [0, 1, 2, 4, 5, 'x', 'y', 7]
+
+        diff = get_sequence_diff(old, new)
+        self.assertEqual(
+            [(0, [], [0]), (3, [3], []), (5, [6], ['x', 'y'])], diff
+        )
+        self.assertEqual(new, self._apply(old, diff))
+
+        return
+
+    def test_unhashable_items(self):
+        """ unhashable items """
+
+        old = [[1], [2], [3], [4]]
+        new = [[1], [5], [3], [4]]
+
+        diff = get_sequence_diff(old, new)
+        self.assertEqual([(1, [[2]], [[5]])], diff)
+        self.assertEqual(new, self._apply(old, diff))
+
+        return
+
+    def test_cutoff(self):
+        """ cutoff """
+
+        old = [1, 2, 3, 4, 5]
+        new = [1, 'x', 3, 'y', 5]
+
+        # Above the cutoff, the whole of the part that changed is replaced.
+        diff = get_sequence_diff(old, new, cutoff=4)
+        self.assertEqual([(1, [2, 3, 4], ['x', 3, 'y'])], diff)
+        self.assertEqual(new, self._apply(old, diff))
+
+        diff = get_sequence_diff(old, new, cutoff=6)
+        self.assertEqual([(1, [2], ['x']), (3, [4], ['y'])], diff)
+        self.assertEqual(new, self._apply(old, diff))
+
+        return
+
+    ###########################################################################
+    # Private interface.
+    ###########################################################################
+
+    def _apply(self, sequence, diff):
+        """ Apply a diff to a sequence. """
+
+        sequence = list(sequence)
+        for index, removed, added in diff:
+            self.assertEqual(removed, sequence[index:index + len(removed)])
+            sequence[index:index + len(removed)] = added
+
+        return sequence
+
+
+# Entry point for stand-alone testing.
+if __name__ == '__main__':
+    unittest.main()
+
+#### EOF ######################################################################
@@ -0,0 +1,276 @@
+""" Tests for the eviction of services created by factories. """
+
+
+# Enthought library imports.
+from envisage.api import EvictionPolicy, Service, ServiceRegistry
+from traits.api import Any, Bool, HasTraits, Int, Interface, provides
+from traits.testing.unittest_tools import unittest
+
+
+class IFoo(Interface):
+    """ The protocol that services are registered against. """
+
+
+@provides(IFoo)
+class Foo(HasTraits):
+    """ A service that reports its size and releases its resources. """
+
+    # The approximate size of the service.
+    size = Int(100)
+
+    # True once the service has released its resources.
+    released = Bool(False)
+
+    def get_approximate_size(self):
+        """ Return the approximate size of the service in bytes. """
+
+        return self.size
+
+    def release_resources(self):
+        """ Release the service's resources. """
+
+        self.released = True
+
+        return
+
+
+class Clock(object):
+    """ A clock that only moves when it is told to. """
+
+    def __init__(self):
+        """ Constructor. """
+
+        self.now = 0.0
+
+        return
+
+    def __call__(self):
+        """ Return the time. """
+
+        return self.now
+
+
+class ServiceEvictionTestCase(unittest.TestCase):
+    """ Tests for the eviction of services created by factories. """
+
+    ###########################################################################
+    # 'TestCase' interface.
+    ###########################################################################
+
+    def setUp(self):
+        """ Prepares the test fixture before each test method is called. """
+
+        self.clock = Clock()
+        self.service_registry = ServiceRegistry()
+
+        # The services created by the factories (in the order that they were
+        # created).
+        self.created = []
+
+        return
+
+    ###########################################################################
+    # Tests.
+    ###########################################################################
+
+    def test_no_eviction_by_default(self):
+        """ no eviction by default """
+
+        service_id = self._register_foo('a')
+        foo = self.service_registry.get_service(IFoo)
+
+        self.assertFalse(self.service_registry.evict_service(service_id))
+        self.assertEqual([], self.service_registry.evict_idle_services())
+        self.assertIs(foo, self.service_registry.get_service(IFoo))
+
+        return
+
+    def test_idle_timeout(self):
+        """ idle timeout """
+
+        self.service_registry.eviction_policy = EvictionPolicy(
+            idle_timeout=10, clock=self.clock
+        )
+
+        a_id = self._register_foo('a')
+        b_id = self._register_foo('b')
+        a = self._get_foo('a')
+        self.clock.now = 5
+        b = self._get_foo('b')
+
+        # Using a service keeps it alive.
+        self.clock.now = 12
+        self.assertIs(b, self._get_foo('b'))
+        self.assertTrue(a.released)
+        self.assertFalse(b.released)
+
+        # Idle services can be evicted without anything else going on.
+        self.clock.now = 30
+        self.assertEqual([b_id], self.service_registry.evict_idle_services())
+        self.assertTrue(b.released)
+
+        # The factories are called again the next time that the services are
+        # requested.
+        self.assertIsNot(a, self._get_foo('a'))
+        self.assertEqual(['a', 'b', 'a'], [foo.name for foo in self.created])
+
+        stats = self.service_registry.get_service_stats(a_id)
+        self.assertEqual(2, stats.created)
+
+        return
+
+    def test_memory_budget(self):
+        """ memory budget """
+
+        policy = EvictionPolicy(memory_budget=250, clock=self.clock)
+        self.service_registry.eviction_policy = policy
+
+        for name in ['a', 'b', 'c']:
+            self._register_foo(name)
+
+        a = self._get_foo('a')
+        b = self._get_foo('b')
+        self.assertEqual(200, policy.total_size)
+
+        # Use 'a' so that 'b' is the least recently used.
+        self._get_foo('a')
+        c = self._get_foo('c')
+        self.assertTrue(b.released)
+        self.assertFalse(a.released)
+        self.assertFalse(c.released)
+        self.assertEqual(200, policy.total_size)
+
+        return
+
+    def test_service_bigger_than_budget(self):
+        """ service bigger than budget """
+
+        policy = EvictionPolicy(memory_budget=50, clock=self.clock)
+        self.service_registry.eviction_policy = policy
+
+        self._register_foo('a')
+        a = self._get_foo('a')
+
+        # The newest service is never evicted to make room for itself.
+        self.assertFalse(a.released)
+        self.assertIs(a, self._get_foo('a'))
+
+        return
+
+    def test_evict_and_unregister_service(self):
+        """ evict and unregister service """
+
+        policy = EvictionPolicy(clock=self.clock)
+        self.service_registry.eviction_policy = policy
+
+        service_id = self._register_foo('a')
+        a = self._get_foo('a')
+        self.assertEqual(1, len(policy))
+
+        self.assertTrue(self.service_registry.evict_service(service_id))
+        self.assertTrue(a.released)
+        self.assertEqual(0, len(policy))
+        self.assertFalse(self.service_registry.evict_service(service_id))
+
+        self._get_foo('a')
+        self.assertEqual(1, len(policy))
+        self.service_registry.unregister_service(service_id)
+        self.assertEqual(0, len(policy))
+        self.assertEqual(0, policy.total_size)
+
+        return
+
+    def test_cached_service_trait_keeps_service_alive(self):
+        """ cached service trait keeps service alive """
+
+        self.service_registry.eviction_policy = EvictionPolicy(
+            idle_timeout=10, clock=self.clock
+        )
+
+        class Bar(HasTraits):
+            foo = Service(IFoo, "name == 'a'", cache=True)
+
+            service_registry = Any
+
+        bar = Bar(service_registry=self.service_registry)
+        self._register_foo('a')
+        self._register_foo('b')
+        a = bar.foo
+
+        # Using the cached service keeps it alive even though the registry
+        # isn't asked for it.
+        for now in range(5, 30, 5):
+            self.clock.now = now
+            self.assertIs(a, bar.foo)
+
+        self._get_foo('b')
+        self.assertFalse(a.released)
+
+        # ... until it isn't used any more.
+        self.clock.now = 100
+        self._get_foo('b')
+        self.assertTrue(a.released)
+        self.assertIsNot(a, bar.foo)
+
+        return
+
+    def test_touch_service_that_is_more_than_one_service(self):
+        """ touch service that is more than one service """
+
+        policy = EvictionPolicy(idle_timeout=10, clock=self.clock)
+        self.service_registry.eviction_policy = policy
+
+        foo = Foo()
+        a_id = self.service_registry.register_service(
+            IFoo, lambda **properties: foo, {'name' : 'a'}
+        )
+        b_id = self.service_registry.register_service(
+            IFoo, lambda **properties: foo, {'name' : 'b'}
+        )
+        self._get_foo('a')
+        self._get_foo('b')
+
+        # Touching the object keeps both of the services alive.
+        self.clock.now = 8
+        self.service_registry.touch_service(foo)
+        self.clock.now = 15
+        self.assertEqual([], self.service_registry.evict_idle_services())
+
+        # Once the services have been evicted or unregistered, touching the
+        # object does nothing.
+        self.service_registry.evict_service(a_id)
+        self.service_registry.unregister_service(b_id)
+        self.service_registry.touch_service(foo)
+        self.assertEqual(0, len(policy))
+
+        return
+
+    ###########################################################################
+    # Private interface.
+    ###########################################################################
+
+    def _get_foo(self, name):
+        """ Get the foo with the specified name. """
+
+        return self.service_registry.get_service(IFoo, 'name == %r' % name)
+
+    def _register_foo(self, name):
+        """ Register a factory for a foo with the specified name. """
+
+        def factory(**properties):
+            foo = Foo()
+            foo.name = properties['name']
+            self.created.append(foo)
+
+            return foo
+
+        return self.service_registry.register_service(
+            IFoo, factory, {'name' : name}
+        )
+
+
+# Entry point for stand-alone testing.
+if __name__ == '__main__':
+    unittest.main()
+
+#### EOF ######################################################################
@@ -0,0 +1,76 @@
+""" Tests for compiled service queries. """
+
+
+# Enthought library imports.
+from envisage.service_query import (
+    InvalidQueryError, QueryCache, QueryNamespace
+)
+from traits.api import HasTraits, Int
+from traits.testing.unittest_tools import unittest
+
+
+class ServiceQueryTestCase(unittest.TestCase):
+    """ Tests for compiled service queries. """
+
+    ###########################################################################
+    # Tests.
+    ###########################################################################
+
+    def test_compiled_queries_are_cached(self):
+        cache = QueryCache()
+
+        code = cache.compile('price < 100')
+        self.assertIs(code, cache.compile('price < 100'))
+        self.assertEqual(1, len(cache))
+
+        return
+
+    def test_least_recently_used_query_is_discarded(self):
+        cache = QueryCache(max_size=2)
+
+        a = cache.compile('a')
+        cache.compile('b')
+
+        # Use 'a' again so that 'b' becomes the least recently used.
+        cache.compile('a')
+        cache.compile('c')
+        self.assertEqual(2, len(cache))
+
+        # 'a' was kept, 'b' was discarded.
+        self.assertIs(a, cache.compile('a'))
+
+        return
+
+    def test_invalid_query(self):
+        cache = QueryCache()
+
+        with self.assertRaises(InvalidQueryError):
+            cache.compile("location = 'BH6'")
+
+        # Invalid queries are not cached.
+        self.assertEqual(0, len(cache))
+
+        return
+
+    def test_properties_take_precedence_over_attributes(self):
+
+        class Foo(HasTraits):
+            price = Int
+
+        namespace = QueryNamespace(Foo(price=10), {'price': 200})
+        self.assertEqual(200, namespace['price'])
+
+        namespace = QueryNamespace(Foo(price=10), {})
+        self.assertEqual(10, namespace['price'])
+        self.assertNotIn('color', namespace)
+        with self.assertRaises(KeyError):
+            namespace['color']
+
+        return
+
+
+# Entry point for stand-alone testing.
+if __name__ == '__main__':
+    unittest.main()
+
+#### EOF ######################################################################
@@ -3,9 +3,11 @@
 
 # Standard library imports.
 import sys
+import threading
 
 # Enthought library imports.
 from envisage.api import Application, ServiceRegistry, NoSuchServiceError
+from envisage.api import InvalidQueryError, ServiceOffer
 from traits.api import HasTraits, Int, Interface, provides
 from traits.testing.unittest_tools import unittest
 
@@ -256,6 +258,64 @@ class ServiceRegistryTestCase(unittest.TestCase):
 
         return
 
+    def test_get_services_in_registration_order(self):
+        """ get services in registration order """
+
+        class IFoo(Interface):
+            pass
+
+        @provides(IFoo)
+        class Foo(HasTraits):
+            pass
+
+        class IBar(Interface):
+            pass
+
+        @provides(IBar)
+        class Bar(HasTraits):
+            pass
+
+        # Interleave the registrations of two different protocols.
+        foos = []
+        for i in range(5):
+            foo = Foo()
+            self.service_registry.register_service(IFoo, foo)
+            foos.append(foo)
+
+            self.service_registry.register_service(IBar, Bar())
+
+        services = self.service_registry.get_services(IFoo)
+        self.assertEqual(foos, services)
+
+        return
+
+    def test_get_services_after_unregistering_all_of_a_protocol(self):
+        """ get services after unregistering all of a protocol """
+
+        class IFoo(Interface):
+            pass
+
+        @provides(IFoo)
+        class Foo(HasTraits):
+            pass
+
+        service_ids = [
+            self.service_registry.register_service(IFoo, Foo())
+            for i in range(3)
+        ]
+
+        for service_id in service_ids:
+            self.service_registry.unregister_service(service_id)
+
+        self.assertEqual([], self.service_registry.get_services(IFoo))
+
+        # Registering again works just as it did first time around.
+        foo = Foo()
+        self.service_registry.register_service(IFoo, foo)
+        self.assertEqual([foo], self.service_registry.get_services(IFoo))
+
+        return
+
     def test_get_services_with_strings(self):
         """ get services with strings """
 
@@ -318,6 +378,75 @@ class ServiceRegistryTestCase(unittest.TestCase):
 
         return
 
+    def test_get_services_with_nested_scope_in_query(self):
+        """ get services with nested scope in query """
+
+        class IFoo(Interface):
+            price = Int
+
+        @provides(IFoo)
+        class Foo(HasTraits):
+            price = Int
+
+        # Attributes and properties are visible inside generator expressions
+        # and lambdas as well as at the top level of the query.
+        foo = Foo(price=100)
+        self.service_registry.register_service(
+            IFoo, foo, {'values' : [50, 150]}
+        )
+
+        services = self.service_registry.get_services(
+            IFoo, 'any(v > price for v in values)'
+        )
+        self.assertEqual([foo], services)
+
+        services = self.service_registry.get_services(
+            IFoo, '[v for v in values if v > price] == [150]'
+        )
+        self.assertEqual([foo], services)
+
+        services = self.service_registry.get_services(
+            IFoo, '(lambda: price)() == 100'
+        )
+        self.assertEqual([foo], services)
+
+        # A query that uses an attribute in a nested scope can't be evaluated
+        # on the properties alone, so the factory is called.
+        self.service_registry.register_service(
+            IFoo, lambda **properties: Foo(price=200), {'values' : [250]}
+        )
+        services = self.service_registry.get_services(
+            IFoo, 'all(v > price for v in values)'
+        )
+        self.assertEqual([200], [service.price for service in services])
+
+        return
+
+    def test_get_services_with_invalid_query(self):
+        """ get services with invalid query """
+
+        class IFoo(Interface):
+            price = Int
+
+        @provides(IFoo)
+        class Foo(HasTraits):
+            price = Int
+
+        self.service_registry.register_service(IFoo, Foo(price=100))
+
+        with self.assertRaises(InvalidQueryError):
+            self.service_registry.get_services(IFoo, 'price = 100')
+
+        # The query is reported as invalid even if there are no services to
+        # evaluate it against.
+        class IBar(Interface):
+            pass
+
+        with self.assertRaises(InvalidQueryError):
+            self.service_registry.get_services(IBar, 'price = 100')
+
+        return
+
     def test_get_service(self):
         """ get service """
 
@@ -506,6 +635,98 @@ class ServiceRegistryTestCase(unittest.TestCase):
 
         return
 
+    def test_register_and_unregister_services(self):
+        """ register and unregister services """
+
+        class IFoo(Interface):
+            price = Int
+
+        @provides(IFoo)
+        class Foo(HasTraits):
+            price = Int
+
+        for concurrent in [False, True]:
+            registry = ServiceRegistry(concurrent=concurrent)
+            self.service_registry.service_registry = registry
+
+            events = []
+            for name in ['registered', 'unregistered', 'services_registered',
+                         'services_unregistered']:
+                registry.on_trait_change(
+                    lambda obj, name, new: events.append((name, new)), name
+                )
+
+            foos = [Foo(price=price) for price in range(3)]
+            offers = [
+                ServiceOffer(
+                    protocol   = IFoo,
+                    factory    = lambda foo=foo, **properties: foo,
+                    properties = {'price' : foo.price}
+                )
+
+                for foo in foos
+            ] + [
+                ServiceOffer(protocol=HasTraits, factory=service_factory)
+            ]
+
+            # All of the services are registered with a single bulk event,
+            # followed by the usual event for each service.
+            service_ids = self.service_registry.register_services(offers)
+            self.assertEqual(4, len(set(service_ids)))
+            self.assertEqual(
+                [('services_registered', service_ids)]
+                + [('registered', service_id) for service_id in service_ids],
+                events
+            )
+            self.assertEqual(foos, self.service_registry.get_services(IFoo))
+            self.assertEqual(
+                {'price' : 2},
+                self.service_registry.get_service_properties(service_ids[2])
+            )
+
+            # If any of the offers is invalid then nothing is registered.
+            with self.assertRaises(ValueError):
+                self.service_registry.register_services(
+                    [
+                        ServiceOffer(protocol=IFoo, factory=Foo),
+                        ServiceOffer(
+                            protocol=IFoo, factory=Foo, scope='per_galaxy'
+                        )
+                    ]
+                )
+
+            self.assertEqual(foos, self.service_registry.get_services(IFoo))
+
+            # If any of the Ids are invalid then nothing is unregistered.
+            del events[:]
+            for bad_ids in [[service_ids[0], -1], service_ids[:1] * 2]:
+                with self.assertRaises(ValueError):
+                    self.service_registry.unregister_services(bad_ids)
+
+                self.assertEqual(
+                    foos, self.service_registry.get_services(IFoo)
+                )
+
+            # All of the services are unregistered with a single bulk event,
+            # followed by the usual event for each service.
+            self.service_registry.unregister_services(service_ids[1:])
+            self.assertEqual(
+                [('services_unregistered', service_ids[1:])]
+                + [
+                    ('unregistered', service_id)
+                    for service_id in service_ids[1:]
+                ],
+                events
+            )
+            self.assertEqual(
+                foos[:1], self.service_registry.get_services(IFoo)
+            )
+            self.assertEqual(
+                [], self.service_registry.get_services(HasTraits)
+            )
+
+        return
+
     def test_minimize_and_maximize(self):
         """ minimize and maximize """
 
@@ -538,6 +759,344 @@ class ServiceRegistryTestCase(unittest.TestCase):
 
         return
 
+    def test_get_service_only_creates_the_first_match(self):
+        """ get service only creates the first match """
+
+        class IFoo(Interface):
+            pass
+
+        @provides(IFoo)
+        class Foo(HasTraits):
+            pass
+
+        created = []
+        def foo_factory(**properties):
+            created.append(properties['name'])
+            return Foo()
+
+        for name in ['a', 'b', 'c']:
+            self.service_registry.register_service(
+                IFoo, foo_factory, {'name' : name}
+            )
+
+        service = self.service_registry.get_service(IFoo)
+        self.assertEqual(Foo, type(service))
+        self.assertEqual(['a'], created)
+
+        # A query that only uses properties doesn't need to create the
+        # services that it doesn't match.
+        service = self.service_registry.get_service(IFoo, "name == 'c'")
+        self.assertEqual(Foo, type(service))
+        self.assertEqual(['a', 'c'], created)
+
+        return
+
+    def test_iter_services(self):
+        """ iter services """
+
+        class IFoo(Interface):
+            pass
+
+        @provides(IFoo)
+        class Foo(HasTraits):
+            pass
+
+        created = []
+        def foo_factory(**properties):
+            created.append(properties['name'])
+            return Foo()
+
+        for name in ['a', 'b']:
+            self.service_registry.register_service(
+                IFoo, foo_factory, {'name' : name}
+            )
+
+        services = self.service_registry.iter_services(IFoo)
+        self.assertEqual([], created)
+
+        next(services)
+        self.assertEqual(['a'], created)
+
+        self.assertEqual(1, len(list(services)))
+        self.assertEqual(['a', 'b'], created)
+
+        return
+
+    def test_minimize_and_maximize_using_properties(self):
+        """ minimize and maximize using properties """
+
+        class IFoo(Interface):
+            price = Int
+
+        @provides(IFoo)
+        class Foo(HasTraits):
+            price = Int
+
+        created = []
+        def foo_factory(**properties):
+            created.append(properties['price'])
+            return Foo(**properties)
+
+        for price in [10, 5, 100, 5]:
+            self.service_registry.register_service(
+                IFoo, foo_factory, {'price' : price}
+            )
+
+        # Only the winner gets created (and ties go to the service that was
+        # registered first).
+        service = self.service_registry.get_service(IFoo, minimize='price')
+        self.assertEqual(5, service.price)
+        self.assertEqual([5], created)
+
+        service = self.service_registry.get_service(IFoo, maximize='price')
+        self.assertEqual(100, service.price)
+        self.assertEqual([5, 100], created)
+
+        # Ranking all of the services gives the same answers.
+        services = self.service_registry.get_services(IFoo, minimize='price')
+        self.assertEqual([5, 5, 10, 100], [foo.price for foo in services])
+
+        services = self.service_registry.get_services(IFoo, maximize='price')
+        self.assertEqual([100, 10, 5, 5], [foo.price for foo in services])
+
+        return
+
+    def test_ranking_created_services_uses_attributes(self):
+        """ ranking created services uses attributes """
+
+        class IFoo(Interface):
+            price = Int
+
+        @provides(IFoo)
+        class Foo(HasTraits):
+            price = Int
+
+        # The properties are out of date (as far as ranking is concerned).
+        a = Foo(price=10)
+        b = Foo(price=20)
+        self.service_registry.register_service(IFoo, a, {'price' : 20})
+        self.service_registry.register_service(IFoo, b, {'price' : 10})
+
+        services = self.service_registry.get_services(IFoo, minimize='price')
+        self.assertEqual([a, b], services)
+
+        service = self.service_registry.get_service(IFoo, minimize='price')
+        self.assertIs(a, service)
+
+        return
+
+    def test_switch_concurrent_mode_with_services_registered(self):
+        """ switch concurrent mode with services registered """
+
+        class IFoo(Interface):
+            pass
+
+        @provides(IFoo)
+        class Foo(HasTraits):
+            pass
+
+        registry = ServiceRegistry()
+        foos = [Foo() for i in range(4)]
+        service_ids = [registry.register_service(IFoo, foos[0])]
+
+        # Switching modes keeps the existing services, and registering and
+        # unregistering services carries on working.
+        registry.concurrent = True
+        service_ids.append(registry.register_service(IFoo, foos[1]))
+        self.assertEqual(foos[:2], registry.get_services(IFoo))
+        registry.unregister_service(service_ids.pop(0))
+
+        registry.concurrent = False
+        service_ids.append(registry.register_service(IFoo, foos[2]))
+        self.assertEqual(foos[1:3], registry.get_services(IFoo))
+        registry.unregister_service(service_ids.pop(0))
+        self.assertEqual(foos[2:3], registry.get_services(IFoo))
+
+        return
+
+    def test_service_factory_is_only_called_once_by_many_threads(self):
+        """ service factory is only called once by many threads """
+
+        class IFoo(Interface):
+            pass
+
+        @provides(IFoo)
+        class Foo(HasTraits):
+            pass
+
+        calling = threading.Event()
+        proceed = threading.Event()
+        created = []
+        def foo_factory(**properties):
+            calling.set()
+            proceed.wait()
+            created.append(Foo())
+            return created[-1]
+
+        self.service_registry.register_service(IFoo, foo_factory)
+
+        services = []
+        def get_service():
+            services.append(self.service_registry.get_service(IFoo))
+
+        self._run_waiting_threads(get_service, 5, calling, proceed)
+
+        self.assertEqual(1, len(created))
+        self.assertEqual(created * 5, services)
+
+        return
+
+    def test_service_factory_error_is_shared_but_not_cached(self):
+        """ service factory error is shared but not cached """
+
+        class IFoo(Interface):
+            pass
+
+        @provides(IFoo)
+        class Foo(HasTraits):
+            pass
+
+        calling = threading.Event()
+        proceed = threading.Event()
+        calls = []
+        def foo_factory(**properties):
+            calls.append(properties)
+            if len(calls) == 1:
+                calling.set()
+                proceed.wait()
+                raise ValueError('broken')
+
+            return Foo()
+
+        self.service_registry.register_service(IFoo, foo_factory)
+
+        errors = []
+        def get_service():
+            try:
+                self.service_registry.get_service(IFoo)
+
+            except ValueError as exc:
+                errors.append(exc)
+
+        self._run_waiting_threads(get_service, 3, calling, proceed)
+
+        # Everybody got the error from the single call to the factory...
+        self.assertEqual(1, len(calls))
+        self.assertEqual(3, len(errors))
+        self.assertEqual(1, len(set(map(id, errors))))
+
+        # ... but the factory is still registered, so it gets called again.
+        service = self.service_registry.get_service(IFoo)
+        self.assertEqual(Foo, type(service))
+        self.assertEqual(2, len(calls))
+
+        return
+
+    def test_service_factories_on_different_threads_need_each_other(self):
+        """ service factories on different threads need each other """
+
+        class IFoo(Interface):
+            pass
+
+        class IBar(Interface):
+            pass
+
+        @provides(IFoo)
+        class Foo(HasTraits):
+            pass
+
+        @provides(IBar)
+        class Bar(HasTraits):
+            pass
+
+        service_registry = self.service_registry
+        foo_started = threading.Event()
+        bar_started = threading.Event()
+
+        # The first foo needs a bar, and the bar needs a foo (so each thread
+        # ends up wanting the service that the other thread is creating).
+        foo_calls = []
+        def foo_factory(**properties):
+            foo_calls.append(properties)
+            if len(foo_calls) == 1:
+                foo_started.set()
+                bar_started.wait()
+                service_registry.get_service(IBar)
+
+            return Foo()
+
+        def bar_factory(**properties):
+            bar_started.set()
+            foo_started.wait()
+            service_registry.get_service(IFoo)
+
+            return Bar()
+
+        service_registry.register_service(IFoo, foo_factory)
+        service_registry.register_service(IBar, bar_factory)
+
+        services = {}
+        def get_service(protocol):
+            services[protocol] = service_registry.get_service(protocol)
+
+        threads = [
+            threading.Thread(target=get_service, args=(protocol,))
+            for protocol in [IFoo, IBar]
+        ]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        # Rather than deadlocking, one of the threads calls the other's
+        # factory itself (just as if a factory wanted its own service).
+        for thread in threads:
+            thread.join(10)
+            self.assertFalse(thread.is_alive())
+
+        self.assertIs(service_registry.get_service(IFoo), services[IFoo])
+        self.assertIs(service_registry.get_service(IBar), services[IBar])
+
+        return
+
+    ###########################################################################
+    # Private interface.
+    ###########################################################################
+
+    def _run_waiting_threads(self, target, count, calling, proceed):
+        """ Run threads that all want a service while it is being created.
+
+        The first thread calls the service factory, which must set 'calling'
+        and then wait for 'proceed'. The other threads are only let go once
+        they are all waiting for the first one.
+
+        """
+
+        threads = [threading.Thread(target=target) for i in range(count)]
+        threads[0].start()
+        calling.wait()
+
+        # Count the threads that wait for the service to be created.
+        registry = self.service_registry.service_registry
+        flight, = registry._flights.values()
+        waiting = []
+        wait = flight.wait
+        def counting_wait():
+            waiting.append(threading.current_thread())
+            return wait()
+        flight.wait = counting_wait
+
+        for thread in threads[1:]:
+            thread.start()
+
+        while len(waiting) < count - 1:
+            threading.Event().wait(0.001)
+
+        proceed.set()
+        for thread in threads:
+            thread.join()
+
+        return
+
 
 # Entry point for stand-alone testing.
 if __name__ == '__main__':
@@ -0,0 +1,336 @@
+""" Tests for service scopes. """
+
+
+# Standard library imports.
+import threading
+
+# Enthought library imports.
+from envisage.api import Application, Plugin, ServiceOffer, ServiceRegistry
+from envisage.api import pooled
+from envisage.core_plugin import CorePlugin
+from traits.api import HasTraits, Int, Interface, List, provides
+from traits.testing.unittest_tools import unittest
+
+
+class IFoo(Interface):
+    """ The protocol that services are registered against. """
+
+
+@provides(IFoo)
+class Foo(HasTraits):
+    """ A service. """
+
+    # The number of the service (in the order that they were created).
+    n = Int
+
+
+class FooFactory(object):
+    """ A service factory that counts the services that it creates. """
+
+    def __init__(self):
+        """ Constructor. """
+
+        self.created = []
+
+        return
+
+    def __call__(self, **properties):
+        """ Create a service. """
+
+        foo = Foo(n=len(self.created))
+        self.created.append(foo)
+
+        return foo
+
+
+def run_in_threads(target, count):
+    """ Run a target in 'count' threads, and return the results. """
+
+    results = [None] * count
+    def run(index):
+        results[index] = target()
+
+    threads = [
+        threading.Thread(target=run, args=(index,)) for index in range(count)
+    ]
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    return results
+
+
+class ServiceScopeTestCase(unittest.TestCase):
+    """ Tests for service scopes. """
+
+    ###########################################################################
+    # 'TestCase' interface.
+    ###########################################################################
+
+    def setUp(self):
+        """ Prepares the test fixture before each test method is called. """
+
+        self.service_registry = ServiceRegistry()
+        self.factory = FooFactory()
+
+        return
+
+    ###########################################################################
+    # Tests.
+    ###########################################################################
+
+    def test_singleton(self):
+        """ singleton """
+
+        service_id = self.service_registry.register_service(
+            IFoo, self.factory
+        )
+
+        services = run_in_threads(
+            lambda: self.service_registry.get_service(IFoo), 4
+        )
+        self.assertEqual(self.factory.created * 4, services)
+
+        stats = self.service_registry.get_service_stats(service_id)
+        self.assertEqual(1, stats.created)
+
+        return
+
+    def test_per_thread(self):
+        """ per thread """
+
+        service_id = self.service_registry.register_service(
+            IFoo, self.factory, scope='per_thread'
+        )
+
+        def get_services():
+            return [self.service_registry.get_service(IFoo) for i in range(3)]
+
+        # Each thread gets its own service (and keeps on getting it).
+        results = run_in_threads(get_services, 4)
+        for services in results:
+            self.assertEqual([services[0]] * 3, services)
+
+        self.assertEqual(4, len(set(services[0] for services in results)))
+
+        stats = self.service_registry.get_service_stats(service_id)
+        self.assertEqual(4, stats.created)
+
+        return
+
+    def test_transient(self):
+        """ transient """
+
+        service_id = self.service_registry.register_service(
+            IFoo, self.factory, scope='transient'
+        )
+
+        services = [self.service_registry.get_service(IFoo) for i in range(3)]
+        self.assertEqual(self.factory.created, services)
+        self.assertEqual(3, len(self.factory.created))
+
+        stats = self.service_registry.get_service_stats(service_id)
+        self.assertEqual(3, stats.created)
+
+        return
+
+    def test_pooled(self):
+        """ pooled """
+
+        service_id = self.service_registry.register_service(
+            IFoo, self.factory, scope=pooled(2)
+        )
+
+        # A pooled service can only be checked out.
+        with self.assertRaises(ValueError):
+            self.service_registry.get_service(IFoo)
+
+        with self.service_registry.checkout(IFoo) as a:
+            with self.service_registry.checkout(IFoo) as b:
+                self.assertIsNot(a, b)
+
+        # Services are reused once they have been returned.
+        with self.service_registry.checkout(IFoo) as c:
+            self.assertIn(c, [a, b])
+
+        stats = self.service_registry.get_service_stats(service_id)
+        self.assertEqual(2, stats.created)
+        self.assertEqual(0, stats.waits)
+
+        return
+
+    def test_pooled_waits_for_a_service_to_be_returned(self):
+        """ pooled waits for a service to be returned """
+
+        service_id = self.service_registry.register_service(
+            IFoo, self.factory, scope=pooled(1)
+        )
+        scope = self.service_registry._scopes[service_id]
+
+        checked_out = threading.Event()
+        release = threading.Event()
+        def hold_service():
+            with self.service_registry.checkout(IFoo) as foo:
+                checked_out.set()
+                release.wait()
+
+            return foo
+
+        holder = threading.Thread(target=hold_service)
+        holder.start()
+        checked_out.wait()
+
+        services = []
+        def get_service():
+            with self.service_registry.checkout(IFoo) as foo:
+                services.append(foo)
+
+        waiter = threading.Thread(target=get_service)
+        waiter.start()
+
+        # Let the holder go once the waiter is waiting.
+        stats = self.service_registry.get_service_stats(service_id)
+        while len(scope._returned._waiters) == 0:
+            threading.Event().wait(0.001)
+
+        release.set()
+        holder.join()
+        waiter.join()
+
+        self.assertEqual(self.factory.created, services)
+        self.assertEqual(1, stats.created)
+        self.assertEqual(1, stats.waits)
+        self.assertEqual(0, scope.checked_out)
+
+        return
+
+    def test_checkout_non_pooled_service(self):
+        """ checkout non-pooled service """
+
+        self.service_registry.register_service(IFoo, self.factory)
+
+        with self.service_registry.checkout(IFoo) as foo:
+            self.assertIs(self.factory.created[0], foo)
+
+        with self.service_registry.checkout('i_dont_exist.IBar') as bar:
+            self.assertIsNone(bar)
+
+        return
+
+    def test_checkout_while_ranking(self):
+        """ checkout while ranking """
+
+        service_id = self.service_registry.register_service(
+            IFoo, self.factory, scope=pooled(3)
+        )
+        scope = self.service_registry._scopes[service_id]
+
+        # Ranking on an attribute checks out a service to look at it, but
+        # only the winner stays checked out.
+        with self.service_registry.checkout(IFoo, maximize='n') as foo:
+            self.assertEqual(1, scope.checked_out)
+
+        self.assertEqual(0, scope.checked_out)
+
+        return
+
+    def test_scope_is_not_shared_between_registrations(self):
+        """ scope is not shared between registrations """
+
+        offer = ServiceOffer(protocol=IFoo, factory=self.factory,
+                             scope=pooled(1))
+
+        other_registry = ServiceRegistry()
+        service_id = self.service_registry.register_service(
+            offer.protocol, offer.factory, scope=offer.scope
+        )
+        other_id = other_registry.register_service(
+            offer.protocol, offer.factory, scope=offer.scope
+        )
+
+        # Holding the service from one registry doesn't make the other one
+        # wait (they each have their own pool).
+        with self.service_registry.checkout(IFoo) as a:
+            with other_registry.checkout(IFoo) as b:
+                self.assertIsNot(a, b)
+
+        self.assertEqual(0, offer.scope.stats.created)
+        self.assertEqual(
+            1, self.service_registry.get_service_stats(service_id).created
+        )
+        self.assertEqual(1, other_registry.get_service_stats(other_id).created)
+
+        # Unregistering the service from one registry doesn't clear the
+        # other's pool.
+        self.service_registry.unregister_service(service_id)
+        with other_registry.checkout(IFoo) as c:
+            self.assertIs(b, c)
+
+        return
+
+    def test_unregister_scoped_service(self):
+        """ unregister scoped service """
+
+        service_id = self.service_registry.register_service(
+            IFoo, self.factory, scope='per_thread'
+        )
+        self.service_registry.get_service(IFoo)
+        self.service_registry.unregister_service(service_id)
+
+        with self.assertRaises(ValueError):
+            self.service_registry.get_service_stats(service_id)
+
+        return
+
+    def test_no_such_scope(self):
+        """ no such scope """
+
+        with self.assertRaises(ValueError):
+            self.service_registry.register_service(
+                IFoo, self.factory, scope='per_galaxy'
+            )
+
+        with self.assertRaises(ValueError):
+            pooled(0)
+
+        return
+
+    def test_service_offer_scope(self):
+        """ service offer scope """
+
+        factory = self.factory
+
+        class PluginA(Plugin):
+            id = 'A'
+
+            service_offers = List(contributes_to='envisage.service_offers')
+
+            def _service_offers_default(self):
+                return [
+                    ServiceOffer(
+                        protocol=IFoo, factory=factory, scope='transient'
+                    )
+                ]
+
+        application = Application(
+            id='test', plugins=[CorePlugin(), PluginA()]
+        )
+        application.start()
+
+        a = application.get_service(IFoo)
+        b = application.get_service(IFoo)
+        self.assertIsNot(a, b)
+        self.assertEqual([a, b], factory.created)
+
+        application.stop()
+
+        return
+
+
+# Entry point for stand-alone testing.
+if __name__ == '__main__':
+    unittest.main()
+
+#### EOF ######################################################################
@@ -2,8 +2,9 @@
 
 
 # Enthought library imports.
-from envisage.api import Application, Plugin, Service
-from traits.api import HasTraits, Instance
+from envisage.api import Application, InvalidQueryError, Plugin, Service
+from envisage.api import ServiceRegistry
+from traits.api import HasTraits, Instance, Int
 from traits.testing.unittest_tools import unittest
 
 
@@ -68,6 +69,15 @@ class ServiceTestCase(unittest.TestCase):
 
         return
 
+    def test_service_trait_type_with_invalid_query(self):
+        """ service trait type with invalid query """
+
+        with self.assertRaises(InvalidQueryError):
+            class Foo(HasTraits):
+                foo = Service(HasTraits, query='price = 100')
+
+        return
+
     def test_service_trait_type_with_no_service_registry(self):
         """ service trait type with no service registry """
 
@@ -84,6 +94,90 @@ class ServiceTestCase(unittest.TestCase):
 
         return
 
+    def test_cached_service_trait_type(self):
+        """ cached service trait type """
+
+        class Foo(HasTraits):
+            price = Int
+
+        class Bar(HasTraits):
+            service_registry = Instance(ServiceRegistry, ())
+            foo = Service(Foo, query='price < 100', cache=True)
+            uncached = Service(Foo, query='price < 100')
+
+        bar = Bar()
+        service_registry = bar.service_registry
+
+        calls = []
+        get_service = service_registry.get_service
+        def counting_get_service(*args):
+            calls.append(args)
+            return get_service(*args)
+
+        service_registry.get_service = counting_get_service
+
+        # Even a missing service is cached.
+        self.assertIsNone(bar.foo)
+        self.assertIsNone(bar.foo)
+        self.assertEqual(1, len(calls))
+
+        # Registering a service invalidates the cache.
+        a = Foo(price=50)
+        a_id = service_registry.register_service(Foo, a)
+        self.assertIs(a, bar.foo)
+        self.assertIs(a, bar.foo)
+        self.assertEqual(2, len(calls))
+
+        # Uncached traits still query the registry every time.
+        self.assertIs(a, bar.uncached)
+        self.assertEqual(3, len(calls))
+
+        # Changing a service's properties invalidates the cache...
+        service_registry.set_service_properties(a_id, {'price': 200})
+        self.assertIsNone(bar.foo)
+        self.assertEqual(4, len(calls))
+
+        # ... and so does unregistering it.
+        service_registry.set_service_properties(a_id, {'price': 10})
+        self.assertIs(a, bar.foo)
+        service_registry.unregister_service(a_id)
+        self.assertIsNone(bar.foo)
+        self.assertEqual(6, len(calls))
+
+        # Services registered against other protocols don't.
+        service_registry.register_service(HasTraits, HasTraits())
+        self.assertIsNone(bar.foo)
+        self.assertEqual(6, len(calls))
+
+        return
+
+    def test_cached_service_trait_type_with_scoped_services(self):
+        """ cached service trait type with scoped services """
+
+        class Foo(HasTraits):
+            pass
+
+        class Bar(HasTraits):
+            service_registry = Instance(ServiceRegistry, ())
+            foo = Service(Foo, cache=True)
+
+        bar = Bar()
+        service_id = bar.service_registry.register_service(
+            Foo, lambda **properties: Foo(), scope='transient'
+        )
+
+        # Transient services are never cached.
+        self.assertIsNone(bar.service_registry.get_service_generation(Foo))
+        self.assertIsNot(bar.foo, bar.foo)
+
+        # Once the scoped service has gone, caching starts again.
+        bar.service_registry.unregister_service(service_id)
+        bar.service_registry.register_service(Foo, Foo())
+        self.assertIsNotNone(bar.service_registry.get_service_generation(Foo))
+        self.assertIs(bar.foo, bar.foo)
+
+        return
+
 
 # Entry point for stand-alone testing.
 if __name__ == '__main__':
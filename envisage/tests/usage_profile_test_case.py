@@ -0,0 +1,389 @@
+""" Tests for usage profiles. """
+
+
+# Standard library imports.
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+# Enthought library imports.
+from envisage.api import Application, ExtensionPoint, Plugin, ServiceOffer
+from envisage.api import ThreadScheduler, UsageProfile
+from envisage.core_plugin import CorePlugin
+from traits.api import HasTraits, Interface, List, provides
+from traits.testing.unittest_tools import unittest
+
+
+class IFoo(Interface):
+    """ The protocol that services are registered against. """
+
+
+@provides(IFoo)
+class Foo(HasTraits):
+    """ A service. """
+
+
+class TestApplication(Application):
+    """ The type of application used in the tests. """
+
+    id = 'test'
+
+
+class UsageProfileTestCase(unittest.TestCase):
+    """ Tests for usage profiles. """
+
+    ###########################################################################
+    # 'TestCase' interface.
+    ###########################################################################
+
+    def setUp(self):
+        """ Prepares the test fixture before each test method is called. """
+
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'usage_profile.json')
+
+        # The names of the services created by the factories (in the order
+        # that they were created), and the threads that they were created on.
+        self.created = []
+        self.created_on = []
+
+        return
+
+    def tearDown(self):
+        """ Called immediately after each test method has been called. """
+
+        shutil.rmtree(self.tmpdir)
+
+        return
+
+    ###########################################################################
+    # Tests.
+    ###########################################################################
+
+    def test_record_and_save(self):
+        """ record and save """
+
+        application = self._create_application(UsageProfile(self.filename))
+        application.start()
+
+        application.get_service(IFoo, "name == 'b'")
+        application.get_extensions('a.x')
+        application.get_service(IFoo, "name == 'b'")
+
+        # Services registered as objects don't need to be pre-warmed.
+        application.register_service(HasTraits, HasTraits())
+        application.get_service(HasTraits)
+
+        application.stop()
+
+        with open(self.filename) as f:
+            profile = json.load(f)
+
+        entries = [
+            (entry['kind'], entry['name'], entry['query'])
+            for entry in profile['entries']
+        ]
+        self.assertIn(('extension_point', 'a.x', ''), entries)
+        self.assertIn(
+            ('service', 'envisage.tests.usage_profile_test_case.IFoo',
+             "name == 'b'"),
+            entries
+        )
+        self.assertEqual(['b'], self.created)
+
+        return
+
+    def test_prewarm_with_scheduler(self):
+        """ prewarm with scheduler """
+
+        self._record_session()
+
+        callbacks = []
+        usage_profile = UsageProfile(self.filename, scheduler=callbacks.append)
+        application = self._create_application(usage_profile)
+
+        accessed = []
+        application.extension_registry.on_trait_change(
+            lambda extension_point_id: accessed.append(extension_point_id),
+            'extension_point_accessed'
+        )
+        application.start()
+        self.assertEqual([], self.created)
+
+        # Each entry is pre-warmed in its own callback.
+        while len(callbacks) > 0:
+            callbacks.pop(0)()
+
+        self.assertEqual(['b'], self.created)
+        self.assertIn('a.x', accessed)
+
+        # The service that was pre-warmed is the one that the user gets.
+        service = application.get_service(IFoo, "name == 'b'")
+        self.assertEqual('b', service.name)
+        self.assertEqual(['b'], self.created)
+
+        application.stop()
+
+        return
+
+    def test_prewarm_on_a_worker_thread(self):
+        """ prewarm on a worker thread """
+
+        self._record_session()
+
+        # A plain application has no event loop to pre-warm on, so it
+        # pre-warms on a worker thread.
+        usage_profile = UsageProfile(self.filename)
+        application = self._create_application(usage_profile)
+        application.start()
+        application._prewarm_scheduler.join()
+
+        self.assertEqual(['b'], self.created)
+        self.assertIsNot(threading.current_thread(), self.created_on[0])
+        self.assertFalse(usage_profile.is_prewarming())
+
+        # The registries are only concurrent while pre-warming.
+        self.assertFalse(application.extension_registry.concurrent)
+        self.assertFalse(application.service_registry.concurrent)
+
+        application.stop()
+
+        return
+
+    def test_thread_scheduler(self):
+        """ thread scheduler """
+
+        events = []
+        scheduler = ThreadScheduler(
+            started=lambda: events.append('started'),
+            finished=lambda: events.append('finished')
+        )
+
+        # Functions scheduled by functions run on the same thread.
+        threads = []
+        def function(count):
+            threads.append(threading.current_thread())
+            if count > 0:
+                scheduler(lambda: function(count - 1))
+
+        scheduler(lambda: function(2))
+        scheduler.join()
+
+        self.assertEqual(3, len(threads))
+        self.assertEqual(1, len(set(threads)))
+        self.assertEqual(['started', 'finished'], events)
+        self.assertIsNone(scheduler.thread)
+
+        return
+
+    def test_batch_changes_are_not_a_use(self):
+        """ batch changes are not a use """
+
+        self._record_session()
+
+        callbacks = []
+        usage_profile = UsageProfile(self.filename, scheduler=callbacks.append)
+        application = self._create_application(usage_profile)
+        application.start()
+        while len(callbacks) > 0:
+            callbacks.pop(0)()
+
+        # Changing the contributions to a pre-warmed extension point in a
+        # batch means remembering what they were, but that isn't a use.
+        class PluginC(Plugin):
+            id = 'C'
+
+            x = List([4], contributes_to='a.x')
+
+        with application.extension_registry.batch():
+            application.add_plugin(PluginC())
+
+        application.stop()
+        names = [entry[1] for entry in usage_profile.load()]
+        self.assertNotIn('a.x', names)
+
+        return
+
+    def test_prewarmed_but_unused_is_forgotten(self):
+        """ prewarmed but unused is forgotten """
+
+        self._record_session()
+
+        callbacks = []
+        usage_profile = UsageProfile(self.filename, scheduler=callbacks.append)
+        application = self._create_application(usage_profile)
+        application.start()
+        while len(callbacks) > 0:
+            callbacks.pop(0)()
+
+        self.assertEqual(['b'], self.created)
+
+        # Nothing that was pre-warmed was actually used, so it isn't recorded
+        # for next time (what the core plugin used at start up still is).
+        application.stop()
+        names = [entry[1] for entry in usage_profile.load()]
+        self.assertNotIn('a.x', names)
+        self.assertNotIn('envisage.tests.usage_profile_test_case.IFoo', names)
+
+        return
+
+    def test_prewarmed_and_used_is_recorded(self):
+        """ prewarmed and used is recorded """
+
+        self._record_session()
+        entries = UsageProfile(self.filename).load()
+
+        callbacks = []
+        usage_profile = UsageProfile(self.filename, scheduler=callbacks.append)
+        application = self._create_application(usage_profile)
+        application.start()
+        while len(callbacks) > 0:
+            callbacks.pop(0)()
+
+        application.get_service(IFoo, "name == 'b'")
+        application.get_extensions('a.x')
+        application.stop()
+
+        # What was pre-warmed and then used is recorded again for next time
+        # (with the time it originally took).
+        self.assertEqual(
+            sorted(entry[:3] for entry in entries),
+            sorted(entry[:3] for entry in usage_profile.load())
+        )
+
+        return
+
+    def test_min_duration(self):
+        """ min duration """
+
+        self._record_session()
+
+        callbacks = []
+        usage_profile = UsageProfile(
+            self.filename, min_duration=3600, scheduler=callbacks.append
+        )
+        application = self._create_application(usage_profile)
+        application.start()
+
+        # Nothing took long enough to be worth pre-warming.
+        self.assertEqual([], callbacks)
+
+        application.stop()
+
+        return
+
+    def test_cancel(self):
+        """ cancel """
+
+        self._record_session()
+
+        callbacks = []
+        usage_profile = UsageProfile(self.filename, scheduler=callbacks.append)
+        application = self._create_application(usage_profile)
+        application.start()
+        application.stop()
+
+        # Pre-warming stops when the application does.
+        while len(callbacks) > 0:
+            callbacks.pop(0)()
+
+        self.assertEqual([], self.created)
+
+        return
+
+    def test_missing_or_corrupt_profile(self):
+        """ missing or corrupt profile """
+
+        usage_profile = UsageProfile(self.filename)
+        self.assertEqual([], usage_profile.load())
+
+        with open(self.filename, 'w') as f:
+            f.write('{"format_version" : 1, "entries" : [')
+
+        self.assertEqual([], usage_profile.load())
+
+        return
+
+    def test_record_usage(self):
+        """ record usage """
+
+        application = TestApplication(record_usage=True)
+        self.assertEqual(
+            os.path.join(application.home, 'usage_profile.json'),
+            application.usage_profile.filename
+        )
+        self.assertIs(
+            application.usage_profile,
+            application.service_registry.usage_profile
+        )
+
+        self.assertIsNone(TestApplication().usage_profile)
+
+        return
+
+    ###########################################################################
+    # Private interface.
+    ###########################################################################
+
+    def _create_application(self, usage_profile):
+        """ Create an application that offers services and extensions. """
+
+        created = self.created
+        created_on = self.created_on
+        def foo_factory(**properties):
+            foo = Foo()
+            foo.name = properties['name']
+            created.append(foo.name)
+            created_on.append(threading.current_thread())
+
+            return foo
+
+        class PluginA(Plugin):
+            id = 'A'
+
+            x = ExtensionPoint(List, id='a.x')
+
+            service_offers = List(contributes_to='envisage.service_offers')
+
+            def _service_offers_default(self):
+                return [
+                    ServiceOffer(
+                        protocol=IFoo, factory=foo_factory,
+                        properties={'name' : name}
+                    )
+
+                    for name in ['a', 'b']
+                ]
+
+        class PluginB(Plugin):
+            id = 'B'
+
+            x = List([1, 2, 3], contributes_to='a.x')
+
+        return TestApplication(
+            plugins=[CorePlugin(), PluginA(), PluginB()],
+            usage_profile=usage_profile
+        )
+
+    def _record_session(self):
+        """ Record a session that uses a service and an extension point. """
+
+        application = self._create_application(UsageProfile(self.filename))
+        application.start()
+        application.get_service(IFoo, "name == 'b'")
+        application.get_extensions('a.x')
+        application.stop()
+
+        del self.created[:]
+        del self.created_on[:]
+
+        return
+
+
+# Entry point for stand-alone testing.
+if __name__ == '__main__':
+    unittest.main()
+
+#### EOF ######################################################################
@@ -307,13 +307,18 @@ class TasksApplication(Application):
                 window = self.create_window(window_layout, restore=True)
             window.open()
 
+    def _get_prewarm_scheduler(self):
+        """ Returns the scheduler used to pre-warm the usage profile.
+        """
+        # Pre-warm when the GUI event loop gets round to it.
+        return self.gui.invoke_later
+
     def _get_task_factory(self, id):
         """ Returns the TaskFactory with the specified ID, or None.
         """
-        for factory in self.task_factories:
-            if factory.id == id:
-                return factory
-        return None
+        # The task factories extension point is keyed by Id, so this doesn't
+        # have to look at every factory.
+        return self.get_keyed_extension(self.TASK_FACTORIES, id)
 
     def _prepare_exit(self):
         """ Called immediately before the extant windows are destroyed and the
@@ -62,13 +62,14 @@ class TasksPlugin(Plugin):
 
     tasks = ExtensionPoint(
         List(Instance('envisage.ui.tasks.task_factory.TaskFactory')),
-        id=TASKS,
+        id=TASKS, key='id', duplicates='first',
         desc="""
 
         This extension point makes tasks avaiable to the application.
 
         Each contribution to the extension point must be an instance of
-        'envisage.tasks.api.TaskFactory.
+        'envisage.tasks.api.TaskFactory. Factories are looked up by Id (if
+        two factories have the same Id then the first one is used).
         """)
 
     task_extensions = ExtensionPoint(
@@ -167,6 +167,16 @@ class WorkbenchApplication(Application):
 
         return
 
+    ###########################################################################
+    # Protected 'Application' interface.
+    ###########################################################################
+
+    def _get_prewarm_scheduler(self):
+        """ Return the scheduler used to pre-warm the usage profile. """
+
+        # Pre-warm when the GUI event loop gets round to it.
+        return self.gui.invoke_later
+
     ###########################################################################
     # Private interface.
     ###########################################################################
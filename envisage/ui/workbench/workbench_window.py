@@ -175,6 +175,11 @@ class WorkbenchWindow(pyface.WorkbenchWindow):
 
         return service
 
+    def get_service_generation(self, protocol):
+        """ Return the generation of the services for a protocol. """
+
+        return self.service_registry.get_service_generation(protocol)
+
     def get_service_properties(self, service_id):
         """ Return the dictionary of properties associated with a service. """
 
@@ -189,15 +194,21 @@ class WorkbenchWindow(pyface.WorkbenchWindow):
 
         return services
 
-    def register_service(self, protocol, obj, properties=None):
+    def register_service(self, protocol, obj, properties=None,
+                         scope='singleton'):
         """ Register a service. """
 
         service_id = self.service_registry.register_service(
-            protocol, obj, properties
+            protocol, obj, properties, scope
         )
 
         return service_id
 
+    def register_services(self, service_offers):
+        """ Register a number of services in a single transaction. """
+
+        return self.service_registry.register_services(service_offers)
+
     def set_service_properties(self, service_id, properties):
         """ Set the dictionary of properties associated with a service. """
 
@@ -212,6 +223,13 @@ class WorkbenchWindow(pyface.WorkbenchWindow):
 
         return
 
+    def unregister_services(self, service_ids):
+        """ Unregister a number of services in a single transaction. """
+
+        self.service_registry.unregister_services(service_ids)
+
+        return
+
     ###########################################################################
     # Private interface.
     ###########################################################################
@@ -228,23 +246,14 @@ class WorkbenchWindow(pyface.WorkbenchWindow):
     def _register_service_offers(self, service_offers):
         """ Register all service offers. """
 
-        return list(map(self._register_service_offer, service_offers))
-
-    def _register_service_offer(self, service_offer):
-        """ Register a service offer. """
-
         # Add the window to the service offer properties (this is so that it
         # is available to the factory when it is called to create the actual
         # service).
-        service_offer.properties['window'] = self
+        for service_offer in service_offers:
+            service_offer.properties['window'] = self
 
-        service_id = self.register_service(
-            protocol   = service_offer.protocol,
-            obj        = service_offer.factory,
-            properties = service_offer.properties
-        )
-
-        return service_id
+        # Opening a window is a single registry transaction.
+        return self.register_services(service_offers)
 
     def _unregister_service_offers(self, service_ids):
         """ Unregister all service offers. """
@@ -254,8 +263,7 @@ class WorkbenchWindow(pyface.WorkbenchWindow):
         service_ids_copy = service_ids[:]
         service_ids_copy.reverse()
 
-        for service_id in service_ids_copy:
-            self.unregister_service(service_id)
+        self.unregister_services(service_ids_copy)
 
         return
 
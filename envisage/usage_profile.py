@@ -0,0 +1,391 @@
+""" Usage profiles that pre-warm services and extension points.
+
+Much of the cost of starting an application is paid the first time that
+things are used: the first request for a service calls its (possibly slow)
+factory, and the first access to an extension point asks every provider for
+its contributions. A usage profile records which services and extension
+points were used in a session (and how long it took to create them), and on
+the next start pre-warms them in the background, in the same order, right
+after the application has started. By the time the user gets around to them
+the cost has already been paid.
+
+e.g. To record the profile in the application's 'home' directory::
+
+    application = Application(record_usage=True, ...)
+
+or to control where the profile is kept and how it is pre-warmed::
+
+    application = Application(
+        usage_profile=UsageProfile(
+            filename, min_duration=0.01, scheduler=GUI.invoke_later
+        ),
+        ...
+    )
+
+Each service or extension point is pre-warmed in a separate callback that is
+handed to a 'scheduler', which by default is the application's event loop
+(e.g. 'loop.call_soon' for an 'AsyncApplication', or 'GUI.invoke_later' for
+a GUI application). Pre-warming therefore happens on the same thread as
+everything else, so the registries don't need to be 'concurrent', and any
+plugins that are activated lazily are started on the usual thread. A plain
+'Application' doesn't have an event loop, so it pre-warms on a worker thread
+instead (see 'ThreadScheduler'), with its registries in concurrent mode until
+pre-warming has finished.
+
+Services and extension points that are created by pre-warming are only
+recorded again if they are actually used, so a profile forgets things that
+the user has stopped using.
+
+Only singleton services are recorded, and a service is identified by its
+protocol and the simple (string, number, boolean or None) properties that it
+was registered with, so that the same service can be found in the next
+session even though its Id is different.
+
+"""
+
+
+# Standard library imports.
+from collections import OrderedDict, deque
+import json
+import logging
+import os
+import re
+import threading
+
+# Local imports.
+from ._compat import STRING_BASE_CLASS
+
+
+# Logging.
+logger = logging.getLogger(__name__)
+
+
+# The property values that can be used to identify a service.
+_SIMPLE_TYPES = (STRING_BASE_CLASS, int, float, bool, type(None))
+
+# The property names that can be used in a query.
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+class ThreadScheduler(object):
+    """ A scheduler that calls functions one after another on a worker thread.
+
+    The thread is started when a function is scheduled, and it finishes as
+    soon as there are no more functions waiting to be called. A function that
+    schedules another one (as each pre-warming callback does) therefore keeps
+    the same thread going.
+
+    """
+
+    def __init__(self, started=None, finished=None, name='envisage-prewarm'):
+        """ Constructor.
+
+        'started' and 'finished' are optional callables that are called
+        (without any arguments) before the thread starts and when it has
+        nothing left to do (on the worker thread itself).
+
+        """
+
+        self.started = started
+        self.finished = finished
+        self.name = name
+
+        # The worker thread (None if it isn't running).
+        self.thread = None
+
+        # The functions waiting to be called on the thread.
+        self._functions = deque()
+
+        # A lock that protects the functions and the thread.
+        self._lock = threading.Lock()
+
+        return
+
+    def __call__(self, function):
+        """ Call a function on the worker thread. """
+
+        with self._lock:
+            self._functions.append(function)
+            if self.thread is None:
+                if self.started is not None:
+                    self.started()
+
+                self.thread = threading.Thread(
+                    target=self._run, name=self.name
+                )
+                self.thread.daemon = True
+                self.thread.start()
+
+        return
+
+    def join(self, timeout=None):
+        """ Wait for the worker thread to finish (if it is running). """
+
+        thread = self.thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+        return
+
+    ###########################################################################
+    # Private interface.
+    ###########################################################################
+
+    def _run(self):
+        """ The body of the worker thread. """
+
+        while True:
+            with self._lock:
+                if len(self._functions) == 0:
+                    if self.finished is not None:
+                        self.finished()
+
+                    self.thread = None
+                    break
+
+                function = self._functions.popleft()
+
+            try:
+                function()
+
+            except Exception:
+                logger.exception('error calling %r', function)
+
+        return
+
+
+class UsageProfile(object):
+    """ Records the services and extension points used by an application. """
+
+    # The version of the format of the profile file (a file with any other
+    # version is ignored).
+    FORMAT_VERSION = 1
+
+    def __init__(self, filename, min_duration=0.0, scheduler=None):
+        """ Constructor.
+
+        'filename' is the name of the file that the profile is kept in.
+
+        Only services and extension points that took at least 'min_duration'
+        seconds to create the last time are pre-warmed.
+
+        'scheduler' is a callable that takes a callable and arranges for it
+        to be called later (e.g. when the event loop is idle). If it is None
+        then the application's scheduler is used (see 'prewarm').
+
+        """
+
+        self.filename = filename
+        self.min_duration = min_duration
+        self.scheduler = scheduler
+
+        # The services and extension points that have been used in this
+        # session, in the order that they were first used.
+        #
+        # { (kind, name, query) : duration }
+        self._entries = OrderedDict()
+
+        # A lock that protects the entries (they can be recorded from any
+        # thread).
+        self._lock = threading.Lock()
+
+        # Set to stop pre-warming.
+        self._cancelled = threading.Event()
+
+        # Knows whether the current thread is pre-warming.
+        self._local = threading.local()
+
+        return
+
+    @property
+    def entries(self):
+        """ The services and extension points that have been used.
+
+        A list of tuples in the form '(kind, name, query, duration)' where
+        'kind' is either 'service' (in which case 'name' is the protocol
+        name) or 'extension_point' (in which case 'name' is the extension
+        point Id and 'query' is always empty).
+
+        """
+
+        with self._lock:
+            entries = [key + (duration,) for key, duration in
+                       self._entries.items()]
+
+        return entries
+
+    def cancel(self):
+        """ Stop pre-warming. """
+
+        self._cancelled.set()
+
+        return
+
+    def is_prewarming(self):
+        """ Is the current thread pre-warming?
+
+        The registries use this to avoid recording services and extension
+        points that are created by pre-warming until they are actually used.
+
+        """
+
+        return getattr(self._local, 'prewarming', False)
+
+    def load(self):
+        """ Return the entries that were saved in the profile file.
+
+        Returns an empty list if the file doesn't exist or can't be read.
+
+        """
+
+        try:
+            with open(self.filename) as f:
+                profile = json.load(f)
+
+            if profile.get('format_version') != self.FORMAT_VERSION:
+                return []
+
+            entries = [
+                (
+                    entry['kind'], entry['name'], entry['query'],
+                    entry['duration']
+                )
+
+                for entry in profile['entries']
+            ]
+
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            return []
+
+        return entries
+
+    def prewarm(self, application, scheduler=None):
+        """ Pre-warm the entries that were saved in the profile file.
+
+        The profile's own scheduler is used if it has one, otherwise the
+        given (application's) scheduler is. If there is no scheduler at all
+        then nothing is pre-warmed.
+
+        """
+
+        scheduler = self.scheduler or scheduler
+        if scheduler is None:
+            logger.debug('no scheduler - not pre-warming')
+            return
+
+        entries = [
+            entry for entry in self.load()
+            if entry[3] >= self.min_duration
+        ]
+        if len(entries) == 0:
+            return
+
+        self._cancelled.clear()
+        scheduler(
+            lambda: self._prewarm_next(application, iter(entries), scheduler)
+        )
+
+        return
+
+    def record_extension_point(self, extension_point_id, duration):
+        """ Record the first use of an extension point. """
+
+        self._record(('extension_point', extension_point_id, ''), duration)
+
+        return
+
+    def record_service(self, protocol_name, properties, duration):
+        """ Record the first use of a service. """
+
+        self._record(
+            ('service', protocol_name, self._get_query(properties)), duration
+        )
+
+        return
+
+    def save(self):
+        """ Save the entries that have been recorded to the profile file. """
+
+        profile = {
+            'format_version' : self.FORMAT_VERSION,
+            'entries'        : [
+                {
+                    'kind'     : kind,
+                    'name'     : name,
+                    'query'    : query,
+                    'duration' : duration
+                }
+
+                for kind, name, query, duration in self.entries
+            ]
+        }
+
+        directory = os.path.dirname(self.filename)
+        if len(directory) > 0 and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        with open(self.filename, 'w') as f:
+            json.dump(profile, f, indent=1)
+
+        return
+
+    ###########################################################################
+    # Private interface.
+    ###########################################################################
+
+    def _get_query(self, properties):
+        """ Return a query that matches a service's simple properties. """
+
+        terms = [
+            '%s == %r' % (name, value)
+            for name, value in sorted(properties.items())
+            if _IDENTIFIER.match(name) and isinstance(value, _SIMPLE_TYPES)
+        ]
+
+        return ' and '.join(terms)
+
+    def _prewarm(self, application, entry):
+        """ Pre-warm a single service or extension point. """
+
+        kind, name, query, duration = entry
+        self._local.prewarming = True
+        try:
+            if kind == 'service':
+                application.get_service(name, query)
+
+            else:
+                application.get_extensions(name)
+
+        except Exception:
+            logger.exception('error pre-warming %s <%s>', kind, name)
+
+        finally:
+            self._local.prewarming = False
+
+        return
+
+    def _prewarm_next(self, application, entries, scheduler):
+        """ Pre-warm the next entry (and schedule the one after it). """
+
+        if self._cancelled.is_set():
+            return
+
+        entry = next(entries, None)
+        if entry is not None:
+            self._prewarm(application, entry)
+            scheduler(
+                lambda: self._prewarm_next(application, entries, scheduler)
+            )
+
+        return
+
+    def _record(self, key, duration):
+        """ Record the first use of a service or extension point. """
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = duration
+
+        return
+
+#### EOF ######################################################################